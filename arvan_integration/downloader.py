@@ -27,11 +27,12 @@ def get_file_url(file_path):
     return full_url
 
 
-def get_file_download_url(file_path, expires_in=3600):
+def get_file_download_url(file_path, expires_in=3600, content_disposition=None):
     """
     Generate a presigned URL for secure file download
     :param file_path: File path inside bucket
     :param expires_in: URL expiration time in seconds
+    :param content_disposition: Optional Content-Disposition for the response
     :return: Presigned URL
     """
     import boto3
@@ -45,13 +46,44 @@ def get_file_download_url(file_path, expires_in=3600):
         region_name=settings.AWS_S3_REGION_NAME,
     )
 
+    params = {"Bucket": settings.AWS_STORAGE_BUCKET_NAME, "Key": file_path}
+    if content_disposition:
+        params["ResponseContentDisposition"] = content_disposition
+
     try:
         url = s3.generate_presigned_url(
             "get_object",
-            Params={"Bucket": settings.AWS_STORAGE_BUCKET_NAME, "Key": file_path},
+            Params=params,
             ExpiresIn=expires_in,
         )
         return url
     except ClientError as e:
         logger.error(f"Error generating presigned URL: {e}")
         return None
+
+
+def open_file_stream(file_path, start=0, end=None):
+    """
+    Open a streaming body for a file (or a byte range of it) without buffering
+    :param file_path: File path inside bucket
+    :param start: First byte offset
+    :param end: Last byte offset (inclusive), None for end of file
+    :return: botocore StreamingBody, read it with iter_chunks()
+    """
+    from botocore.exceptions import ClientError
+
+    from arvan_integration.uploader import get_s3_client
+
+    s3 = get_s3_client()
+
+    params = {"Bucket": settings.AWS_STORAGE_BUCKET_NAME, "Key": file_path}
+    if start or end is not None:
+        params["Range"] = f"bytes={start}-{'' if end is None else end}"
+
+    try:
+        return s3.get_object(**params)["Body"]
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+            raise FileNotFoundError(file_path) from e
+        logger.error(f"Error opening file stream for {file_path}: {e}")
+        raise
@@ -3,9 +3,20 @@ import logging
 
 from django.core.files.storage import default_storage
 
-from arvan_integration.downloader import get_file_download_url, get_file_url
+from arvan_integration.downloader import (
+    get_file_download_url,
+    get_file_url,
+    open_file_stream,
+)
 from arvan_integration.remover import delete_file
-from arvan_integration.uploader import upload_file
+from arvan_integration.uploader import (
+    abort_multipart_upload,
+    complete_multipart_upload,
+    create_multipart_upload,
+    get_object_size,
+    upload_file,
+    upload_part,
+)
 
 logger = logging.getLogger("arvan_integration")
 
@@ -24,6 +35,45 @@ class ArvanService:
             logger.error(f"Upload failed: {e}")
             raise
 
+    @staticmethod
+    def start_multipart_upload(file_path, content_type="application/octet-stream"):
+        """
+        Start a multipart upload, returns the upload id
+        """
+        return create_multipart_upload(file_path, content_type)
+
+    @staticmethod
+    def upload_part(file_path, upload_id, part_number, data):
+        """
+        Upload one part of a multipart upload, returns its ETag
+        """
+        return upload_part(file_path, upload_id, part_number, data)
+
+    @staticmethod
+    def complete_multipart_upload(file_path, upload_id, parts):
+        """
+        Assemble uploaded (part_number, etag) parts into the final file
+        """
+        return complete_multipart_upload(file_path, upload_id, parts)
+
+    @staticmethod
+    def get_object_size(file_path):
+        """
+        Size of a stored file in bytes, None when it does not exist
+        """
+        return get_object_size(file_path)
+
+    @staticmethod
+    def abort_multipart_upload(file_path, upload_id):
+        """
+        Abort a multipart upload
+        """
+        try:
+            return abort_multipart_upload(file_path, upload_id)
+        except Exception as e:
+            logger.error(f"Abort multipart upload failed: {e}")
+            return False
+
     @staticmethod
     def delete(file_path):
         """
@@ -43,11 +93,18 @@ class ArvanService:
         return get_file_url(file_path)
 
     @staticmethod
-    def get_download_url(file_path, expires_in=3600):
+    def get_download_url(file_path, expires_in=3600, content_disposition=None):
         """
         Get presigned download URL for file
         """
-        return get_file_download_url(file_path, expires_in)
+        return get_file_download_url(file_path, expires_in, content_disposition)
+
+    @staticmethod
+    def open_stream(file_path, start=0, end=None):
+        """
+        Open a streaming body for a file or a byte range of it
+        """
+        return open_file_stream(file_path, start, end)
 
     @staticmethod
     def file_exists(file_path):
@@ -0,0 +1,37 @@
+# arvan_integration/storage.py
+import logging
+
+from django.conf import settings
+from storages.backends.s3boto3 import S3Boto3Storage
+
+logger = logging.getLogger("arvan_integration")
+
+
+class ArvanMediaStorage(S3Boto3Storage):
+    """
+    S3 storage for Arvan Cloud that marks content-addressed keys as immutable.
+
+    Objects under one of ``AWS_S3_IMMUTABLE_PREFIXES`` are named after the hash
+    of their bytes, so the same key never points at different content and can
+    be cached by the CDN and browsers for a year without revalidation.
+    """
+
+    def _relative_name(self, name):
+        """Strip the storage location from a normalized object key"""
+        location = (self.location or "").strip("/")
+        if location and name.startswith(f"{location}/"):
+            return name[len(location) + 1 :]
+        return name
+
+    def is_immutable(self, name):
+        """Check if the object key lives under an immutable prefix"""
+        relative_name = self._relative_name(name)
+        prefixes = getattr(settings, "AWS_S3_IMMUTABLE_PREFIXES", [])
+        return any(relative_name.startswith(prefix) for prefix in prefixes)
+
+    def get_object_parameters(self, name):
+        params = super().get_object_parameters(name)
+        if self.is_immutable(name):
+            params.update(getattr(settings, "AWS_S3_IMMUTABLE_OBJECT_PARAMETERS", {}))
+            logger.debug(f"Immutable cache headers applied to {name}")
+        return params
@@ -53,3 +53,111 @@ def get_unique_filename(original_name, path="uploads/"):
     file_name, file_extension = os.path.splitext(original_name)
     unique_filename = f"{file_name}_{uuid.uuid4().hex[:8]}{file_extension}"
     return f"{path}{unique_filename}"
+
+
+def get_s3_client():
+    """
+    Create an S3 client for Arvan Cloud
+    """
+    return boto3.client(
+        "s3",
+        endpoint_url=settings.AWS_S3_ENDPOINT_URL,
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        region_name=settings.AWS_S3_REGION_NAME,
+    )
+
+
+def create_multipart_upload(file_path, content_type="application/octet-stream"):
+    """
+    Start a multipart upload on Arvan Cloud
+    :return: upload id
+    """
+    try:
+        response = get_s3_client().create_multipart_upload(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Key=file_path,
+            ContentType=content_type,
+            ACL=getattr(settings, "AWS_DEFAULT_ACL", "public-read"),
+        )
+        logger.info(f"Multipart upload started: {file_path}")
+        return response["UploadId"]
+    except ClientError as e:
+        logger.error(f"Error starting multipart upload for {file_path}: {e}")
+        raise Exception(f"خطا در شروع آپلود چندبخشی: {e}")
+
+
+def upload_part(file_path, upload_id, part_number, data):
+    """
+    Upload one part of a multipart upload
+    :return: ETag of the stored part
+    """
+    try:
+        response = get_s3_client().upload_part(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Key=file_path,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            Body=data,
+        )
+        return response["ETag"]
+    except ClientError as e:
+        logger.error(f"Error uploading part {part_number} of {file_path}: {e}")
+        raise Exception(f"خطا در آپلود بخش {part_number}: {e}")
+
+
+def complete_multipart_upload(file_path, upload_id, parts):
+    """
+    Assemble uploaded parts into the final object
+    :param parts: list of (part_number, etag)
+    """
+    try:
+        get_s3_client().complete_multipart_upload(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Key=file_path,
+            UploadId=upload_id,
+            MultipartUpload={
+                "Parts": [
+                    {"PartNumber": part_number, "ETag": etag}
+                    for part_number, etag in sorted(parts)
+                ]
+            },
+        )
+        logger.info(f"Multipart upload completed: {file_path}")
+    except ClientError as e:
+        logger.error(f"Error completing multipart upload for {file_path}: {e}")
+        raise Exception(f"خطا در تکمیل آپلود چندبخشی: {e}")
+
+
+def abort_multipart_upload(file_path, upload_id):
+    """
+    Abort a multipart upload and free its stored parts
+    """
+    try:
+        get_s3_client().abort_multipart_upload(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Key=file_path,
+            UploadId=upload_id,
+        )
+        logger.info(f"Multipart upload aborted: {file_path}")
+        return True
+    except ClientError as e:
+        logger.error(f"Error aborting multipart upload for {file_path}: {e}")
+        return False
+
+
+def get_object_size(file_path):
+    """
+    Size of a stored object
+    :return: size in bytes, or None when the object does not exist
+    """
+    try:
+        response = get_s3_client().head_object(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=file_path
+        )
+        return response["ContentLength"]
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+            return None
+        logger.error(f"Error reading object size of {file_path}: {e}")
+        raise
@@ -0,0 +1,80 @@
+# core/management/commands/benchmark_rate_limit.py
+import statistics
+import time
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from core.middleware import rate_limit
+from core.services.rate_limit.limiter import SharedRateLimiter
+from core.services.rate_limit.local import LocalTokenBucketLimiter
+
+
+class Command(BaseCommand):
+    help = "Measure the latency RateLimitMiddleware adds per request"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests", type=int, default=5000, help="Requests per run"
+        )
+        parser.add_argument(
+            "--clients", type=int, default=50, help="Distinct client IPs"
+        )
+        parser.add_argument("--path", default="/files/", help="Request path")
+
+    def _run(self, middleware, requests):
+        timings = []
+        for request in requests:
+            start = time.perf_counter()
+            middleware.process_request(request)
+            timings.append(time.perf_counter() - start)
+        return timings
+
+    def _report(self, name, timings):
+        timings = sorted(timings)
+        p50 = statistics.median(timings) * 1e6
+        p99 = timings[int(len(timings) * 0.99) - 1] * 1e6
+        self.stdout.write(f"{name:<10} p50 {p50:8.1f} µs   p99 {p99:8.1f} µs")
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        total = options["requests"]
+        clients = options["clients"]
+        backend = rate_limit.rate_limit_backend
+        middleware = rate_limit.RateLimitMiddleware(lambda request: None)
+        run_id = int(time.time())
+
+        def make_requests(name, path):
+            # Fresh identifiers per run, so runs do not share counters
+            return [
+                factory.get(path, REMOTE_ADDR=f"bench-{run_id}-{name}-{i % clients}")
+                for i in range(total)
+            ]
+
+        # Baseline: the middleware without the limiter (skipped path)
+        skip_path = (rate_limit.RATE_LIMIT_SKIP_PATHS or ["/static/"])[0]
+        self._report(
+            "baseline", self._run(middleware, make_requests("baseline", skip_path))
+        )
+
+        # Keep clients under their limit: measure the allowed path
+        with mock.patch.object(rate_limit, "RATE_LIMIT_BLOCK_RESPONSE", False):
+            for name, limiter in (
+                ("shared", SharedRateLimiter(backend)),
+                (
+                    "local",
+                    LocalTokenBucketLimiter(
+                        backend,
+                        error_margin=rate_limit.RATE_LIMIT_LOCAL_ERROR_MARGIN,
+                        max_keys=rate_limit.RATE_LIMIT_LOCAL_MAX_KEYS,
+                    ),
+                ),
+            ):
+                requests = make_requests(name, options["path"])
+                with mock.patch.object(rate_limit, "rate_limiter", limiter):
+                    self._report(name, self._run(middleware, requests))
+
+        self.stdout.write(
+            self.style.SUCCESS(f"{total} requests from {clients} clients per run")
+        )
@@ -1,12 +1,23 @@
 # core/middleware/rate_limit.py
 import logging
+import math
 
 from django.conf import settings
-from django.core.cache import cache
 from django.http import HttpResponse, JsonResponse
 from django.utils import timezone
 from django.utils.deprecation import MiddlewareMixin
 
+from core.services.rate_limit.analytics import RateLimitAnalytics
+from core.services.rate_limit.backends import (
+    CacheRateLimitBackend,
+    FailoverRateLimitBackend,
+    SqliteRateLimitBackend,
+)
+from core.services.rate_limit.breaker import CircuitBreaker
+from core.services.rate_limit.limiter import SharedRateLimiter
+from core.services.rate_limit.local import LocalTokenBucketLimiter
+from core.services.rate_limit.policies import PolicyEngine
+
 logger = logging.getLogger("core")
 
 # Configuration with defaults
@@ -17,81 +28,144 @@ RATE_LIMIT_WHITELIST_IPS = getattr(settings, "RATE_LIMIT_WHITELIST_IPS", [])
 RATE_LIMIT_SKIP_PATHS = getattr(
     settings, "RATE_LIMIT_SKIP_PATHS", ["/admin/", "/static/", "/media/"]
 )
+RATE_LIMIT_TIERS = getattr(settings, "RATE_LIMIT_TIERS", {})
+RATE_LIMIT_ENDPOINTS = getattr(settings, "RATE_LIMIT_ENDPOINTS", {})
+RATE_LIMIT_USER_TYPE_TIERS = getattr(settings, "RATE_LIMIT_USER_TYPE_TIERS", {})
+RATE_LIMIT_LOCAL_TIER = getattr(settings, "RATE_LIMIT_LOCAL_TIER", True)
+RATE_LIMIT_LOCAL_ERROR_MARGIN = getattr(settings, "RATE_LIMIT_LOCAL_ERROR_MARGIN", 0.05)
+RATE_LIMIT_LOCAL_MAX_KEYS = getattr(settings, "RATE_LIMIT_LOCAL_MAX_KEYS", 10000)
+RATE_LIMIT_STORE = getattr(settings, "RATE_LIMIT_STORE", "cache")
+RATE_LIMIT_CACHE = getattr(settings, "RATE_LIMIT_CACHE", "default")
+RATE_LIMIT_SQLITE_PATH = getattr(settings, "RATE_LIMIT_SQLITE_PATH", None)
+RATE_LIMIT_FALLBACK_CACHE = getattr(settings, "RATE_LIMIT_FALLBACK_CACHE", None)
+RATE_LIMIT_STORE_TIMEOUT = getattr(settings, "RATE_LIMIT_STORE_TIMEOUT", 0.05)
+RATE_LIMIT_BREAKER = getattr(settings, "RATE_LIMIT_BREAKER", {})
+RATE_LIMIT_ANALYTICS = getattr(settings, "RATE_LIMIT_ANALYTICS", True)
+RATE_LIMIT_ANALYTICS_CAPACITY = getattr(
+    settings, "RATE_LIMIT_ANALYTICS_CAPACITY", 1000
+)
+
+
+def _build_backend():
+    """Shared counter store, behind a circuit breaker when a fallback is set"""
+    if RATE_LIMIT_STORE == "sqlite":
+        shared = SqliteRateLimitBackend(
+            RATE_LIMIT_SQLITE_PATH, timeout=RATE_LIMIT_STORE_TIMEOUT
+        )
+    else:
+        shared = CacheRateLimitBackend(RATE_LIMIT_CACHE)
+
+    if not RATE_LIMIT_FALLBACK_CACHE:
+        return shared
+    breaker = CircuitBreaker(
+        f"rate-limit-{RATE_LIMIT_STORE}",
+        slow_call_threshold=RATE_LIMIT_STORE_TIMEOUT,
+        **RATE_LIMIT_BREAKER,
+    )
+    return FailoverRateLimitBackend(
+        shared, CacheRateLimitBackend(RATE_LIMIT_FALLBACK_CACHE), breaker
+    )
+
+
+rate_limit_backend = _build_backend()
+policy_engine = PolicyEngine(
+    tiers=RATE_LIMIT_TIERS,
+    endpoints=RATE_LIMIT_ENDPOINTS,
+    user_type_tiers=RATE_LIMIT_USER_TYPE_TIERS,
+    default_limit={"requests": RATE_LIMIT_REQUESTS, "window": RATE_LIMIT_WINDOW},
+)
+if RATE_LIMIT_LOCAL_TIER:
+    rate_limiter = LocalTokenBucketLimiter(
+        rate_limit_backend,
+        error_margin=RATE_LIMIT_LOCAL_ERROR_MARGIN,
+        max_keys=RATE_LIMIT_LOCAL_MAX_KEYS,
+    )
+else:
+    rate_limiter = SharedRateLimiter(rate_limit_backend)
+rate_limit_analytics = RateLimitAnalytics(capacity=RATE_LIMIT_ANALYTICS_CAPACITY)
 
 BLOCK_MESSAGE = "تعداد درخواست‌های شما بیش از حد مجاز است. لطفاً بعداً دوباره تلاش کنید."
 
 
 class RateLimitMiddleware(MiddlewareMixin):
     """
-    Enhanced rate limiting middleware with sliding window approach
+    Rate limiting middleware with atomic sliding-window counters
     """
 
     def process_request(self, request):
         """Process request before view is called"""
 
-        # Debug logging
-        logger.info(f"Processing request: {request.path}")
-        logger.info(f"Has user attr: {hasattr(request, 'user')}")
+        # Debug logging (hot path: keep it cheap when disabled)
+        logger.debug(f"Processing request: {request.path}")
 
         # Skip rate limiting for whitelisted IPs
         if self._is_whitelisted(request):
-            logger.info("Request whitelisted by IP")
+            logger.debug("Request whitelisted by IP")
             return None
 
         # Skip rate limiting for certain paths
         if self._should_skip_path(request):
-            logger.info(f"Request skipped for path: {request.path}")
+            logger.debug(f"Request skipped for path: {request.path}")
             return None
 
         # Skip for superusers (safe check)
         if self._is_superuser(request):
-            logger.info("Request skipped for superuser")
+            logger.debug("Request skipped for superuser")
             return None
 
-        # Get client identifier and cache key
+        # Get client identifier and the limits of its tier and endpoint
         identifier = self._get_identifier(request)
-        cache_key = self._get_cache_key(identifier)
+        tier, limits = policy_engine.get_limits(request, identifier)
 
-        logger.info(f"Rate limiting identifier: {identifier}")
+        logger.debug(f"Rate limiting identifier: {identifier} (tier: {tier})")
 
-        # Get current window data
-        current_count, window_start = self._get_window_data(cache_key)
-        current_time = timezone.now().timestamp()
+        # Check this request against every limit (sliding window)
+        decisions = rate_limiter.check(
+            limits, release_rejected=RATE_LIMIT_BLOCK_RESPONSE
+        )
 
-        # Initialize new window if needed
-        if window_start is None or (current_time - window_start) >= RATE_LIMIT_WINDOW:
-            current_count = 1
-            window_start = current_time
-            self._update_window_data(cache_key, current_count, window_start)
-            logger.info(f"New rate limit window started for {identifier}")
-        else:
-            # Increment counter in current window
-            current_count += 1
-            self._update_window_data(cache_key, current_count, window_start)
-            logger.info(f"Rate limit count: {current_count} for {identifier}")
+        # Check if any limit exceeded
+        exceeded = [decision for decision in decisions if not decision.allowed]
+
+        if RATE_LIMIT_ANALYTICS:
+            endpoint = next(
+                (
+                    limit.scope.split(":", 1)[1]
+                    for limit in limits
+                    if limit.scope.startswith("endpoint:")
+                ),
+                None,
+            )
+            rate_limit_analytics.record(
+                identifier, request.path, tier, endpoint, blocked=bool(exceeded)
+            )
 
-        # Check if limit exceeded
-        if current_count > RATE_LIMIT_REQUESTS:
-            time_remaining = RATE_LIMIT_WINDOW - (current_time - window_start)
+        if exceeded:
+            # The limit that stays exceeded the longest decides the wait
+            decision = max(exceeded, key=lambda decision: decision.retry_after)
+            limit = decision.limit
 
             # Log the rate limit violation
             logger.warning(
                 f"Rate limit exceeded for {identifier}. "
-                f"Requests: {current_count}/{RATE_LIMIT_REQUESTS}, "
+                f"Scope: {limit.scope}, "
+                f"Requests: {decision.current}/{limit.requests}, "
                 f"Path: {request.path}, "
                 f"Method: {request.method}"
             )
 
             if RATE_LIMIT_BLOCK_RESPONSE:
                 return self._create_blocked_response(
-                    request, current_count, time_remaining
+                    request, limit, decision.current, decision.retry_after
                 )
 
-        # Store rate limit info for response headers
+        # Store the most restrictive limit for response headers
+        decision = min(decisions, key=lambda decision: decision.remaining)
         request.rate_limit_info = {
-            "current_count": current_count,
-            "limit": RATE_LIMIT_REQUESTS,
-            "window": RATE_LIMIT_WINDOW,
+            "remaining": decision.remaining,
+            "limit": decision.limit.requests,
+            "window": decision.limit.window,
+            "reset": decision.reset_at,
         }
 
         return None
@@ -101,10 +175,9 @@ class RateLimitMiddleware(MiddlewareMixin):
         if hasattr(request, "rate_limit_info"):
             info = request.rate_limit_info
             response["X-RateLimit-Limit"] = str(info["limit"])
-            response["X-RateLimit-Remaining"] = str(
-                max(0, info["limit"] - info["current_count"])
-            )
+            response["X-RateLimit-Remaining"] = str(info["remaining"])
             response["X-RateLimit-Window"] = str(info["window"])
+            response["X-RateLimit-Reset"] = str(math.ceil(info["reset"]))
 
         return response
 
@@ -135,7 +208,7 @@ class RateLimitMiddleware(MiddlewareMixin):
         client_ip = self._get_client_ip(request)
         is_whitelisted = client_ip in RATE_LIMIT_WHITELIST_IPS
         if is_whitelisted:
-            logger.info(f"IP {client_ip} is whitelisted")
+            logger.debug(f"IP {client_ip} is whitelisted")
         return is_whitelisted
 
     def _should_skip_path(self, request):
@@ -145,7 +218,7 @@ class RateLimitMiddleware(MiddlewareMixin):
             path.startswith(skip_path) for skip_path in RATE_LIMIT_SKIP_PATHS
         )
         if should_skip:
-            logger.info(f"Path {path} should be skipped")
+            logger.debug(f"Path {path} should be skipped")
         return should_skip
 
     def _is_superuser(self, request):
@@ -161,34 +234,9 @@ class RateLimitMiddleware(MiddlewareMixin):
             logger.warning(f"Error checking superuser status: {e}")
         return False
 
-    def _get_cache_key(self, identifier):
-        """Generate cache key for rate limiting"""
-        return f"rl:{identifier}"
-
-    def _get_window_data(self, cache_key):
-        """Get current window request count and start time"""
-        data = cache.get(cache_key)
-        if data is None:
-            return 0, None
-
-        if isinstance(data, dict):
-            return data.get("count", 0), data.get("window_start")
-        else:
-            return data, None
-
-    def _update_window_data(self, cache_key, count, window_start=None):
-        """Update window data in cache"""
-        if window_start is None:
-            window_start = timezone.now().timestamp()
-
-        data = {"count": count, "window_start": window_start}
-        cache.set(
-            cache_key, data, RATE_LIMIT_WINDOW + 10
-        )  # Add extra time to prevent race conditions
-
-    def _create_blocked_response(self, request, current_count, time_remaining):
+    def _create_blocked_response(self, request, limit, current_count, time_remaining):
         """Create appropriate response when rate limit is exceeded"""
-        retry_after = max(1, int(time_remaining))
+        retry_after = max(1, math.ceil(time_remaining))
 
         if request.headers.get("Accept", "").startswith(
             "application/json"
@@ -197,8 +245,8 @@ class RateLimitMiddleware(MiddlewareMixin):
                 "error": "Rate limit exceeded",
                 "message": BLOCK_MESSAGE,
                 "current_requests": current_count,
-                "limit": RATE_LIMIT_REQUESTS,
-                "window_seconds": RATE_LIMIT_WINDOW,
+                "limit": limit.requests,
+                "window_seconds": limit.window,
                 "retry_after": retry_after,
                 "timestamp": timezone.now().isoformat(),
             }
@@ -225,7 +273,7 @@ class RateLimitMiddleware(MiddlewareMixin):
                     <div class="error-code">429</div>
                     <div class="message">{BLOCK_MESSAGE}</div>
                     <div class="details">
-                        درخواست‌های شما: {current_count}/{RATE_LIMIT_REQUESTS}<br>
+                        درخواست‌های شما: {current_count}/{limit.requests}<br>
                         زمان انتظار: {retry_after} ثانیه
                     </div>
                     <button class="retry" onclick="location.reload()">تلاش مجدد</button>
@@ -235,12 +283,10 @@ class RateLimitMiddleware(MiddlewareMixin):
             """
             response = HttpResponse(html_content, status=429)
 
-        response["X-RateLimit-Limit"] = str(RATE_LIMIT_REQUESTS)
-        response["X-RateLimit-Remaining"] = str(
-            max(0, RATE_LIMIT_REQUESTS - current_count)
-        )
+        response["X-RateLimit-Limit"] = str(limit.requests)
+        response["X-RateLimit-Remaining"] = str(max(0, limit.requests - current_count))
         response["X-RateLimit-Reset"] = str(
-            int(timezone.now().timestamp() + time_remaining)
+            math.ceil(timezone.now().timestamp() + retry_after)
         )
         response["Retry-After"] = str(retry_after)
 
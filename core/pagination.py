@@ -0,0 +1,189 @@
+# core/pagination.py
+"""
+Keyset (cursor) pagination.
+
+Pages are fetched with ``WHERE (created_at, id) < (last_created_at, last_id)
+ORDER BY created_at DESC, id DESC LIMIT n + 1`` instead of ``COUNT(*)`` plus
+``OFFSET``, so every page costs the same index range scan. Cursors are
+signed, opaque tokens holding the boundary row's ordering values.
+
+Ordering by a computed score (``-search_rank``, with ``-id`` as the unique
+tiebreak) pages correctly as long as the scores stay put. MySQL's MATCH
+score depends on the whole table, so rows inserted while a client pages
+through results can shift the scores: the cursor's boundary score then no
+longer sits where it did, and rows may be skipped or shown twice across
+that page boundary. Search results are a best-effort listing, so this is
+accepted rather than freezing the scores into the cursor.
+"""
+import datetime
+import logging
+from dataclasses import dataclass, field
+
+from django.core import signing
+from django.db.models import Q
+from django.http import QueryDict
+
+logger = logging.getLogger(__name__)
+
+CURSOR_SALT = "core.pagination.cursor"
+
+
+def _encode_value(value):
+    if hasattr(value, "togregorian"):
+        # jdatetime values from django_jalali fields
+        value = value.togregorian()
+    if isinstance(value, datetime.datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"d": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return datetime.date.fromisoformat(value["d"])
+    return value
+
+
+@dataclass
+class CursorPage:
+    """One page of a keyset-paginated queryset"""
+
+    object_list: list
+    next_cursor: str = None
+    previous_cursor: str = None
+    approximate_total: int = None
+    query_params: QueryDict = field(default_factory=lambda: QueryDict(mutable=True))
+    cursor_param: str = "cursor"
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def _query_for(self, cursor):
+        params = self.query_params.copy()
+        params[self.cursor_param] = cursor
+        return params.urlencode()
+
+    @property
+    def first_query(self):
+        """Query string (current filters kept) for the first page"""
+        return self.query_params.urlencode()
+
+    @property
+    def next_query(self):
+        """Query string (current filters kept) for the next page"""
+        return self._query_for(self.next_cursor) if self.next_cursor else ""
+
+    @property
+    def previous_query(self):
+        """Query string (current filters kept) for the previous page"""
+        return self._query_for(self.previous_cursor) if self.previous_cursor else ""
+
+
+class CursorPaginator:
+    """
+    Paginate a queryset by a unique ordering, e.g. ``("-created_at", "-id")``.
+    The last ordering field must be unique so the keyset is total.
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.fields = [name.lstrip("-") for name in self.ordering]
+
+    def encode_cursor(self, obj, direction):
+        values = [_encode_value(getattr(obj, name)) for name in self.fields]
+        return signing.dumps({"v": values, "d": direction}, salt=CURSOR_SALT)
+
+    def decode_cursor(self, token):
+        """(values, direction) of a cursor token, or None when invalid"""
+        if not token:
+            return None
+        try:
+            payload = signing.loads(token, salt=CURSOR_SALT)
+            values = [_decode_value(value) for value in payload["v"]]
+            direction = payload["d"]
+        except (signing.BadSignature, KeyError, TypeError, ValueError):
+            logger.warning("Invalid pagination cursor ignored")
+            return None
+        if len(values) != len(self.fields) or direction not in ("next", "prev"):
+            return None
+        return values, direction
+
+    def _keyset_filter(self, values, forward):
+        """Rows strictly after (forward) or before the boundary in the ordering"""
+        condition = Q()
+        equal = {}
+        for ordering, name, value in zip(self.ordering, self.fields, values):
+            descending = ordering.startswith("-")
+            lookup = "lt" if descending == forward else "gt"
+            condition |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+        return condition
+
+    def _reversed_ordering(self):
+        return [
+            name[1:] if name.startswith("-") else f"-{name}" for name in self.ordering
+        ]
+
+    def get_page(self, token=None, approximate_total=None):
+        cursor = self.decode_cursor(token)
+
+        if cursor is None:
+            rows = list(self.queryset.order_by(*self.ordering)[: self.per_page + 1])
+            has_more = len(rows) > self.per_page
+            rows = rows[: self.per_page]
+            has_before = False
+        else:
+            values, direction = cursor
+            forward = direction == "next"
+            queryset = self.queryset.filter(self._keyset_filter(values, forward))
+            ordering = self.ordering if forward else self._reversed_ordering()
+            rows = list(queryset.order_by(*ordering)[: self.per_page + 1])
+            has_more = len(rows) > self.per_page
+            rows = rows[: self.per_page]
+            if forward:
+                has_before = True
+            else:
+                rows.reverse()
+                has_more, has_before = True, has_more
+
+        return CursorPage(
+            object_list=rows,
+            next_cursor=self.encode_cursor(rows[-1], "next")
+            if rows and has_more
+            else None,
+            previous_cursor=self.encode_cursor(rows[0], "prev")
+            if rows and has_before
+            else None,
+            approximate_total=approximate_total,
+        )
+
+
+def paginate_by_cursor(
+    request, queryset, ordering, per_page, approximate_total=None, param="cursor"
+):
+    """Cursor page for the current request; keeps other GET params in links"""
+    page = CursorPaginator(queryset, ordering, per_page).get_page(
+        request.GET.get(param), approximate_total=approximate_total
+    )
+    page.query_params = request.GET.copy()
+    page.query_params.pop(param, None)
+    page.cursor_param = param
+    return page
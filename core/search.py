@@ -0,0 +1,252 @@
+# core/search.py
+"""
+Ranked full-text search over a normalized ``search_text`` column.
+
+Searchable models (images, documents, sections) keep ``search_text``
+normalized with ``core.text.normalize_persian``. On MySQL the column has a
+FULLTEXT index and queries use ``MATCH ... AGAINST`` in boolean mode with
+prefix terms. Other backends (SQLite in local mode) use an in-process
+inverted index that is rebuilt when the model's version changes (see
+core.services.cache.ModelVersion, so every worker notices edits made by the
+others). Fallback matches are scored only among the rows of the searched
+queryset, so other users' or inactive rows never push a user's own matches
+out of the result limit. Both annotate ``search_rank`` so results can be
+ordered by relevance.
+
+Each app creates the FULLTEXT index of its models from a post_migrate hook
+(``ensure_fulltext_index``) and bumps the version from its change signals
+(``bump_search_version``).
+"""
+import bisect
+import logging
+import math
+import threading
+from collections import defaultdict
+
+from django.db import connection
+from django.db.models import Case, FloatField, Value, When
+from django.db.models.expressions import RawSQL
+
+from core.services.cache import ModelVersion
+from core.text import normalize_persian, tokenize
+
+logger = logging.getLogger(__name__)
+
+# InnoDB ignores shorter words (innodb_ft_min_token_size)
+FULLTEXT_MIN_TOKEN_SIZE = 3
+MAX_FALLBACK_RESULTS = 1000
+
+VERSION_KEY_PREFIX = "search:version"
+
+
+def build_search_text(*parts):
+    """Normalized text stored in ``search_text``"""
+    return normalize_persian(" ".join(part for part in parts if part))
+
+
+def update_search_text(instance, save_kwargs, *fields, text=None):
+    """
+    Refresh ``instance.search_text`` from ``fields`` (or ``text`` built from
+    them) before saving; adds the column to ``update_fields`` when one of the
+    source fields is being saved.
+    """
+    if text is None:
+        text = build_search_text(*(getattr(instance, name) for name in fields))
+    instance.search_text = text
+    update_fields = save_kwargs.get("update_fields")
+    if update_fields is not None and set(fields) & set(update_fields):
+        save_kwargs["update_fields"] = {*update_fields, "search_text"}
+
+
+def uses_fulltext():
+    return connection.vendor == "mysql"
+
+
+def _fulltext_index_name(model):
+    return f"ft_{model._meta.model_name}_search"
+
+
+def ensure_fulltext_index(model):
+    """Create the FULLTEXT index on ``search_text`` when missing (MySQL only)"""
+    if not uses_fulltext():
+        return False
+
+    table = model._meta.db_table
+    index_name = _fulltext_index_name(model)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s",
+            [table, index_name],
+        )
+        if cursor.fetchone()[0]:
+            return False
+        cursor.execute(
+            f"ALTER TABLE {connection.ops.quote_name(table)} "
+            f"ADD FULLTEXT INDEX {connection.ops.quote_name(index_name)} (search_text)"
+        )
+    logger.info(f"Created FULLTEXT index {index_name} on {table}")
+    return True
+
+
+# ---------------------------------------------------------------------------
+# In-process inverted index (non-MySQL backends)
+# ---------------------------------------------------------------------------
+
+
+_versions = {}
+
+
+def _search_version(model):
+    label = model._meta.label
+    version = _versions.get(label)
+    if version is None:
+        version = _versions.setdefault(
+            label, ModelVersion(f"{VERSION_KEY_PREFIX}:{label.lower()}", label)
+        )
+    return version
+
+
+def bump_search_version(model):
+    """Invalidate in-process indexes of a model in every worker"""
+    if uses_fulltext():
+        return
+    _search_version(model).bump()
+
+
+class InvertedIndex:
+    """token -> {pk: term frequency}, with a sorted vocabulary for prefixes"""
+
+    def __init__(self, rows):
+        self.postings = defaultdict(dict)
+        self.document_count = 0
+        for pk, text in rows:
+            self.document_count += 1
+            for token in tokenize(text):
+                self.postings[token][pk] = self.postings[token].get(pk, 0) + 1
+        self.vocabulary = sorted(self.postings)
+
+    def _expand(self, term):
+        """Vocabulary words starting with ``term`` (prefix search)"""
+        start = bisect.bisect_left(self.vocabulary, term)
+        words = []
+        for word in self.vocabulary[start:]:
+            if not word.startswith(term):
+                break
+            words.append(word)
+        return words
+
+    def search(self, terms):
+        """{pk: score}; every term must match (as a word prefix)"""
+        scores = None
+        for term in terms:
+            term_scores = defaultdict(float)
+            for word in self._expand(term):
+                postings = self.postings[word]
+                idf = math.log(1 + self.document_count / len(postings))
+                # Exact word matches rank above prefix matches
+                weight = idf if word == term else idf * 0.5
+                for pk, frequency in postings.items():
+                    term_scores[pk] += weight * (1 + math.log(frequency))
+            if scores is None:
+                scores = dict(term_scores)
+            else:
+                scores = {
+                    pk: score + term_scores[pk]
+                    for pk, score in scores.items()
+                    if pk in term_scores
+                }
+            if not scores:
+                return {}
+        return scores or {}
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def _get_inverted_index(model):
+    version = _search_version(model).get()
+    entry = _indexes.get(model)
+    if entry and entry[0] == version:
+        return entry[1]
+
+    with _indexes_lock:
+        entry = _indexes.get(model)
+        if entry and entry[0] == version:
+            return entry[1]
+        rows = model.objects.values_list("pk", "search_text").iterator(
+            chunk_size=2000
+        )
+        index = InvertedIndex(rows)
+        _indexes[model] = (version, index)
+        logger.info(
+            f"Built search index for {model.__name__}: "
+            f"{index.document_count} rows, {len(index.vocabulary)} words"
+        )
+        return index
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+
+def _fulltext_search(queryset, terms):
+    model = queryset.model
+    column = (
+        f"{connection.ops.quote_name(model._meta.db_table)}."
+        f"{connection.ops.quote_name('search_text')}"
+    )
+    long_terms = [term for term in terms if len(term) >= FULLTEXT_MIN_TOKEN_SIZE]
+    short_terms = [term for term in terms if len(term) < FULLTEXT_MIN_TOKEN_SIZE]
+
+    # Words below the FULLTEXT token size are matched on the normalized column
+    for term in short_terms:
+        queryset = queryset.filter(search_text__contains=term)
+
+    if not long_terms:
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    boolean_query = " ".join(f"+{term}*" for term in long_terms)
+    rank = RawSQL(
+        f"MATCH ({column}) AGAINST (%s IN BOOLEAN MODE)",
+        [boolean_query],
+        output_field=FloatField(),
+    )
+    return queryset.annotate(search_rank=rank).filter(search_rank__gt=0)
+
+
+def _fallback_search(queryset, terms):
+    scores = _get_inverted_index(queryset.model).search(terms)
+    if scores:
+        # The index covers every row; keep the ones this queryset may return
+        visible = set(queryset.order_by().values_list("pk", flat=True))
+        scores = {pk: score for pk, score in scores.items() if pk in visible}
+    if not scores:
+        return queryset.none().annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+
+    best = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    best = best[:MAX_FALLBACK_RESULTS]
+    rank = Case(
+        *[When(pk=pk, then=Value(score)) for pk, score in best],
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    return queryset.filter(pk__in=[pk for pk, _ in best]).annotate(search_rank=rank)
+
+
+def search_queryset(queryset, query):
+    """
+    Filter ``queryset`` to rows matching every word of ``query`` (as a prefix)
+    and annotate ``search_rank`` (higher is more relevant).
+    """
+    terms = tokenize(query)
+    if not terms:
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    if uses_fulltext():
+        return _fulltext_search(queryset, terms)
+    return _fallback_search(queryset, terms)
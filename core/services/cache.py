@@ -0,0 +1,99 @@
+# core/services/cache.py
+"""
+Whether a cache is shared by every process, and table versions built on it.
+
+LocMemCache (the default here) is private to one process: the web workers
+and the Celery worker each have their own copy, so anything another process
+must see (counters, invalidation versions, rebuilt summaries) only works
+when the cache is Redis or Memcached.
+"""
+import logging
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+
+logger = logging.getLogger(__name__)
+
+SHARED_CACHE_BACKENDS = (
+    "django.core.cache.backends.redis.RedisCache",
+    "django.core.cache.backends.memcached.PyMemcacheCache",
+    "django.core.cache.backends.memcached.PyLibMCCache",
+    "django_redis.cache.RedisCache",
+)
+
+# Configuration with defaults
+MODEL_VERSION_LOCAL_TTL = getattr(settings, "MODEL_VERSION_LOCAL_TTL", 5)
+
+
+def is_shared_cache(alias="default"):
+    """True when every process (web and Celery workers) sees the same cache"""
+    backend = settings.CACHES.get(alias, {}).get("BACKEND", "")
+    return backend in SHARED_CACHE_BACKENDS
+
+
+class ModelVersion:
+    """
+    Version of a model's rows that every worker agrees on, for keying caches.
+
+    With a shared cache it is a counter that writers bump after commit, so
+    reading it is a single cache get. Otherwise it is derived from the table
+    (row count plus the latest ``updated_at``, one aggregate query) and kept
+    in process memory for ``local_ttl`` seconds: bumps made by this process
+    apply at once, writes made by other workers are seen within the TTL.
+    Writes that bypass ``auto_now`` must set ``updated_at`` themselves.
+    """
+
+    def __init__(self, key, model_label, local_ttl=None):
+        self.key = key
+        self.model_label = model_label
+        self.local_ttl = MODEL_VERSION_LOCAL_TTL if local_ttl is None else local_ttl
+        # (version, expires_at) of the table-derived version
+        self._local = None
+
+    def _from_table(self):
+        model = apps.get_model(self.model_label)
+        state = model.objects.order_by().aggregate(
+            count=Count("pk"), changed=Max("updated_at")
+        )
+        # A delete changes the count, any other write moves updated_at
+        changed = state["changed"]
+        changed = int(changed.timestamp() * 1000000) if changed else 0
+        return f"{state['count']}-{changed}"
+
+    def get(self):
+        if is_shared_cache():
+            version = cache.get(self.key)
+            if version is None:
+                # Start from the clock, so versions from before an eviction never return
+                cache.add(self.key, int(time.time() * 1000), None)
+                version = cache.get(self.key, 0)
+            return version
+
+        now = time.monotonic()
+        local = self._local
+        if local is not None and local[1] > now:
+            return local[0]
+        version = self._from_table()
+        self._local = (version, now + self.local_ttl)
+        return version
+
+    def _bump(self):
+        self._local = None
+        if not is_shared_cache():
+            return
+        try:
+            cache.add(self.key, int(time.time() * 1000), None)
+            cache.incr(self.key)
+        except ValueError:
+            # Key evicted between add and incr
+            cache.set(self.key, int(time.time() * 1000), None)
+        except Exception as e:
+            logger.error(f"Could not bump {self.key}: {str(e)}")
+
+    def bump(self):
+        """Make the current version stale once the transaction commits"""
+        transaction.on_commit(self._bump)
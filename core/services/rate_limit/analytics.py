@@ -0,0 +1,130 @@
+# core/services/rate_limit/analytics.py
+"""
+Rate limit analytics: who is sending the most traffic, who is being
+blocked, and on which paths.
+
+Heavy hitters are tracked with the Space-Saving algorithm: at most
+``capacity`` keys are kept; a new key replaces the smallest one and
+inherits its count as an error bound. Any key whose real count is above
+total / capacity is guaranteed to be in the summary, so the top-N is exact
+for real offenders while memory stays bounded no matter how many distinct
+clients or paths are seen.
+
+Summaries are per process. Prometheus counters (by tier, endpoint and
+outcome) are aggregated across workers by the Prometheus server, or by
+prometheus_client's multiprocess mode when PROMETHEUS_MULTIPROC_DIR is set.
+"""
+import heapq
+import threading
+import time
+
+from prometheus_client import Counter
+
+REQUESTS_TOTAL = Counter(
+    "rate_limit_requests_total",
+    "Requests checked by RateLimitMiddleware",
+    ["tier", "endpoint", "outcome"],
+)
+
+
+class SpaceSaving:
+    """Top-k heavy hitters of a stream in O(capacity) memory"""
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.total = 0
+        self._counts = {}
+        self._errors = {}
+        # Lazy min-heap: one (count, key) entry per key, possibly stale
+        self._heap = []
+        self._lock = threading.Lock()
+
+    def add(self, key, amount=1):
+        with self._lock:
+            self.total += amount
+            if key in self._counts:
+                self._counts[key] += amount
+                return
+
+            error = 0
+            if len(self._counts) >= self.capacity:
+                error = self._evict_min()
+            self._counts[key] = error + amount
+            self._errors[key] = error
+            heapq.heappush(self._heap, (self._counts[key], key))
+
+    def _evict_min(self):
+        """Remove the key with the smallest count and return that count"""
+        while True:
+            count, key = heapq.heappop(self._heap)
+            current = self._counts[key]
+            if current == count:
+                del self._counts[key]
+                del self._errors[key]
+                return count
+            # Counted since it was pushed; put it back with its real count
+            heapq.heappush(self._heap, (current, key))
+
+    def top(self, n=20):
+        """[(key, count, error)] of the n largest keys; count - error <= real"""
+        with self._lock:
+            items = heapq.nlargest(n, self._counts.items(), key=lambda item: item[1])
+            return [(key, count, self._errors[key]) for key, count in items]
+
+    def clear(self):
+        with self._lock:
+            self.total = 0
+            self._counts.clear()
+            self._errors.clear()
+            self._heap.clear()
+
+
+class RateLimitAnalytics:
+    """Heavy-hitter summaries and Prometheus counters for rate limiting"""
+
+    def __init__(self, capacity=1000):
+        self.clients = SpaceSaving(capacity)
+        self.blocked_clients = SpaceSaving(capacity)
+        self.paths = SpaceSaving(capacity)
+        self.blocked_paths = SpaceSaving(capacity)
+        self.started_at = time.time()
+
+    def record(self, identifier, path, tier, endpoint, blocked):
+        """Count one checked request; ``endpoint`` is a configured pattern"""
+        REQUESTS_TOTAL.labels(
+            tier=tier,
+            endpoint=endpoint or "default",
+            outcome="blocked" if blocked else "allowed",
+        ).inc()
+
+        self.clients.add(identifier)
+        self.paths.add(path)
+        if blocked:
+            self.blocked_clients.add(identifier)
+            self.blocked_paths.add(path)
+
+    def summary(self, n=20):
+        """Top-n clients and paths, overall and blocked"""
+        blocked_total = self.blocked_clients.total
+        return {
+            "since": self.started_at,
+            "total_requests": self.clients.total,
+            "blocked_requests": blocked_total,
+            "block_rate": blocked_total / self.clients.total
+            if self.clients.total
+            else 0.0,
+            "top_clients": self.clients.top(n),
+            "top_blocked_clients": self.blocked_clients.top(n),
+            "top_paths": self.paths.top(n),
+            "top_blocked_paths": self.blocked_paths.top(n),
+        }
+
+    def reset(self):
+        for sketch in (
+            self.clients,
+            self.blocked_clients,
+            self.paths,
+            self.blocked_paths,
+        ):
+            sketch.clear()
+        self.started_at = time.time()
@@ -0,0 +1,290 @@
+# core/services/rate_limit/backends.py
+import logging
+import queue
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+
+from core.services.rate_limit.sliding_window import WindowCount
+
+logger = logging.getLogger(__name__)
+
+
+def window_bounds(now, window):
+    """(index, start) of the fixed window containing ``now``"""
+    index = int(now // window)
+    return index, index * window
+
+
+class RateLimitBackend(ABC):
+    """Abstract base class for rate limit counter stores"""
+
+    @abstractmethod
+    def hit_many(self, items, amounts=None):
+        """
+        Count requests for each (key, window) - one each, or ``amounts`` -
+        and return a WindowCount per item with the current (these requests
+        included) and previous window counters.
+        """
+        pass
+
+    @abstractmethod
+    def release_many(self, items, counts, amounts=None):
+        """Take back requests counted by ``hit_many`` (rejected or unused)"""
+        pass
+
+    def hit(self, key, window, amount=1):
+        return self.hit_many([(key, window)], [amount])[0]
+
+
+class CacheRateLimitBackend(RateLimitBackend):
+    """
+    Sliding-window counters on a Django cache.
+
+    The window index is part of the key, so a counter never has to be reset:
+    a new window simply starts a new key, and the previous window's key is
+    kept one more window for the sliding estimate. Counting uses the cache's
+    atomic ``incr``; ``add`` creates the key for the first request of a
+    window, so concurrent requests can never lose updates. On Django's Redis
+    cache every counter of a request is updated and read in one pipelined
+    round-trip.
+    """
+
+    def __init__(self, cache_alias="default"):
+        self.cache_alias = cache_alias
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def _incr(self, key, timeout, amount=1):
+        cache = self.cache
+        try:
+            return cache.incr(key, amount)
+        except ValueError:
+            # First request of the window
+            if cache.add(key, amount, timeout):
+                return amount
+            # Another request created it in between
+            return cache.incr(key, amount)
+
+    def _redis_client(self):
+        """Raw client of Django's built-in Redis cache, or None"""
+        cache = self.cache
+        if isinstance(cache, RedisCache):
+            return cache._cache.get_client(write=True)
+        return None
+
+    def hit_many(self, items, amounts=None):
+        now = time.time()
+        amounts = amounts or [1] * len(items)
+        client = self._redis_client()
+        if client is not None:
+            return self._redis_hit_many(client, items, amounts, now)
+
+        cache = self.cache
+        counts = []
+        previous_keys = []
+        for (key, window), amount in zip(items, amounts):
+            index, _ = window_bounds(now, window)
+            counts.append(self._incr(f"{key}:{index}", window * 2 + 1, amount))
+            previous_keys.append(f"{key}:{index - 1}")
+        previous = cache.get_many(previous_keys)
+
+        return [
+            WindowCount(
+                current=current,
+                previous=previous.get(previous_key, 0),
+                window=window,
+                window_start=window_bounds(now, window)[1],
+                now=now,
+            )
+            for (key, window), current, previous_key in zip(
+                items, counts, previous_keys
+            )
+        ]
+
+    def _redis_hit_many(self, client, items, amounts, now):
+        cache = self.cache
+        pipeline = client.pipeline(transaction=False)
+        for (key, window), amount in zip(items, amounts):
+            index, _ = window_bounds(now, window)
+            current_key = cache.make_and_validate_key(f"{key}:{index}")
+            # SET NX gives the counter its expiry only when it is created
+            pipeline.set(current_key, 0, ex=window * 2 + 1, nx=True)
+            pipeline.incr(current_key, amount)
+            pipeline.get(cache.make_and_validate_key(f"{key}:{index - 1}"))
+        replies = pipeline.execute()
+
+        return [
+            WindowCount(
+                current=int(replies[position * 3 + 1]),
+                previous=int(replies[position * 3 + 2] or 0),
+                window=window,
+                window_start=window_bounds(now, window)[1],
+                now=now,
+            )
+            for position, (key, window) in enumerate(items)
+        ]
+
+    def release_many(self, items, counts, amounts=None):
+        amounts = amounts or [1] * len(items)
+        for (key, window), count, amount in zip(items, counts, amounts):
+            if amount <= 0:
+                continue
+            index = int(count.window_start // window)
+            try:
+                self.cache.decr(f"{key}:{index}", amount)
+            except ValueError:
+                # Counter already expired; nothing to take back
+                pass
+
+
+class SqliteRateLimitBackend(RateLimitBackend):
+    """
+    Sliding-window counters in a SQLite file shared by every worker on the
+    host (single-host deploys without Redis).
+
+    Each request's counters are updated with an UPSERT ... RETURNING inside
+    one IMMEDIATE transaction, so concurrent workers serialize on the file
+    lock and never lose updates. WAL mode keeps the transactions short.
+    Connections are pooled per process; ``timeout`` bounds how long a call
+    may wait for the lock before it fails (and the circuit breaker takes
+    over).
+    """
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, path, timeout=0.05, pool_size=16):
+        self.path = str(path)
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._calls = 0
+
+    def _connect(self):
+        connection = sqlite3.connect(
+            self.path,
+            timeout=self.timeout,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_counters ("
+            "key TEXT PRIMARY KEY, count INTEGER NOT NULL, expires_at REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        try:
+            connection = self._pool.get_nowait()
+        except queue.Empty:
+            connection = self._connect()
+
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        except Exception:
+            # Do not return a connection in an unknown state to the pool
+            connection.close()
+            raise
+
+        try:
+            self._pool.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def hit_many(self, items, amounts=None):
+        now = time.time()
+        amounts = amounts or [1] * len(items)
+        counts = []
+        with self._transaction() as connection:
+            for (key, window), amount in zip(items, amounts):
+                index, start = window_bounds(now, window)
+                current = connection.execute(
+                    "INSERT INTO rate_limit_counters (key, count, expires_at) "
+                    "VALUES (?, ?, ?) ON CONFLICT(key) DO UPDATE "
+                    "SET count = count + excluded.count RETURNING count",
+                    (f"{key}:{index}", amount, now + window * 2 + 1),
+                ).fetchone()[0]
+                previous = connection.execute(
+                    "SELECT count FROM rate_limit_counters WHERE key = ?",
+                    (f"{key}:{index - 1}",),
+                ).fetchone()
+                counts.append(
+                    WindowCount(
+                        current=current,
+                        previous=previous[0] if previous else 0,
+                        window=window,
+                        window_start=start,
+                        now=now,
+                    )
+                )
+
+            self._calls += 1
+            if self._calls % self.PURGE_EVERY == 0:
+                connection.execute(
+                    "DELETE FROM rate_limit_counters WHERE expires_at < ?", (now,)
+                )
+        return counts
+
+    def release_many(self, items, counts, amounts=None):
+        amounts = amounts or [1] * len(items)
+        with self._transaction() as connection:
+            for (key, window), count, amount in zip(items, counts, amounts):
+                if amount <= 0:
+                    continue
+                index = int(count.window_start // window)
+                connection.execute(
+                    "UPDATE rate_limit_counters SET count = count - ? WHERE key = ?",
+                    (amount, f"{key}:{index}"),
+                )
+
+
+class FailoverRateLimitBackend(RateLimitBackend):
+    """
+    Shared store behind a circuit breaker, with a per-process fallback.
+
+    While the shared store is erroring or slow, requests are counted in the
+    fallback (local to the worker) instead, so an outage of the store never
+    becomes an outage of the site - limits just become per-worker until the
+    breaker closes again.
+    """
+
+    def __init__(self, primary, fallback, breaker):
+        self.primary = primary
+        self.fallback = fallback
+        self.breaker = breaker
+
+    def hit_many(self, items, amounts=None):
+        if self.breaker.allow_request():
+            start = time.monotonic()
+            try:
+                counts = self.primary.hit_many(items, amounts)
+            except Exception as e:
+                self.breaker.record_failure(reason=str(e))
+                logger.warning(f"Shared rate limit store failed: {str(e)}")
+            else:
+                self.breaker.record_success(time.monotonic() - start)
+                return counts
+        return self.fallback.hit_many(items, amounts)
+
+    def release_many(self, items, counts, amounts=None):
+        # Counts taken while the breaker was open live in the fallback
+        backend = self.primary if self.breaker.closed else self.fallback
+        try:
+            backend.release_many(items, counts, amounts)
+        except Exception as e:
+            logger.warning(f"Could not release rate limit counters: {str(e)}")
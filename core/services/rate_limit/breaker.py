@@ -0,0 +1,80 @@
+# core/services/rate_limit/breaker.py
+"""
+Circuit breaker for the shared rate limit store.
+
+CLOSED: calls go to the shared store. After ``failure_threshold`` failures
+in a row (errors, or calls slower than ``slow_call_threshold`` seconds) the
+breaker OPENs and callers use their fallback without touching the store.
+After ``reset_timeout`` seconds one probe call is let through (HALF_OPEN);
+its outcome closes or re-opens the breaker.
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(
+        self, name, failure_threshold=5, reset_timeout=30, slow_call_threshold=0.1
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call_threshold = slow_call_threshold
+
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def closed(self):
+        return self.state == CLOSED
+
+    def allow_request(self):
+        """Whether the next call may go to the protected store"""
+        if self.state == CLOSED:
+            return True
+        with self._lock:
+            if (
+                self.state == OPEN
+                and time.monotonic() - self._opened_at >= self.reset_timeout
+            ):
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN and not self._probing:
+                # Only one probe at a time; everyone else keeps falling back
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self, duration=0.0):
+        if duration > self.slow_call_threshold:
+            self.record_failure(reason=f"slow call ({duration * 1000:.0f} ms)")
+            return
+        if self.state == CLOSED and not self._failures:
+            return
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info(f"Circuit {self.name} closed")
+            self.state = CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self, reason=""):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or (
+                self.state == CLOSED and self._failures >= self.failure_threshold
+            ):
+                logger.warning(f"Circuit {self.name} opened: {reason}")
+                self.state = OPEN
+                self._opened_at = time.monotonic()
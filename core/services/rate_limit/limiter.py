@@ -0,0 +1,56 @@
+# core/services/rate_limit/limiter.py
+import math
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Decision:
+    """Outcome of checking one RateLimit for a request"""
+
+    limit: object  # policies.RateLimit
+    allowed: bool
+    current: int
+    remaining: int
+    reset_at: float
+    retry_after: float = 0.0
+
+
+class SharedRateLimiter:
+    """Every request checked against the shared backend (exact)"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def hit(self, limits):
+        """(decisions, counts) for one request, without taking anything back"""
+        counts = self.backend.hit_many([(limit.key, limit.window) for limit in limits])
+
+        decisions = []
+        for limit, count in zip(limits, counts):
+            allowed = count.is_allowed(limit.requests)
+            decisions.append(
+                Decision(
+                    limit=limit,
+                    allowed=allowed,
+                    current=math.ceil(count.estimate()),
+                    remaining=count.remaining(limit.requests),
+                    reset_at=count.reset_at(),
+                    retry_after=0.0 if allowed else count.retry_after(limit.requests),
+                )
+            )
+
+        return decisions, counts
+
+    def release(self, limits, counts):
+        """Take back a request counted by hit()"""
+        self.backend.release_many(
+            [(limit.key, limit.window) for limit in limits], counts
+        )
+
+    def check(self, limits, release_rejected=True):
+        """One Decision per limit; rejected requests are taken back"""
+        decisions, counts = self.hit(limits)
+        if release_rejected and not all(decision.allowed for decision in decisions):
+            # Rejected requests do not use up the client's budget
+            self.release(limits, counts)
+        return decisions
@@ -0,0 +1,279 @@
+# core/services/rate_limit/local.py
+"""
+In-process token-bucket tier in front of the shared rate limit store.
+
+Instead of one shared-store round-trip per request, a worker leases a batch
+of tokens for a key (counting the whole batch in the shared sliding window
+at once) and spends them locally under a lock. When a bucket runs low, the
+next batch is leased by a background thread, so clients far under their
+limit are checked without any I/O.
+
+Accuracy: at most one batch per worker and key can be leased but unused, so
+the error is bounded by ``error_margin`` of the limit per worker. Limits
+smaller than ``1 / error_margin`` (e.g. login endpoints) are always checked
+exactly against the shared store. Buckets are kept in an LRU of at most
+``max_keys`` entries.
+"""
+import dataclasses
+import logging
+import math
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from core.services.rate_limit.backends import window_bounds
+from core.services.rate_limit.limiter import Decision, SharedRateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class _Bucket:
+    """Tokens leased for one key in one window"""
+
+    __slots__ = (
+        "window_index",
+        "tokens",
+        "count",
+        "shared_estimate",
+        "refilling",
+        "retry_at",
+    )
+
+    def __init__(self, window_index, tokens, count, shared_estimate):
+        self.window_index = window_index
+        self.tokens = tokens
+        self.count = count  # WindowCount of the latest lease
+        self.shared_estimate = shared_estimate
+        self.refilling = False
+        self.retry_at = 0.0  # shared count full until then: do not lease
+
+    def exhausted(self, now):
+        return now < self.retry_at
+
+
+class LocalTokenBucketLimiter:
+    """Two-tier limiter: local leased buckets, shared store behind them"""
+
+    def __init__(
+        self,
+        backend,
+        error_margin=0.05,
+        max_keys=10000,
+        low_water=0.25,
+        background=True,
+    ):
+        self.backend = backend
+        self.shared = SharedRateLimiter(backend)
+        self.error_margin = error_margin
+        self.max_keys = max_keys
+        self.low_water = low_water
+        self.background = background
+
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = None
+
+    # -- leasing ---------------------------------------------------------
+
+    def batch_size(self, limit):
+        return max(1, int(limit.requests * self.error_margin))
+
+    def _lease(self, limit, size):
+        """
+        Count ``size`` requests in the shared store and keep the part that
+        fits under the limit. Returns (count, granted).
+        """
+        count = self.backend.hit(limit.key, limit.window, size)
+        fits = math.floor(limit.requests - (count.estimate() - size))
+        granted = max(0, min(size, fits))
+        if granted < size:
+            self.backend.release_many(
+                [(limit.key, limit.window)], [count], [size - granted]
+            )
+        return count, granted
+
+    def _store_lease(self, limit, count, granted, size, jobs):
+        """Merge a lease into the key's bucket (caller holds the lock)"""
+        index = int(count.window_start // limit.window)
+        shared_estimate = count.estimate() - (size - granted)
+        bucket = self._buckets.get(limit.key)
+        if bucket is not None and bucket.window_index == index:
+            bucket.tokens += granted
+            bucket.count = count
+            bucket.shared_estimate = shared_estimate
+        else:
+            if bucket is not None:
+                self._release_unused(limit, bucket, jobs)
+            bucket = _Bucket(index, granted, count, shared_estimate)
+            self._buckets[limit.key] = bucket
+        bucket.refilling = False
+        bucket.retry_at = self._full_until(limit, count, size - granted)
+        self._buckets.move_to_end(limit.key)
+        while len(self._buckets) > self.max_keys:
+            # Unused tokens of evicted keys stay counted: within the margin
+            self._buckets.popitem(last=False)
+        return bucket
+
+    def _full_until(self, limit, count, returned):
+        """Time one more request fits in the shared count (0.0: it fits now)"""
+        probe = dataclasses.replace(count, current=count.current - returned + 1)
+        if probe.is_allowed(limit.requests):
+            return 0.0
+        return count.now + probe.retry_after(limit.requests)
+
+    def _release_unused(self, limit, bucket, jobs):
+        """Give back tokens of a bucket whose window has passed"""
+        if bucket.tokens > 0:
+            jobs.append(("release", limit, bucket.count, bucket.tokens))
+            bucket.tokens = 0
+
+    # -- background refills ----------------------------------------------
+
+    def _dispatch(self, jobs):
+        """Run refill/release jobs; never called with the lock held"""
+        if not jobs:
+            return
+        if not self.background:
+            for job in jobs:
+                self._run(job)
+            return
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(
+                target=self._work, name="rate-limit-lease", daemon=True
+            )
+            self._worker.start()
+        for job in jobs:
+            self._queue.put(job)
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._run(job)
+            except Exception as e:
+                logger.error(f"Rate limit lease error: {str(e)}")
+                if job[0] == "refill":
+                    with self._lock:
+                        bucket = self._buckets.get(job[1].key)
+                        if bucket is not None:
+                            bucket.refilling = False
+
+    def _run(self, job):
+        action, limit = job[0], job[1]
+        if action == "release":
+            _, _, count, tokens = job
+            self.backend.release_many(
+                [(limit.key, limit.window)], [count], [tokens]
+            )
+            return
+
+        size = self.batch_size(limit)
+        count, granted = self._lease(limit, size)
+        jobs = []
+        with self._lock:
+            self._store_lease(limit, count, granted, size, jobs)
+        self._dispatch(jobs)
+
+    # -- checking --------------------------------------------------------
+
+    def _decision(self, limit, bucket, allowed):
+        estimate = bucket.shared_estimate - bucket.tokens
+        retry_after = 0.0
+        if not allowed:
+            # As if this request had been counted on top of the spent lease
+            rejected = dataclasses.replace(
+                bucket.count, current=bucket.count.current + 1, now=time.time()
+            )
+            retry_after = rejected.retry_after(limit.requests)
+        return Decision(
+            limit=limit,
+            allowed=allowed,
+            current=math.ceil(estimate),
+            remaining=max(0, math.floor(limit.requests - estimate)),
+            reset_at=bucket.count.reset_at(),
+            retry_after=retry_after,
+        )
+
+    def _take(self, limit, index, now, jobs):
+        """
+        Spend a local token (caller holds the lock). Returns (bucket, allowed);
+        bucket is None when a lease is needed.
+        """
+        bucket = self._buckets.get(limit.key)
+        if bucket is None:
+            return None, False
+        if bucket.window_index != index:
+            self._release_unused(limit, bucket, jobs)
+            del self._buckets[limit.key]
+            return None, False
+        if bucket.tokens <= 0:
+            if bucket.exhausted(now):
+                # Leasing now would only be handed back
+                return bucket, False
+            return None, False
+
+        bucket.tokens -= 1
+        self._buckets.move_to_end(limit.key)
+        if (
+            not bucket.refilling
+            and not bucket.exhausted(now)
+            and bucket.tokens <= self.batch_size(limit) * self.low_water
+        ):
+            bucket.refilling = True
+            jobs.append(("refill", limit))
+        return bucket, True
+
+    def _check_one(self, limit, now):
+        index, _ = window_bounds(now, limit.window)
+        jobs = []
+        with self._lock:
+            bucket, allowed = self._take(limit, index, now, jobs)
+            if bucket is not None:
+                decision = self._decision(limit, bucket, allowed)
+        self._dispatch(jobs)
+        if bucket is not None:
+            return decision, bucket if allowed else None
+
+        # Bucket empty: lease synchronously
+        size = self.batch_size(limit)
+        count, granted = self._lease(limit, size)
+        jobs = []
+        with self._lock:
+            bucket = self._store_lease(limit, count, granted, size, jobs)
+            if bucket.tokens > 0:
+                bucket.tokens -= 1
+                result = self._decision(limit, bucket, True), bucket
+            else:
+                result = self._decision(limit, bucket, False), None
+        self._dispatch(jobs)
+        return result
+
+    def check(self, limits, release_rejected=True):
+        """One Decision per limit, like SharedRateLimiter.check"""
+        exact = [limit for limit in limits if self.batch_size(limit) <= 1]
+        # Released below once every limit (local ones included) has decided
+        exact_decisions, exact_counts = self.shared.hit(exact) if exact else ([], [])
+        exact_decisions = iter(exact_decisions)
+
+        now = time.time()
+        decisions = []
+        spent = []
+        for limit in limits:
+            if self.batch_size(limit) <= 1:
+                decisions.append(next(exact_decisions))
+                continue
+            decision, bucket = self._check_one(limit, now)
+            decisions.append(decision)
+            if bucket is not None:
+                spent.append(bucket)
+
+        if release_rejected and not all(decision.allowed for decision in decisions):
+            # Rejected requests do not use up the client's budget
+            if exact:
+                self.shared.release(exact, exact_counts)
+            with self._lock:
+                for bucket in spent:
+                    bucket.tokens += 1
+        return decisions
@@ -0,0 +1,134 @@
+# core/services/rate_limit/policies.py
+"""
+Rate limit policies: per-tier limits (RATE_LIMIT_TIERS) plus per-endpoint
+limits (RATE_LIMIT_ENDPOINTS). An endpoint limit with ``"exclusive": True``
+replaces the tier limit instead of adding to it, for endpoints whose
+requests should not use up the browsing budget (e.g. upload chunks); one
+with ``"methods": [...]`` only counts requests of those methods, so e.g.
+showing the login form is browsing and submitting it is a login attempt.
+
+All endpoint patterns are compiled once into a single alternation with one
+named group per pattern, so matching a path is one regex call no matter how
+many endpoints are configured. The tier comes from ``is_staff`` and the
+``user_type_id`` already loaded on ``request.user``, whose slug is read
+from the user type's permission snapshot, so no query is made per request.
+"""
+import logging
+import re
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """One limit applied to a request"""
+
+    scope: str  # "tier:<name>" or "endpoint:<pattern>"
+    key: str
+    requests: int
+    window: int
+
+
+class EndpointMatcher:
+    """All endpoint regexes compiled into one alternation"""
+
+    def __init__(self, endpoints):
+        self.patterns = list(endpoints)
+        self.limits = [endpoints[pattern] for pattern in self.patterns]
+        self.regex = None
+        if self.patterns:
+            self.regex = re.compile(
+                "|".join(
+                    f"(?P<e{index}>{pattern})"
+                    for index, pattern in enumerate(self.patterns)
+                )
+            )
+
+    def match(self, path):
+        """(index, pattern, limit) of the first configured pattern matching path"""
+        if self.regex is None:
+            return None
+        match = self.regex.search(path)
+        if match is None:
+            return None
+        # Alternatives are tried in config order, so the first listed pattern wins
+        index = int(match.lastgroup[1:])
+        return index, self.patterns[index], self.limits[index]
+
+
+class UserTypeTierMap:
+    """user_type_id -> tier name, through the user type's permission snapshot
+
+    Snapshots are invalidated with the user type (and expire from process
+    memory within seconds), so a changed slug moves users to their new tier
+    on every worker without a map of its own to refresh.
+    """
+
+    def __init__(self, slug_tiers):
+        self.slug_tiers = slug_tiers
+
+    def get(self, user_type_id):
+        if not user_type_id or not self.slug_tiers:
+            return None
+        from users.utils.permissions import get_permission_snapshot
+
+        try:
+            slug = get_permission_snapshot(user_type_id).slug
+        except Exception as e:
+            logger.error(f"Could not load user type tier: {str(e)}")
+            return None
+        return self.slug_tiers.get(slug)
+
+
+class PolicyEngine:
+    """Resolve the limits that apply to a request"""
+
+    def __init__(self, tiers, endpoints, user_type_tiers, default_limit):
+        self.tiers = tiers
+        self.default_limit = default_limit
+        self.endpoints = EndpointMatcher(endpoints)
+        self.user_type_tiers = UserTypeTierMap(user_type_tiers)
+
+    def resolve_tier(self, user):
+        """Tier name of a (possibly anonymous) user without extra queries"""
+        if user is None or not getattr(user, "is_authenticated", False):
+            return "anonymous"
+        if getattr(user, "is_staff", False):
+            return "staff"
+        return self.user_type_tiers.get(getattr(user, "user_type_id", None)) or (
+            "authenticated"
+        )
+
+    def get_limits(self, request, identifier):
+        """(tier, limits): every RateLimit that applies, tier limit (if any) first"""
+        tier = self.resolve_tier(getattr(request, "user", None))
+        tier_limit = self.tiers.get(tier) or self.default_limit
+
+        limits = []
+        endpoint = self.endpoints.match(request.path)
+        if endpoint is not None and request.method not in endpoint[2].get(
+            "methods", (request.method,)
+        ):
+            endpoint = None
+        if endpoint is None or not endpoint[2].get("exclusive"):
+            limits.append(
+                RateLimit(
+                    scope=f"tier:{tier}",
+                    key=f"rl:{identifier}",
+                    requests=tier_limit["requests"],
+                    window=tier_limit["window"],
+                )
+            )
+
+        if endpoint is not None:
+            index, pattern, endpoint_limit = endpoint
+            limits.append(
+                RateLimit(
+                    scope=f"endpoint:{pattern}",
+                    key=f"rl:{identifier}:e{index}",
+                    requests=endpoint_limit["requests"],
+                    window=endpoint_limit["window"],
+                )
+            )
+        return tier, limits
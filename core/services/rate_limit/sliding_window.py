@@ -0,0 +1,70 @@
+# core/services/rate_limit/sliding_window.py
+"""
+Sliding-window counter.
+
+Each key keeps two fixed-window counters: the current window and the one
+before it. The number of requests in the last ``window`` seconds is
+estimated by weighting the previous counter by the part of it that still
+overlaps the sliding window:
+
+    estimate = previous * (window - elapsed) / window + current
+
+This removes the 2x burst a fixed window allows across its boundary while
+keeping O(1) memory (two integers) per client.
+"""
+import math
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class WindowCount:
+    """Counters of one key, as read while counting a request"""
+
+    current: int
+    previous: int
+    window: int
+    window_start: float
+    now: float
+
+    @property
+    def elapsed(self):
+        return self.now - self.window_start
+
+    def estimate(self):
+        """Requests in the last ``window`` seconds, this request included"""
+        weight = max(0.0, (self.window - self.elapsed) / self.window)
+        return self.previous * weight + self.current
+
+    def is_allowed(self, limit):
+        return self.estimate() <= limit
+
+    def remaining(self, limit):
+        return max(0, math.floor(limit - self.estimate()))
+
+    def reset_at(self):
+        """Unix time the current window ends and its counter starts to decay"""
+        return self.window_start + self.window
+
+    def retry_after(self, limit):
+        """
+        Seconds until one more request fits under ``limit``, assuming the
+        client sends nothing in the meantime (the rejected request is not
+        counted).
+        """
+        if limit < 1:
+            return float(self.window * 2)
+
+        current = self.current - 1  # this request was rejected
+        budget = limit - 1 - current
+        if budget >= 0:
+            # Wait for the previous window's share to decay enough
+            if self.previous <= budget:
+                return 0.0
+            needed = self.window * (1 - budget / self.previous)
+            return max(0.0, needed - self.elapsed)
+
+        # The current window alone is over the limit: wait for the next
+        # window, then for this window's share to decay
+        next_window_in = self.window - self.elapsed
+        needed = self.window * (1 - (limit - 1) / current)
+        return next_window_in + max(0.0, needed)
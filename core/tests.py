@@ -0,0 +1,393 @@
+import os
+import tempfile
+import threading
+import time
+import uuid
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+
+from core.middleware import rate_limit
+from core.services.rate_limit.analytics import SpaceSaving
+from core.services.rate_limit.backends import (
+    CacheRateLimitBackend,
+    FailoverRateLimitBackend,
+    SqliteRateLimitBackend,
+)
+from core.services.rate_limit.breaker import CircuitBreaker
+from core.services.rate_limit.limiter import SharedRateLimiter
+from core.services.rate_limit.local import LocalTokenBucketLimiter
+from core.services.rate_limit.policies import PolicyEngine, RateLimit
+from core.services.rate_limit.sliding_window import WindowCount
+from core.views import metrics_view
+from users.utils import permissions
+from users.utils.permissions import PermissionSnapshot
+
+TEST_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "rate-limit-tests",
+    }
+}
+
+
+def hammer(target, threads=16, calls_per_thread=200):
+    """Run ``target`` concurrently from many threads and collect results"""
+    results = []
+    lock = threading.Lock()
+    start = threading.Barrier(threads)
+
+    def worker():
+        start.wait()
+        local_results = [target() for _ in range(calls_per_thread)]
+        with lock:
+            results.extend(local_results)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return results
+
+
+@override_settings(CACHES=TEST_CACHES)
+class CacheRateLimitBackendConcurrencyTests(SimpleTestCase):
+    def setUp(self):
+        self.backend = CacheRateLimitBackend()
+        self.backend.cache.clear()
+
+    def test_concurrent_hits_are_never_lost(self):
+        results = hammer(lambda: self.backend.hit("rl:test:counter", 3600).current)
+
+        self.assertEqual(len(results), 16 * 200)
+        # Every request saw a distinct count: no increment was lost
+        self.assertEqual(sorted(results), list(range(1, 16 * 200 + 1)))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class RateLimitMiddlewareConcurrencyTests(SimpleTestCase):
+    def setUp(self):
+        self.backend = CacheRateLimitBackend()
+        self.backend.cache.clear()
+        self.factory = RequestFactory()
+        self.middleware = rate_limit.RateLimitMiddleware(lambda request: None)
+
+    def test_limit_is_exact_under_concurrency(self):
+        limit = 100
+
+        def request_once():
+            request = self.factory.get("/files/", REMOTE_ADDR="203.0.113.7")
+            return self.middleware.process_request(request)
+
+        engine = PolicyEngine(
+            tiers={"anonymous": {"requests": limit, "window": 3600}},
+            endpoints={},
+            user_type_tiers={},
+            default_limit={"requests": limit, "window": 3600},
+        )
+        limiter = SharedRateLimiter(self.backend)
+        with mock.patch.object(rate_limit, "policy_engine", engine), mock.patch.object(
+            rate_limit, "rate_limiter", limiter
+        ):
+            responses = hammer(request_once, threads=16, calls_per_thread=20)
+
+        allowed = [response for response in responses if response is None]
+        blocked = [response for response in responses if response is not None]
+        self.assertEqual(len(allowed), limit)
+        self.assertEqual(len(blocked), 16 * 20 - limit)
+        self.assertTrue(all(response.status_code == 429 for response in blocked))
+
+
+class SqliteRateLimitBackendTests(SimpleTestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+        # Generous lock timeout: this test is about lost updates, not latency
+        self.backend = SqliteRateLimitBackend(self.path, timeout=5)
+
+    def test_concurrent_hits_are_never_lost(self):
+        results = hammer(
+            lambda: self.backend.hit("rl:test:counter", 3600).current,
+            threads=8,
+            calls_per_thread=50,
+        )
+
+        self.assertEqual(sorted(results), list(range(1, 8 * 50 + 1)))
+
+    def test_release_takes_back_counted_requests(self):
+        count = self.backend.hit("rl:test:release", 3600, amount=5)
+        self.backend.release_many([("rl:test:release", 3600)], [count], [3])
+
+        self.assertEqual(self.backend.hit("rl:test:release", 3600).current, 3)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class FailoverRateLimitBackendTests(SimpleTestCase):
+    def setUp(self):
+        self.fallback = CacheRateLimitBackend()
+        self.fallback.cache.clear()
+        self.primary = mock.Mock(spec=SqliteRateLimitBackend)
+        self.primary.hit_many.side_effect = OSError("store down")
+        self.breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=30)
+        self.backend = FailoverRateLimitBackend(
+            self.primary, self.fallback, self.breaker
+        )
+
+    def test_counts_locally_and_opens_circuit_when_store_is_down(self):
+        counts = [self.backend.hit("rl:test:failover", 3600) for _ in range(10)]
+
+        # Requests are still counted, in the per-process fallback
+        self.assertEqual([count.current for count in counts], list(range(1, 11)))
+        # After three failures the store is no longer called at all
+        self.assertEqual(self.primary.hit_many.call_count, 3)
+        self.assertFalse(self.breaker.closed)
+
+    def test_probe_closes_circuit_once_store_recovers(self):
+        for _ in range(3):
+            self.backend.hit("rl:test:failover", 3600)
+        self.primary.hit_many.side_effect = None
+        self.primary.hit_many.return_value = ["shared"]
+
+        with mock.patch(
+            "core.services.rate_limit.breaker.time.monotonic",
+            return_value=self.breaker._opened_at + 31,
+        ):
+            self.assertEqual(self.backend.hit("rl:test:failover", 3600), "shared")
+        self.assertTrue(self.breaker.closed)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class LocalTokenBucketLimiterTests(SimpleTestCase):
+    def setUp(self):
+        self.backend = CacheRateLimitBackend()
+        self.backend.cache.clear()
+        self.limit = RateLimit(scope="tier:test", key="rl:local", requests=100, window=3600)
+
+    def test_leases_batches_from_shared_store(self):
+        limiter = LocalTokenBucketLimiter(self.backend, background=False)
+        with mock.patch.object(
+            self.backend, "hit_many", wraps=self.backend.hit_many
+        ) as hit_many:
+            allowed = [limiter.check([self.limit])[0] for _ in range(100)]
+        # One shared-store round-trip per batch of 5 instead of per request
+        self.assertEqual(hit_many.call_count, 100 // 5)
+
+        # Exact in a single process: every leased token is spent
+        self.assertTrue(all(decision.allowed for decision in allowed))
+        self.assertEqual(allowed[-1].remaining, 0)
+        rejected = limiter.check([self.limit])[0]
+        self.assertFalse(rejected.allowed)
+        self.assertGreater(rejected.retry_after, 0)
+
+    def test_rejection_by_a_local_limit_releases_exact_limits(self):
+        limiter = LocalTokenBucketLimiter(self.backend, background=False)
+        login = RateLimit(scope="endpoint:0", key="rl:login", requests=10, window=300)
+        for _ in range(100):
+            limiter.check([self.limit])
+
+        # The tier limit is spent; login attempts must not burn the login budget
+        for _ in range(20):
+            tier, _ = limiter.check([self.limit, login])
+            self.assertFalse(tier.allowed)
+        count = self.backend.hit_many([(login.key, login.window)])[0]
+        self.assertEqual(count.current, 1)
+
+    def test_limit_is_never_exceeded_under_concurrency(self):
+        limiter = LocalTokenBucketLimiter(self.backend)
+        results = hammer(
+            lambda: limiter.check([self.limit])[0].allowed,
+            threads=16,
+            calls_per_thread=20,
+        )
+
+        allowed = results.count(True)
+        self.assertLessEqual(allowed, 100)
+        self.assertGreaterEqual(allowed, 100 - limiter.batch_size(self.limit))
+
+
+class PolicyEngineTests(SimpleTestCase):
+    def setUp(self):
+        self.engine = PolicyEngine(
+            tiers={
+                "anonymous": {"requests": 30, "window": 300},
+                "staff": {"requests": 300, "window": 300},
+            },
+            endpoints={
+                r"^/api/auth/": {"requests": 5, "window": 300},
+                r"^/api/upload/": {"requests": 10, "window": 600},
+                r"^/uploads/[0-9a-f-]+/parts/\d+/$": {
+                    "requests": 300,
+                    "window": 300,
+                    "exclusive": True,
+                },
+            },
+            user_type_tiers={},
+            default_limit={"requests": 60, "window": 300},
+        )
+        self.factory = RequestFactory()
+
+    def test_endpoint_limit_is_added_to_tier_limit(self):
+        request = self.factory.post("/api/auth/login/")
+        tier, limits = self.engine.get_limits(request, "ip:203.0.113.7")
+
+        self.assertEqual(tier, "anonymous")
+        self.assertEqual([limit.requests for limit in limits], [30, 5])
+        self.assertEqual(limits[1].scope, "endpoint:^/api/auth/")
+
+    def test_browsing_gets_only_tier_limit(self):
+        request = self.factory.get("/files/")
+        _, limits = self.engine.get_limits(request, "ip:203.0.113.7")
+
+        self.assertEqual(len(limits), 1)
+
+    def test_exclusive_endpoint_limit_replaces_tier_limit(self):
+        request = self.factory.put("/uploads/2f0c6a4e-1b2d/parts/65/")
+        _, limits = self.engine.get_limits(request, "ip:203.0.113.7")
+
+        self.assertEqual([limit.requests for limit in limits], [300])
+        self.assertTrue(limits[0].scope.startswith("endpoint:"))
+
+    def test_staff_tier_without_queries(self):
+        # SimpleTestCase fails on any database query
+        user = mock.Mock(is_authenticated=True, is_staff=True, user_type_id=7)
+        self.assertEqual(self.engine.resolve_tier(user), "staff")
+
+    @override_settings(CACHES=TEST_CACHES)
+    def test_user_type_tier_follows_the_snapshot_slug(self):
+        engine = PolicyEngine(
+            tiers={"premium": {"requests": 10, "window": 60}},
+            endpoints={},
+            user_type_tiers={"editor": "premium"},
+            default_limit={"requests": 5, "window": 60},
+        )
+        permissions._local_snapshots.clear()
+        self.addCleanup(permissions._local_snapshots.clear)
+        snapshot = PermissionSnapshot(user_type_id=7, slug="editor", is_active=True)
+        user = mock.Mock(is_authenticated=True, is_staff=False, user_type_id=7)
+        with mock.patch.object(permissions, "_load_snapshot", return_value=snapshot):
+            self.assertEqual(engine.resolve_tier(user), "premium")
+
+
+class ConfiguredEndpointLimitsTests(SimpleTestCase):
+    """RATE_LIMIT_ENDPOINTS against the project's real URLconf"""
+
+    def setUp(self):
+        self.engine = PolicyEngine(
+            tiers=settings.RATE_LIMIT_TIERS,
+            endpoints=settings.RATE_LIMIT_ENDPOINTS,
+            user_type_tiers={},
+            default_limit={"requests": 600, "window": 300},
+        )
+        self.factory = RequestFactory()
+
+    def get_limits(self, request):
+        return self.engine.get_limits(request, "ip:203.0.113.7")[1]
+
+    def test_login_submission_gets_endpoint_limit(self):
+        for name in ("users:login", "users:auth_login"):
+            limits = self.get_limits(self.factory.post(reverse(name)))
+            self.assertEqual(len(limits), 2, name)
+            self.assertEqual(limits[1].requests, 10)
+
+    def test_login_form_and_navigation_are_browsing(self):
+        for request in (
+            self.factory.get(reverse("users:login")),
+            self.factory.get(reverse("sections:api_navigation")),
+        ):
+            limits = self.get_limits(request)
+            self.assertEqual(len(limits), 1)
+            self.assertGreaterEqual(limits[0].requests, 300)
+
+    def test_uploads_get_endpoint_limit(self):
+        for name in ("filemanager:image_upload", "filemanager:document_upload"):
+            limits = self.get_limits(self.factory.post(reverse(name)))
+            self.assertEqual([limit.requests for limit in limits][1:], [10], name)
+
+    def test_chunk_parts_do_not_use_browsing_tier(self):
+        path = reverse("filemanager:chunked_upload_part", args=[uuid.uuid4(), 65])
+        limits = self.get_limits(self.factory.put(path))
+        self.assertEqual([limit.requests for limit in limits], [300])
+
+
+class SlidingWindowTests(SimpleTestCase):
+    def test_previous_window_is_weighted_by_overlap(self):
+        count = WindowCount(current=3, previous=10, window=100, window_start=0, now=30)
+
+        self.assertEqual(count.estimate(), 10)
+        self.assertTrue(count.is_allowed(10))
+
+    def test_no_double_burst_across_window_boundary(self):
+        # A full window right before the boundary still counts just after it
+        count = WindowCount(current=1, previous=10, window=100, window_start=100, now=101)
+
+        self.assertFalse(count.is_allowed(10))
+
+    def test_retry_after_waits_for_previous_window_to_decay(self):
+        count = WindowCount(current=4, previous=10, window=100, window_start=0, now=30)
+        retry_after = count.retry_after(10)
+
+        self.assertAlmostEqual(retry_after, 10)
+        # One request sent after retry_after fits exactly
+        later = WindowCount(
+            current=4, previous=10, window=100, window_start=0, now=30 + retry_after
+        )
+        self.assertTrue(later.is_allowed(10))
+
+    def test_retry_after_spans_into_next_window(self):
+        count = WindowCount(current=12, previous=0, window=100, window_start=0, now=50)
+        retry_after = count.retry_after(10)
+
+        self.assertGreater(retry_after, 50)
+        later = WindowCount(
+            current=1, previous=11, window=100, window_start=100, now=50 + retry_after
+        )
+        self.assertTrue(later.is_allowed(10))
+
+
+class SpaceSavingTests(SimpleTestCase):
+    def test_heavy_hitters_survive_in_bounded_memory(self):
+        sketch = SpaceSaving(capacity=50)
+        for i in range(5000):
+            sketch.add(f"ip:noise-{i}")
+            if i % 10 == 0:
+                sketch.add("ip:offender")
+            if i % 25 == 0:
+                sketch.add("ip:second")
+
+        top = sketch.top(2)
+        self.assertEqual(
+            [key for key, count, error in top], ["ip:offender", "ip:second"]
+        )
+        # Counts never under-estimate, and count - error never over-estimates
+        offender_count, offender_error = top[0][1], top[0][2]
+        self.assertGreaterEqual(offender_count, 500)
+        self.assertLessEqual(offender_count - offender_error, 500)
+        self.assertLessEqual(len(sketch._counts), 50)
+        self.assertEqual(sketch.total, 5000 + 500 + 200)
+
+
+class MetricsViewAccessTests(SimpleTestCase):
+    """/metrics/ must not trust the proxy's 127.0.0.1 client address"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def get(self, **extra):
+        request = self.factory.get("/metrics/", REMOTE_ADDR="127.0.0.1", **extra)
+        request.user = AnonymousUser()
+        return metrics_view(request)
+
+    @override_settings(METRICS_TOKEN="")
+    def test_local_address_alone_is_rejected(self):
+        self.assertEqual(self.get().status_code, 403)
+
+    @override_settings(METRICS_TOKEN="scrape-secret")
+    def test_bearer_token_is_required(self):
+        self.assertEqual(self.get(HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+        response = self.get(HTTP_AUTHORIZATION="Bearer scrape-secret")
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,41 @@
+import re
+
+# Arabic code points commonly typed instead of their Persian forms
+_CHARACTER_MAP = str.maketrans(
+    {
+        "ي": "ی",
+        "ى": "ی",
+        "ئ": "ی",
+        "ك": "ک",
+        "ة": "ه",
+        "أ": "ا",
+        "إ": "ا",
+        "ٱ": "ا",
+        "ؤ": "و",
+        # Persian and Arabic-Indic digits
+        **{chr(0x06F0 + i): str(i) for i in range(10)},
+        **{chr(0x0660 + i): str(i) for i in range(10)},
+        # ZWNJ / ZWJ: "می‌خواهم" and "میخواهم" are the same word
+        "\u200c": "",
+        "\u200d": "",
+        # Tatweel
+        "\u0640": "",
+    }
+)
+
+# Harakat and other combining marks
+_DIACRITICS_RE = re.compile("[\u064b-\u065f\u0670]")
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize_persian(text):
+    """یکسان‌سازی متن فارسی/عربی برای جستجو"""
+    if not text:
+        return ""
+    text = _DIACRITICS_RE.sub("", str(text).translate(_CHARACTER_MAP))
+    return " ".join(text.lower().split())
+
+
+def tokenize(text):
+    """تبدیل متن نرمال‌شده به کلمات"""
+    return _TOKEN_RE.findall(normalize_persian(text))
@@ -5,7 +5,9 @@ from .views import (
     test_email_view,
     test_email_configuration_view,
     send_bulk_email_view,
-    email_stats_view
+    email_stats_view,
+    rate_limit_analytics_view,
+    metrics_view,
 )
 
 app_name = 'core'
@@ -20,4 +22,8 @@ urlpatterns = [
 
     path("send-bulk-email/", send_bulk_email_view, name="send-bulk-email"),
     path("email-stats/", email_stats_view, name="email-stats"),
+
+    # Rate limiting analytics
+    path("rate-limit/analytics/", rate_limit_analytics_view, name="rate-limit-analytics"),
+    path("metrics/", metrics_view, name="metrics"),
 ]
\ No newline at end of file
@@ -1,5 +1,7 @@
 # core/views.py
+import hmac
 import logging
+import os
 
 from django.contrib.admin.views.decorators import staff_member_required
 from django.http import HttpResponse, JsonResponse
@@ -10,6 +12,13 @@ from django.views.decorators.http import require_http_methods
 from django.shortcuts import render
 from django.contrib.auth import get_user_model
 from django.contrib import messages
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    generate_latest,
+    multiprocess,
+)
 
 from core.services.email_service.email_service import EmailTestService, get_email_service
 from .managers.email_manager import get_email_manager, create_send_email_command
@@ -215,4 +224,67 @@ def email_stats_view(request):
         return JsonResponse({
             'status': 'error',
             'message': str(e)
-        }, status=500)
\ No newline at end of file
+        }, status=500)
+
+
+@staff_member_required
+@require_http_methods(["GET"])
+def rate_limit_analytics_view(request):
+    """Top clients and paths seen by the rate limiter
+
+    The summaries live in memory, so they only cover the requests served by
+    the worker answering this call; the response is labelled with its pid.
+    Cluster-wide totals are in the Prometheus counters at /metrics/.
+    """
+    from core.middleware.rate_limit import rate_limit_analytics
+
+    try:
+        top = min(max(int(request.GET.get('top', 20)), 1), 200)
+    except ValueError:
+        top = 20
+
+    summary = rate_limit_analytics.summary(top)
+
+    def rows(items, name):
+        return [
+            {name: key, 'count': count, 'guaranteed': count - error}
+            for key, count, error in items
+        ]
+
+    return JsonResponse({
+        'status': 'success',
+        'scope': 'worker',
+        'pid': os.getpid(),
+        'since': summary['since'],
+        'total_requests': summary['total_requests'],
+        'blocked_requests': summary['blocked_requests'],
+        'block_rate': round(summary['block_rate'], 4),
+        'top_clients': rows(summary['top_clients'], 'identifier'),
+        'top_blocked_clients': rows(summary['top_blocked_clients'], 'identifier'),
+        'top_paths': rows(summary['top_paths'], 'path'),
+        'top_blocked_paths': rows(summary['top_blocked_paths'], 'path'),
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+@require_http_methods(["GET"])
+def metrics_view(request):
+    """Prometheus metrics, for staff or scrapers sending METRICS_TOKEN
+
+    Behind the reverse proxy every request arrives from 127.0.0.1, so the
+    client address cannot be used to tell a local scraper from the internet.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    auth = request.META.get('HTTP_AUTHORIZATION', '')
+    scraper = bool(token) and auth.startswith('Bearer ') and hmac.compare_digest(
+        auth[len('Bearer '):].encode(), token.encode()
+    )
+    if not scraper and not request.user.is_staff:
+        return HttpResponse(status=403)
+
+    registry = REGISTRY
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        # One registry over the counters of every gunicorn worker
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
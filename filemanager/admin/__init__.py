@@ -1,3 +1,5 @@
 from .register.document_admin import *
+from .register.document_upload_session_admin import *
 from .register.image_gallery_admin import *
-from .register.image_upload_admin import *
\ No newline at end of file
+from .register.image_upload_admin import *
+from .register.user_storage_stats_admin import *
\ No newline at end of file
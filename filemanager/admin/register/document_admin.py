@@ -1,6 +1,21 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
 
 from filemanager.models import Document
+from filemanager.services.dashboard_summary import invalidate_dashboard_summary
+from filemanager.services.download_counter import (
+    discard_pending_downloads,
+    prefetch_pending_downloads,
+)
+from filemanager.services.storage_stats import refresh_user_storage_stats
+
+
+class DocumentChangeList(ChangeList):
+    def get_results(self, request):
+        super().get_results(request)
+        # One cache round-trip for the page's pending download counts
+        self.result_list = list(self.result_list)
+        prefetch_pending_downloads(self.result_list)
 
 
 @admin.register(Document)
@@ -11,7 +26,7 @@ class DocumentAdmin(admin.ModelAdmin):
         "uploaded_by",
         "uploaded_at",
         "is_active",
-        "download_count",
+        "get_total_download_count",
         "get_file_size_display",
     ]
     list_filter = ["uploaded_at", "is_active", "file_type", "uploaded_by"]
@@ -51,22 +66,32 @@ class DocumentAdmin(admin.ModelAdmin):
 
     actions = ["activate_documents", "deactivate_documents", "reset_download_count"]
 
+    def get_changelist(self, request, **kwargs):
+        return DocumentChangeList
+
     def activate_documents(self, request, queryset):
         """Activate selected documents"""
+        user_ids = set(queryset.values_list("uploaded_by_id", flat=True))
         count = queryset.update(is_active=True)
+        refresh_user_storage_stats(user_ids)
+        invalidate_dashboard_summary(user_ids)
         self.message_user(request, f"{count} سند فعال شد.")
 
     activate_documents.short_description = "فعال کردن اسناد انتخاب شده"
 
     def deactivate_documents(self, request, queryset):
         """Deactivate selected documents"""
+        user_ids = set(queryset.values_list("uploaded_by_id", flat=True))
         count = queryset.update(is_active=False)
+        refresh_user_storage_stats(user_ids)
+        invalidate_dashboard_summary(user_ids)
         self.message_user(request, f"{count} سند غیرفعال شد.")
 
     deactivate_documents.short_description = "غیرفعال کردن اسناد انتخاب شده"
 
     def reset_download_count(self, request, queryset):
         """Reset download count for selected documents"""
+        discard_pending_downloads(list(queryset.values_list("pk", flat=True)))
         count = queryset.update(download_count=0)
         self.message_user(request, f"تعداد دانلود {count} سند بازنشانی شد.")
 
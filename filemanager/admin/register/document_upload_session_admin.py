@@ -0,0 +1,30 @@
+from django.contrib import admin
+
+from filemanager.models import DocumentUploadSession
+
+
+@admin.register(DocumentUploadSession)
+class DocumentUploadSessionAdmin(admin.ModelAdmin):
+    list_display = [
+        "name",
+        "uploaded_by",
+        "status",
+        "total_size",
+        "total_chunks",
+        "created_at",
+        "updated_at",
+    ]
+    list_filter = ["status", "created_at"]
+    search_fields = ["name", "original_filename"]
+    readonly_fields = [
+        "token",
+        "file_name",
+        "upload_id",
+        "total_size",
+        "chunk_size",
+        "total_chunks",
+        "document",
+        "created_at",
+        "updated_at",
+    ]
+    list_per_page = 20
@@ -15,7 +15,7 @@ class ImageGalleryAdmin(admin.ModelAdmin):
     ]
     list_filter = ["created_at", "is_public", "created_by"]
     search_fields = ["name", "description"]
-    readonly_fields = ["created_at", "updated_at"]
+    readonly_fields = ["image_count", "total_bytes", "created_at", "updated_at"]
     filter_horizontal = ["images"]
     list_per_page = 20
 
@@ -24,7 +24,7 @@ class ImageGalleryAdmin(admin.ModelAdmin):
             "اطلاعات اصلی",
             {"fields": ("name", "description", "created_by", "is_public")},
         ),
-        ("تصاویر", {"fields": ("cover_image", "images")}),
+        ("تصاویر", {"fields": ("cover_image", "images", "image_count", "total_bytes")}),
         (
             "زمان‌بندی",
             {
@@ -2,6 +2,8 @@ from django.contrib import admin
 from django.utils.html import format_html
 
 from filemanager.models import ImageUpload
+from filemanager.services.dashboard_summary import invalidate_dashboard_summary
+from filemanager.services.storage_stats import refresh_user_storage_stats
 
 
 @admin.register(ImageUpload)
@@ -112,14 +114,20 @@ class ImageUploadAdmin(admin.ModelAdmin):
 
     def activate_images(self, request, queryset):
         """Activate selected images"""
+        user_ids = set(queryset.values_list("uploaded_by_id", flat=True))
         count = queryset.update(is_active=True)
+        refresh_user_storage_stats(user_ids)
+        invalidate_dashboard_summary(user_ids)
         self.message_user(request, f"{count} تصویر فعال شد.")
 
     activate_images.short_description = "فعال کردن تصاویر انتخاب شده"
 
     def deactivate_images(self, request, queryset):
         """Deactivate selected images"""
+        user_ids = set(queryset.values_list("uploaded_by_id", flat=True))
         count = queryset.update(is_active=False)
+        refresh_user_storage_stats(user_ids)
+        invalidate_dashboard_summary(user_ids)
         self.message_user(request, f"{count} تصویر غیرفعال شد.")
 
     deactivate_images.short_description = "غیرفعال کردن تصاویر انتخاب شده"
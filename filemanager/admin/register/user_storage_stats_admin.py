@@ -0,0 +1,44 @@
+from django.contrib import admin
+
+from filemanager.models import UserStorageStats
+from filemanager.services.storage_stats import refresh_user_storage_stats
+
+
+@admin.register(UserStorageStats)
+class UserStorageStatsAdmin(admin.ModelAdmin):
+    list_display = [
+        "user",
+        "image_count",
+        "image_original_bytes",
+        "image_processed_bytes",
+        "document_count",
+        "document_bytes",
+        "updated_at",
+    ]
+    search_fields = ["user__username"]
+    list_select_related = ["user"]
+    readonly_fields = [
+        "user",
+        "image_count",
+        "image_original_bytes",
+        "image_processed_bytes",
+        "compressed_image_count",
+        "compressed_original_bytes",
+        "compressed_processed_bytes",
+        "compression_ratio_sum",
+        "document_count",
+        "document_bytes",
+        "updated_at",
+    ]
+    list_per_page = 20
+    actions = ["recalculate_stats"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def recalculate_stats(self, request, queryset):
+        """Rebuild stats of selected users from their files"""
+        count = refresh_user_storage_stats(queryset.values_list("user_id", flat=True))
+        self.message_user(request, f"آمار {count} کاربر بازسازی شد.")
+
+    recalculate_stats.short_description = "بازسازی آمار کاربران انتخاب شده"
@@ -0,0 +1,53 @@
+# filemanager/management/commands/rebuild_search_text.py
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.search import build_search_text, bump_search_version, ensure_fulltext_index
+from filemanager.models import Document, ImageUpload
+
+
+class Command(BaseCommand):
+    help = "Fill search_text of images and documents and create FULLTEXT indexes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=500, help="Rows per bulk update"
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        targets = [
+            (ImageUpload, ("title", "description")),
+            (Document, ("name", "description")),
+        ]
+
+        for model, fields in targets:
+            updated = 0
+            batch = []
+            # updated_at moves the search version other workers compare against
+            now = timezone.now()
+            rows = model.objects.only(
+                "pk", "search_text", "updated_at", *fields
+            ).iterator(chunk_size=batch_size)
+            for obj in rows:
+                search_text = build_search_text(*(getattr(obj, name) for name in fields))
+                if search_text == obj.search_text:
+                    continue
+                obj.search_text = search_text
+                obj.updated_at = now
+                batch.append(obj)
+                if len(batch) >= batch_size:
+                    model.objects.bulk_update(batch, ["search_text", "updated_at"])
+                    updated += len(batch)
+                    batch = []
+            if batch:
+                model.objects.bulk_update(batch, ["search_text", "updated_at"])
+                updated += len(batch)
+
+            if ensure_fulltext_index(model):
+                self.stdout.write(f"FULLTEXT index created for {model.__name__}")
+            bump_search_version(model)
+
+            self.stdout.write(
+                self.style.SUCCESS(f"{model.__name__}: {updated} rows updated")
+            )
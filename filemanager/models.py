@@ -1,13 +1,22 @@
+import hashlib
 import logging
 import os
+import uuid
 from io import BytesIO
 
 import django_jalali.db.models as jmodels
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.base import ContentFile
-from django.db import models
-from django.db.models.signals import post_delete
+from django.db import models, transaction
+from django.db.models import Q
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_init,
+    post_save,
+    pre_delete,
+)
 from django.dispatch import receiver
 from django.urls import reverse
 from django.utils import timezone
@@ -28,6 +37,26 @@ def get_file_upload_path(instance, filename):
     return f"files/{filename}"
 
 
+def get_content_addressed_path(content, extension, prefix="images/processed"):
+    """Generate an immutable upload path from the hash of the file content"""
+    digest = hashlib.sha256(content).hexdigest()
+    return f"{prefix}/{digest[:2]}/{digest}{extension}"
+
+
+def format_file_size(size_bytes):
+    """تبدیل بایت به فرمت قابل خواندن"""
+    if not size_bytes:
+        return "0 B"
+
+    size_names = ["B", "KB", "MB", "GB"]
+    i = 0
+    while size_bytes >= 1024 and i < len(size_names) - 1:
+        size_bytes /= 1024.0
+        i += 1
+
+    return f"{size_bytes:.1f} {size_names[i]}"
+
+
 class ImageUpload(models.Model):
     """مدل آپلود تصویر سازگار با Arvan Cloud"""
 
@@ -153,6 +182,9 @@ class ImageUpload(models.Model):
         verbose_name="وضعیت پردازش",
     )
 
+    # عنوان و توضیحات نرمال‌شده برای جستجوی متنی (core/search.py)
+    search_text = models.TextField(blank=True, default="", editable=False)
+
     created_at = jmodels.jDateTimeField(auto_now_add=True, verbose_name="تاریخ آپلود")
     updated_at = jmodels.jDateTimeField(auto_now=True, verbose_name="تاریخ بروزرسانی")
     processed_at = jmodels.jDateTimeField(
@@ -166,6 +198,8 @@ class ImageUpload(models.Model):
         indexes = [
             models.Index(fields=["created_at"]),
             models.Index(fields=["uploaded_by"]),
+            # Keyset pagination of a user's images (core/pagination.py)
+            models.Index(fields=["uploaded_by", "is_active", "created_at", "id"]),
             models.Index(fields=["is_active"]),
             models.Index(fields=["processing_status"]),
         ]
@@ -183,6 +217,10 @@ class ImageUpload(models.Model):
         if self.original_image:
             self.original_url = self.original_image.url
 
+        from core.search import update_search_text
+
+        update_search_text(self, kwargs, "title", "description")
+
         # ذخیره اولیه
         is_new = self.pk is None
         super().save(*args, **kwargs)
@@ -288,22 +326,29 @@ class ImageUpload(models.Model):
                         )
                         file_extension = ".png"
 
-                    output.seek(0)
+                    processed_content = output.getvalue()
 
-                    # تولید نام فایل پردازش شده
-                    original_name = os.path.splitext(
-                        os.path.basename(self.original_image.name)
-                    )[0]
-                    processed_filename = f"{original_name}_processed{file_extension}"
-
-                    # ذخیره در Arvan Cloud
-                    self.processed_image.save(
-                        processed_filename, ContentFile(output.getvalue()), save=False
+                    # نام فایل بر اساس هش محتوا - هر نسخه کلید جدید و تغییرناپذیر دارد
+                    processed_path = get_content_addressed_path(
+                        processed_content, file_extension
                     )
+                    previous_path = self.processed_image.name or None
+
+                    # ذخیره در Arvan Cloud (اگر همین محتوا قبلاً آپلود نشده باشد)
+                    storage = self.processed_image.storage
+                    if not storage.exists(processed_path):
+                        stored_path = storage.save(
+                            processed_path, ContentFile(processed_content)
+                        )
+                        if stored_path != processed_path:
+                            # Same content stored concurrently by another
+                            # process; keep its object, drop the suffixed copy
+                            storage.delete(stored_path)
+                    self.processed_image = processed_path
 
                     # تنظیم URL و اندازه
                     self.processed_url = self.processed_image.url
-                    self.processed_size = len(output.getvalue())
+                    self.processed_size = len(processed_content)
 
                     # محاسبه نسبت فشرده‌سازی
                     if self.original_size > 0:
@@ -322,6 +367,9 @@ class ImageUpload(models.Model):
                         ]
                     )
 
+                    # حذف نسخه قبلی پس از جایگزینی لینک‌ها
+                    self._discard_stale_rendition(previous_path)
+
                     logger.info(
                         f"تصویر {self.title} پردازش شد - کاهش حجم: {self.compression_ratio:.1f}%"
                     )
@@ -331,6 +379,23 @@ class ImageUpload(models.Model):
             logger.error(f"خطا در پردازش تصویر {self.id}: {str(e)}")
             return False
 
+    def _discard_stale_rendition(self, name):
+        """Delete a superseded processed file once no image references it"""
+        if not name or name in (self.processed_image.name, self.original_image.name):
+            return
+
+        storage = self.processed_image.storage
+
+        def delete_if_unreferenced():
+            try:
+                if not is_image_file_referenced(name):
+                    storage.delete(name)
+                    logger.info(f"نسخه قدیمی تصویر حذف شد: {name}")
+            except Exception as e:
+                logger.error(f"Error deleting stale rendition {name}: {str(e)}")
+
+        transaction.on_commit(delete_if_unreferenced)
+
     def _resize_image(self, img):
         """تغییر اندازه تصویر بر اساس تنظیمات"""
         if self.resize_option == "original":
@@ -375,17 +440,7 @@ class ImageUpload(models.Model):
         """تبدیل بایت به فرمت قابل خواندن"""
         if size_bytes is None:
             size_bytes = self.original_size
-
-        if size_bytes == 0:
-            return "0 B"
-
-        size_names = ["B", "KB", "MB", "GB"]
-        i = 0
-        while size_bytes >= 1024 and i < len(size_names) - 1:
-            size_bytes /= 1024.0
-            i += 1
-
-        return f"{size_bytes:.1f} {size_names[i]}"
+        return format_file_size(size_bytes)
 
     def get_original_size_display(self):
         """نمایش حجم فایل اصلی"""
@@ -473,6 +528,14 @@ class ImageGallery(models.Model):
         verbose_name="ایجاد شده توسط",
     )
 
+    # Denormalized, kept in sync by signals (see services/gallery_stats.py)
+    image_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="تعداد تصاویر"
+    )
+    total_bytes = models.PositiveBigIntegerField(
+        default=0, editable=False, verbose_name="حجم کل (بایت)"
+    )
+
     created_at = jmodels.jDateTimeField(auto_now_add=True, verbose_name="تاریخ ایجاد")
     updated_at = jmodels.jDateTimeField(auto_now=True, verbose_name="تاریخ بروزرسانی")
 
@@ -480,24 +543,28 @@ class ImageGallery(models.Model):
         verbose_name = "گالری تصاویر"
         verbose_name_plural = "گالری‌های تصاویر"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["created_by", "created_at", "id"]),
+        ]
 
     def __str__(self):
         return self.name
 
     def get_images_count(self):
         """تعداد تصاویر گالری"""
-        return self.images.count()
+        return self.image_count
+
+    get_images_count.short_description = "تعداد تصاویر"
 
     def get_total_size(self):
         """حجم کل تصاویر گالری"""
-        total_size = 0
-        for image in self.images.all():
-            total_size += image.processed_size or image.original_size
-        return total_size
+        return self.total_bytes
 
     def get_total_size_display(self):
         """نمایش حجم کل"""
-        return ImageUpload().get_file_size_display(self.get_total_size())
+        return format_file_size(self.total_bytes)
+
+    get_total_size_display.short_description = "حجم کل"
 
 
 class Document(models.Model):
@@ -529,10 +596,16 @@ class Document(models.Model):
     )
     download_count = models.PositiveIntegerField(default=0, verbose_name="تعداد دانلود")
 
+    # نام و توضیحات نرمال‌شده برای جستجوی متنی (core/search.py)
+    search_text = models.TextField(blank=True, default="", editable=False)
+
     class Meta:
         verbose_name = "سند"
         verbose_name_plural = "اسناد"
         ordering = ["-uploaded_at"]
+        indexes = [
+            models.Index(fields=["uploaded_by", "is_active", "uploaded_at", "id"]),
+        ]
 
     def __str__(self):
         return self.name
@@ -550,6 +623,9 @@ class Document(models.Model):
                     self.file_type = ext
                 else:
                     self.file_type = "other"
+        from core.search import update_search_text
+
+        update_search_text(self, kwargs, "name", "description")
         super().save(*args, **kwargs)
 
     def get_file_size_display(self):
@@ -564,9 +640,181 @@ class Document(models.Model):
         return "نامشخص"
 
     def increment_download_count(self):
-        """Increment download counter"""
-        self.download_count += 1
-        self.save(update_fields=["download_count"])
+        """Increment download counter (write-behind, flushed periodically)"""
+        from filemanager.services.download_counter import record_download
+
+        record_download(self.pk)
+
+    def get_total_download_count(self):
+        """Download count including increments not yet flushed to the database"""
+        from filemanager.services.download_counter import get_pending_downloads
+
+        # Set by prefetch_pending_downloads for a whole page at once
+        pending = getattr(self, "_pending_downloads", None)
+        if pending is None:
+            pending = get_pending_downloads(self.pk)
+        return self.download_count + pending
+
+    get_total_download_count.short_description = "تعداد دانلود"
+
+
+class DocumentUploadSession(models.Model):
+    """آپلود چندبخشی و قابل ادامه اسناد بزرگ"""
+
+    STATUS_CHOICES = [
+        ("active", "در حال آپلود"),
+        ("completed", "تکمیل شده"),
+        ("aborted", "لغو شده"),
+    ]
+
+    token = models.UUIDField(
+        default=uuid.uuid4, unique=True, editable=False, verbose_name="شناسه آپلود"
+    )
+    uploaded_by = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="document_upload_sessions",
+        verbose_name="آپلود شده توسط",
+    )
+    name = models.CharField(max_length=200, verbose_name="نام فایل")
+    description = models.TextField(blank=True, verbose_name="توضیحات")
+    file_type = models.CharField(
+        max_length=10,
+        choices=Document.DOCUMENT_TYPES,
+        blank=True,
+        verbose_name="نوع فایل",
+    )
+    original_filename = models.CharField(max_length=255, verbose_name="نام اصلی فایل")
+    file_name = models.CharField(
+        max_length=255, verbose_name="مسیر فایل", help_text="مسیر فایل در storage"
+    )
+    upload_id = models.CharField(
+        max_length=1024, verbose_name="شناسه آپلود چندبخشی Arvan"
+    )
+    total_size = models.PositiveBigIntegerField(verbose_name="حجم کل (بایت)")
+    chunk_size = models.PositiveIntegerField(verbose_name="اندازه هر بخش (بایت)")
+    total_chunks = models.PositiveIntegerField(verbose_name="تعداد بخش‌ها")
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default="active", verbose_name="وضعیت"
+    )
+    document = models.ForeignKey(
+        Document,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="upload_sessions",
+        verbose_name="سند",
+    )
+    created_at = jmodels.jDateTimeField(auto_now_add=True, verbose_name="تاریخ ایجاد")
+    updated_at = jmodels.jDateTimeField(auto_now=True, verbose_name="تاریخ بروزرسانی")
+
+    class Meta:
+        verbose_name = "آپلود چندبخشی"
+        verbose_name_plural = "آپلودهای چندبخشی"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "updated_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
+
+    def get_expected_chunk_size(self, part_number):
+        """Size every part must have; only the last one may be shorter"""
+        if part_number < self.total_chunks:
+            return self.chunk_size
+        return self.total_size - self.chunk_size * (self.total_chunks - 1)
+
+
+class DocumentUploadPart(models.Model):
+    """بخش دریافت شده از یک آپلود چندبخشی"""
+
+    session = models.ForeignKey(
+        DocumentUploadSession,
+        on_delete=models.CASCADE,
+        related_name="parts",
+        verbose_name="آپلود",
+    )
+    part_number = models.PositiveIntegerField(verbose_name="شماره بخش")
+    size = models.PositiveIntegerField(verbose_name="حجم (بایت)")
+    etag = models.CharField(max_length=255, verbose_name="ETag")
+    created_at = models.DateTimeField(auto_now=True, verbose_name="تاریخ دریافت")
+
+    class Meta:
+        verbose_name = "بخش آپلود"
+        verbose_name_plural = "بخش‌های آپلود"
+        ordering = ["part_number"]
+        unique_together = ["session", "part_number"]
+
+    def __str__(self):
+        return f"{self.session.name} - بخش {self.part_number}"
+
+
+class UserStorageStats(models.Model):
+    """آمار تجمیعی فضای ذخیره‌سازی هر کاربر (بروزرسانی تدریجی)"""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="storage_stats",
+        verbose_name="کاربر",
+    )
+
+    image_count = models.IntegerField(default=0, verbose_name="تعداد تصاویر")
+    image_original_bytes = models.BigIntegerField(
+        default=0, verbose_name="حجم اصلی تصاویر (بایت)"
+    )
+    image_processed_bytes = models.BigIntegerField(
+        default=0, verbose_name="حجم پردازش شده تصاویر (بایت)"
+    )
+
+    # فقط تصاویری که فشرده‌سازی شده‌اند (compression_ratio > 0)
+    compressed_image_count = models.IntegerField(
+        default=0, verbose_name="تعداد تصاویر فشرده شده"
+    )
+    compressed_original_bytes = models.BigIntegerField(
+        default=0, verbose_name="حجم اصلی تصاویر فشرده شده (بایت)"
+    )
+    compressed_processed_bytes = models.BigIntegerField(
+        default=0, verbose_name="حجم نهایی تصاویر فشرده شده (بایت)"
+    )
+    compression_ratio_sum = models.FloatField(
+        default=0.0, verbose_name="مجموع درصد فشرده‌سازی"
+    )
+
+    document_count = models.IntegerField(default=0, verbose_name="تعداد اسناد")
+    document_bytes = models.BigIntegerField(default=0, verbose_name="حجم اسناد (بایت)")
+
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="تاریخ بروزرسانی")
+
+    class Meta:
+        verbose_name = "آمار فضای کاربر"
+        verbose_name_plural = "آمار فضای کاربران"
+
+    def __str__(self):
+        return f"{self.user} - {self.total_bytes} B"
+
+    @property
+    def total_bytes(self):
+        return self.image_original_bytes + self.image_processed_bytes + self.document_bytes
+
+    @property
+    def image_saved_bytes(self):
+        return self.image_original_bytes - self.image_processed_bytes
+
+    @property
+    def average_compression(self):
+        if not self.compressed_image_count:
+            return 0
+        return self.compression_ratio_sum / self.compressed_image_count
+
+
+def is_image_file_referenced(name):
+    """Check if any image still points at the given storage key"""
+    return ImageUpload.objects.filter(
+        Q(original_image=name) | Q(processed_image=name)
+    ).exists()
 
 
 @receiver(post_delete, sender="filemanager.ImageUpload")
@@ -579,7 +827,10 @@ def delete_image_files(sender, instance, **kwargs):
         logger.error(f"Error deleting original image for {instance.title}: {str(e)}")
 
     try:
-        if instance.processed_image:
+        # Processed files are content-addressed and may be shared by other images
+        if instance.processed_image and not is_image_file_referenced(
+            instance.processed_image.name
+        ):
             instance.processed_image.delete(save=False)
     except Exception as e:
         logger.error(f"Error deleting processed image for {instance.title}: {str(e)}")
@@ -593,3 +844,187 @@ def delete_document_file(sender, instance, **kwargs):
             instance.file.delete(save=False)
     except Exception as e:
         logger.error(f"Error deleting file for {instance.name}: {str(e)}")
+
+
+# Registered before the storage stats receivers, which replace _storage_snapshot
+@receiver(post_save, sender="filemanager.ImageUpload")
+@receiver(post_delete, sender="filemanager.ImageUpload")
+@receiver(post_save, sender="filemanager.Document")
+@receiver(post_delete, sender="filemanager.Document")
+def invalidate_owner_dashboard(sender, instance, **kwargs):
+    """Mark the dashboard summary of the file owner (old and new) as stale"""
+    from filemanager.services.dashboard_summary import invalidate_dashboard_summary
+
+    user_ids = {instance.uploaded_by_id}
+    snapshot = getattr(instance, "_storage_snapshot", None)
+    if snapshot:
+        user_ids.add(snapshot[0])
+    invalidate_dashboard_summary(user_ids)
+
+
+@receiver(post_save, sender="filemanager.ImageGallery")
+@receiver(post_delete, sender="filemanager.ImageGallery")
+def invalidate_gallery_owner_dashboard(sender, instance, **kwargs):
+    """Mark the dashboard summary of the gallery owner as stale"""
+    from filemanager.services.dashboard_summary import invalidate_dashboard_summary
+
+    invalidate_dashboard_summary([instance.created_by_id])
+
+
+@receiver(post_init, sender="filemanager.ImageUpload")
+def remember_image_storage_contribution(sender, instance, **kwargs):
+    """Keep the last saved storage contribution to compute deltas on save"""
+    from filemanager.services.storage_stats import snapshot_image
+
+    instance._storage_snapshot = snapshot_image(instance)
+
+
+@receiver(post_save, sender="filemanager.ImageUpload")
+def update_image_storage_stats(sender, instance, created, **kwargs):
+    """Apply the change of an image to its owner's storage stats"""
+    from filemanager.services.storage_stats import apply_change, snapshot_image
+
+    try:
+        new_snapshot = snapshot_image(instance)
+        old_snapshot = (instance.uploaded_by_id, {}) if created else None
+        if not created:
+            old_snapshot = getattr(instance, "_storage_snapshot", None)
+        apply_change(old_snapshot, new_snapshot)
+        instance._storage_snapshot = new_snapshot
+    except Exception as e:
+        logger.error(f"Error updating storage stats for image {instance.pk}: {str(e)}")
+
+
+@receiver(post_delete, sender="filemanager.ImageUpload")
+def remove_image_storage_stats(sender, instance, **kwargs):
+    """Subtract a deleted image from its owner's storage stats"""
+    from filemanager.services.storage_stats import apply_removal
+
+    try:
+        apply_removal(getattr(instance, "_storage_snapshot", None))
+    except Exception as e:
+        logger.error(f"Error updating storage stats for image {instance.pk}: {str(e)}")
+
+
+@receiver(post_init, sender="filemanager.Document")
+def remember_document_storage_contribution(sender, instance, **kwargs):
+    """Keep the last saved storage contribution to compute deltas on save"""
+    from filemanager.services.storage_stats import snapshot_document
+
+    instance._storage_snapshot = snapshot_document(instance)
+
+
+@receiver(post_save, sender="filemanager.Document")
+def update_document_storage_stats(sender, instance, created, **kwargs):
+    """Apply the change of a document to its owner's storage stats"""
+    from filemanager.services.storage_stats import apply_change, snapshot_document
+
+    try:
+        new_snapshot = snapshot_document(instance)
+        old_snapshot = (instance.uploaded_by_id, {}) if created else None
+        if not created:
+            old_snapshot = getattr(instance, "_storage_snapshot", None)
+        apply_change(old_snapshot, new_snapshot)
+        instance._storage_snapshot = new_snapshot
+    except Exception as e:
+        logger.error(
+            f"Error updating storage stats for document {instance.pk}: {str(e)}"
+        )
+
+
+@receiver(post_delete, sender="filemanager.Document")
+def remove_document_storage_stats(sender, instance, **kwargs):
+    """Subtract a deleted document from its owner's storage stats"""
+    from filemanager.services.storage_stats import apply_removal
+
+    try:
+        apply_removal(getattr(instance, "_storage_snapshot", None))
+    except Exception as e:
+        logger.error(
+            f"Error updating storage stats for document {instance.pk}: {str(e)}"
+        )
+
+
+@receiver(m2m_changed, sender=ImageGallery.images.through)
+def update_gallery_stats_on_membership_change(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """Keep ImageGallery.image_count / total_bytes in sync with its images"""
+    from filemanager.services.gallery_stats import (
+        get_gallery_ids_for_image,
+        refresh_gallery_stats,
+    )
+
+    try:
+        if not reverse:
+            if action in ("post_add", "post_remove", "post_clear"):
+                refresh_gallery_stats([instance.pk])
+        elif action == "pre_clear":
+            instance._cleared_gallery_ids = get_gallery_ids_for_image(instance.pk)
+        elif action in ("post_add", "post_remove"):
+            refresh_gallery_stats(pk_set or [])
+        elif action == "post_clear":
+            refresh_gallery_stats(getattr(instance, "_cleared_gallery_ids", []))
+    except Exception as e:
+        logger.error(f"Error updating gallery stats: {str(e)}")
+
+
+def _get_gallery_image_size(instance):
+    if "original_size" not in instance.__dict__ or "processed_size" not in (
+        instance.__dict__
+    ):
+        return None
+    return instance.processed_size or instance.original_size
+
+
+@receiver(post_init, sender="filemanager.ImageUpload")
+def remember_gallery_image_size(sender, instance, **kwargs):
+    instance._gallery_image_size = _get_gallery_image_size(instance)
+
+
+@receiver(post_save, sender="filemanager.ImageUpload")
+def update_gallery_stats_on_image_size_change(sender, instance, created, **kwargs):
+    """Recompute galleries containing an image whose stored size changed"""
+    from filemanager.services.gallery_stats import refresh_galleries_of_image
+
+    size = _get_gallery_image_size(instance)
+    if created or size == instance._gallery_image_size:
+        instance._gallery_image_size = size
+        return
+    try:
+        refresh_galleries_of_image(instance.pk)
+        instance._gallery_image_size = size
+    except Exception as e:
+        logger.error(f"Error updating gallery stats for image {instance.pk}: {str(e)}")
+
+
+@receiver(pre_delete, sender="filemanager.ImageUpload")
+def remember_image_galleries(sender, instance, **kwargs):
+    """M2M rows are removed without m2m_changed, so note the galleries first"""
+    from filemanager.services.gallery_stats import get_gallery_ids_for_image
+
+    instance._gallery_ids = get_gallery_ids_for_image(instance.pk)
+
+
+@receiver(post_delete, sender="filemanager.ImageUpload")
+def update_gallery_stats_on_image_delete(sender, instance, **kwargs):
+    from filemanager.services.gallery_stats import refresh_gallery_stats
+
+    try:
+        refresh_gallery_stats(getattr(instance, "_gallery_ids", []))
+    except Exception as e:
+        logger.error(f"Error updating gallery stats for image {instance.pk}: {str(e)}")
+
+
+@receiver(post_save, sender="filemanager.ImageUpload")
+@receiver(post_delete, sender="filemanager.ImageUpload")
+@receiver(post_save, sender="filemanager.Document")
+@receiver(post_delete, sender="filemanager.Document")
+def invalidate_search_index(sender, instance, **kwargs):
+    """Rebuild in-process search indexes after searchable rows change"""
+    from core.search import bump_search_version
+
+    update_fields = kwargs.get("update_fields")
+    if update_fields is not None and "search_text" not in update_fields:
+        return
+    bump_search_version(sender)
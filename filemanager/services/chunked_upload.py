@@ -0,0 +1,253 @@
+# filemanager/services/chunked_upload.py
+"""
+Chunked, resumable document uploads.
+
+Protocol: ``initiate_upload`` opens an Arvan multipart upload, every numbered
+chunk is sent straight to the matching multipart part and recorded as a
+DocumentUploadPart, and ``complete_upload`` assembles the parts and creates
+the Document. An interrupted client reads the session status and resumes
+from the first missing part; worker memory stays bounded by the chunk size.
+"""
+import logging
+import math
+import mimetypes
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from storages.backends.s3boto3 import S3Boto3Storage
+
+from arvan_integration.services import ArvanService
+from arvan_integration.uploader import get_unique_filename
+from filemanager.models import Document, DocumentUploadPart, DocumentUploadSession
+from filemanager.services.download_service import build_storage_key
+
+logger = logging.getLogger(__name__)
+
+# Configuration with defaults
+CHUNK_SIZE = getattr(settings, "CHUNKED_UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024)
+MAX_FILE_SIZE = getattr(settings, "CHUNKED_UPLOAD_MAX_SIZE", 500 * 1024 * 1024)
+SESSION_EXPIRY_HOURS = getattr(settings, "CHUNKED_UPLOAD_EXPIRY_HOURS", 24)
+
+
+class ChunkedUploadError(Exception):
+    """Invalid request within the chunked upload protocol"""
+
+
+def _get_storage():
+    return Document._meta.get_field("file").storage
+
+
+def _get_object_key(session):
+    return build_storage_key(_get_storage(), session.file_name)
+
+
+def is_chunked_upload_available():
+    """Multipart uploads need the Arvan (S3) storage behind Document.file"""
+    return isinstance(_get_storage(), S3Boto3Storage)
+
+
+def initiate_upload(user, name, filename, total_size, description="", file_type=""):
+    """Open a multipart upload and return the new DocumentUploadSession"""
+    name = (name or "").strip()
+    if len(name) < 3 or len(name) > 200:
+        raise ChunkedUploadError("نام فایل باید بین 3 تا 200 کاراکتر باشد.")
+
+    if total_size <= 0:
+        raise ChunkedUploadError("حجم فایل نامعتبر است.")
+    if total_size > MAX_FILE_SIZE:
+        raise ChunkedUploadError(
+            f"حجم فایل نباید بیش از {MAX_FILE_SIZE // (1024 * 1024)} مگابایت باشد."
+        )
+
+    if file_type and file_type not in dict(Document.DOCUMENT_TYPES):
+        raise ChunkedUploadError("نوع فایل نامعتبر است.")
+
+    if not is_chunked_upload_available():
+        raise ChunkedUploadError("آپلود چندبخشی فقط روی Arvan Cloud پشتیبانی می‌شود.")
+
+    original_filename = os.path.basename(filename or name)
+    file_name = get_unique_filename(original_filename, path="files/")
+    content_type = (
+        mimetypes.guess_type(original_filename)[0] or "application/octet-stream"
+    )
+
+    upload_id = ArvanService.start_multipart_upload(
+        build_storage_key(_get_storage(), file_name), content_type
+    )
+
+    session = DocumentUploadSession.objects.create(
+        uploaded_by=user,
+        name=name,
+        description=description or "",
+        file_type=file_type or "",
+        original_filename=original_filename,
+        file_name=file_name,
+        upload_id=upload_id,
+        total_size=total_size,
+        chunk_size=CHUNK_SIZE,
+        total_chunks=math.ceil(total_size / CHUNK_SIZE),
+    )
+    logger.info(
+        f"Chunked upload started: {name} ({total_size} bytes, "
+        f"{session.total_chunks} chunks) by {user.username}"
+    )
+    return session
+
+
+def get_upload_status(session):
+    """Received parts and the next part the client should send"""
+    received = list(session.parts.values_list("part_number", flat=True))
+    received_set = set(received)
+    next_part = None
+    if session.status == "active":
+        next_part = next(
+            (
+                number
+                for number in range(1, session.total_chunks + 1)
+                if number not in received_set
+            ),
+            None,
+        )
+    return {
+        "token": str(session.token),
+        "status": session.status,
+        "chunk_size": session.chunk_size,
+        "total_size": session.total_size,
+        "total_chunks": session.total_chunks,
+        "received_parts": received,
+        "next_part": next_part,
+        "document_id": session.document_id,
+    }
+
+
+def upload_chunk(session, part_number, stream):
+    """
+    Send one chunk to its multipart part.
+    Reads at most one chunk from ``stream``; re-sending a part replaces it.
+    """
+    if session.status != "active":
+        raise ChunkedUploadError("این آپلود دیگر فعال نیست.")
+
+    if part_number < 1 or part_number > session.total_chunks:
+        raise ChunkedUploadError("شماره بخش نامعتبر است.")
+
+    expected_size = session.get_expected_chunk_size(part_number)
+    data = stream.read(expected_size + 1)
+    if len(data) != expected_size:
+        raise ChunkedUploadError(
+            f"حجم بخش {part_number} باید {expected_size} بایت باشد."
+        )
+
+    etag = ArvanService.upload_part(
+        _get_object_key(session), session.upload_id, part_number, data
+    )
+
+    DocumentUploadPart.objects.update_or_create(
+        session=session,
+        part_number=part_number,
+        defaults={"size": expected_size, "etag": etag},
+    )
+    # Keep the session from being treated as stale
+    session.save(update_fields=["updated_at"])
+    return get_upload_status(session)
+
+
+def _complete_multipart(session, parts):
+    """
+    Assemble the parts on Arvan. A retry after a failed database step finds
+    the multipart upload already completed; the stored object then counts
+    as assembled when its size matches.
+    """
+    object_key = _get_object_key(session)
+    try:
+        ArvanService.complete_multipart_upload(object_key, session.upload_id, parts)
+    except Exception:
+        try:
+            stored_size = ArvanService.get_object_size(object_key)
+        except Exception:
+            stored_size = None
+        if stored_size == session.total_size:
+            logger.info(f"Multipart upload already completed: {object_key}")
+            return
+        raise
+
+
+def complete_upload(session):
+    """Assemble all parts into the final file and create the Document"""
+    # 1. Validate; nothing is locked while Arvan assembles the file
+    session = DocumentUploadSession.objects.get(pk=session.pk)
+    if session.status == "completed" and session.document_id:
+        return session.document
+    if session.status != "active":
+        raise ChunkedUploadError("این آپلود دیگر فعال نیست.")
+
+    parts = list(session.parts.values_list("part_number", "etag"))
+    if len(parts) != session.total_chunks:
+        status = get_upload_status(session)
+        raise ChunkedUploadError(f"بخش {status['next_part']} هنوز دریافت نشده است.")
+
+    # 2. External side effect first, outside any transaction
+    _complete_multipart(session, parts)
+
+    # 3. Record the result; a failure here leaves the session active and
+    # a retry goes through step 2 again without error
+    with transaction.atomic():
+        session = DocumentUploadSession.objects.select_for_update().get(pk=session.pk)
+        if session.status == "completed" and session.document_id:
+            # A concurrent request finished first
+            return session.document
+        if session.status != "active":
+            raise ChunkedUploadError("این آپلود دیگر فعال نیست.")
+
+        document = Document(
+            name=session.name,
+            description=session.description,
+            file_type=session.file_type,
+            uploaded_by=session.uploaded_by,
+            file=session.file_name,
+            file_size=session.total_size,
+        )
+        document.save()
+
+        session.status = "completed"
+        session.document = document
+        session.save(update_fields=["status", "document", "updated_at"])
+        session.parts.all().delete()
+
+    logger.info(
+        f"Chunked upload completed: {document.name} by {session.uploaded_by.username}"
+    )
+    return document
+
+
+def abort_upload(session):
+    """Cancel an upload and free its stored parts"""
+    if session.status != "active":
+        return False
+
+    ArvanService.abort_multipart_upload(_get_object_key(session), session.upload_id)
+    session.status = "aborted"
+    session.save(update_fields=["status", "updated_at"])
+    session.parts.all().delete()
+    logger.info(f"Chunked upload aborted: {session.name}")
+    return True
+
+
+def cleanup_stale_uploads():
+    """Abort uploads that received no chunk within the expiry window"""
+    cutoff = timezone.now() - timedelta(hours=SESSION_EXPIRY_HOURS)
+    stale_sessions = DocumentUploadSession.objects.filter(
+        status="active", updated_at__lt=cutoff
+    )
+
+    aborted = 0
+    for session in stale_sessions.iterator():
+        if abort_upload(session):
+            aborted += 1
+
+    if aborted:
+        logger.info(f"Aborted {aborted} stale chunked uploads")
+    return aborted
@@ -0,0 +1,214 @@
+# filemanager/services/dashboard_summary.py
+"""
+Cached per-user filemanager dashboard summary.
+
+Totals and sizes come from the user's UserStorageStats row; the remaining
+counters are computed in one statement (scalar subqueries with conditional
+aggregates over the user's row). Change signals bump a per-user version key
+instead of deleting the entry; a summary built from an older version is
+stale. In stale-while-revalidate mode the stale summary is served while a
+Celery task rebuilds it, so the dashboard never waits on recomputation.
+
+Caching needs a cache shared by every process (Redis or Memcached): with a
+per-process cache, version bumps made by one worker, and summaries rebuilt
+by the Celery worker, would never reach the others. Without one the summary
+is built on every request, which is a handful of indexed queries.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from core.services.cache import is_shared_cache
+
+logger = logging.getLogger(__name__)
+
+# Configuration with defaults
+CACHE_TIMEOUT = getattr(settings, "FILEMANAGER_DASHBOARD_CACHE_TIMEOUT", 600)
+STALE_WHILE_REVALIDATE = getattr(
+    settings, "FILEMANAGER_DASHBOARD_STALE_WHILE_REVALIDATE", True
+)
+REFRESH_LOCK_TIMEOUT = 30
+RECENT_IMAGES = 5
+RECENT_DOCUMENTS = 5
+RECENT_GALLERIES = 3
+
+KEY_PREFIX = "filemanager:dashboard"
+
+
+def _summary_key(user_id):
+    return f"{KEY_PREFIX}:summary:{user_id}"
+
+
+def _version_key(user_id):
+    return f"{KEY_PREFIX}:version:{user_id}"
+
+
+def _lock_key(user_id):
+    return f"{KEY_PREFIX}:refresh:{user_id}"
+
+
+def _aggregate_subquery(queryset, user_field, aggregate):
+    """Scalar subquery of one aggregate over the outer user's rows"""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{user_field: OuterRef("pk")})
+            .order_by()
+            .values(user_field)
+            .annotate(value=aggregate)
+            .values("value")[:1],
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def _query_counters(user_id):
+    """Counters not kept in UserStorageStats, in a single query"""
+    from filemanager.models import ImageGallery, ImageUpload
+
+    images = ImageUpload.objects.filter(is_active=True)
+
+    return (
+        get_user_model()
+        .objects.filter(pk=user_id)
+        .annotate(
+            processing_images=_aggregate_subquery(
+                images,
+                "uploaded_by",
+                Count("id", filter=Q(processing_status="processing")),
+            ),
+            failed_images=_aggregate_subquery(
+                images, "uploaded_by", Count("id", filter=Q(processing_status="failed"))
+            ),
+            total_galleries=_aggregate_subquery(
+                ImageGallery.objects.all(), "created_by", Count("id")
+            ),
+        )
+        .values(
+            "processing_images",
+            "failed_images",
+            "total_galleries",
+        )
+        .first()
+    ) or {}
+
+
+def build_dashboard_summary(user_id):
+    """Compute the dashboard summary of a user from the database"""
+    from filemanager.models import Document, ImageGallery, ImageUpload
+
+    from filemanager.services.storage_stats import get_user_storage_stats
+
+    counters = _query_counters(user_id)
+    stats = get_user_storage_stats(get_user_model()(pk=user_id))
+    original = stats.image_original_bytes
+    processed = stats.image_processed_bytes
+
+    return {
+        "recent_images": list(
+            ImageUpload.objects.filter(uploaded_by_id=user_id, is_active=True).order_by(
+                "-created_at"
+            )[:RECENT_IMAGES]
+        ),
+        "recent_documents": list(
+            Document.objects.filter(uploaded_by_id=user_id, is_active=True).order_by(
+                "-uploaded_at"
+            )[:RECENT_DOCUMENTS]
+        ),
+        "recent_galleries": list(
+            ImageGallery.objects.filter(created_by_id=user_id).order_by("-created_at")[
+                :RECENT_GALLERIES
+            ]
+        ),
+        "total_images": stats.image_count,
+        "total_documents": stats.document_count,
+        "total_galleries": counters.get("total_galleries", 0),
+        "storage_stats": {
+            "original": original,
+            "processed": processed,
+            "total": original + processed,
+            "saved": original - processed,
+        },
+        "processing_images": counters.get("processing_images", 0),
+        "failed_images": counters.get("failed_images", 0),
+    }
+
+
+def refresh_dashboard_summary(user_id):
+    """Rebuild and cache the summary of a user; returns the summary"""
+    # Read the version first: changes made while building leave the entry stale
+    version = cache.get(_version_key(user_id), 0)
+    summary = build_dashboard_summary(user_id)
+    cache.set(
+        _summary_key(user_id),
+        {"version": version, "built_at": time.time(), "summary": summary},
+        CACHE_TIMEOUT,
+    )
+    cache.delete(_lock_key(user_id))
+    return summary
+
+
+def _schedule_refresh(user_id):
+    """Rebuild a stale summary in the background (once per user at a time)"""
+    if not cache.add(_lock_key(user_id), 1, REFRESH_LOCK_TIMEOUT):
+        return
+    try:
+        from filemanager.tasks import refresh_dashboard_summary_task
+
+        refresh_dashboard_summary_task.delay(user_id)
+    except Exception as e:
+        # The lock expires, so a later request retries the refresh
+        logger.warning(f"Could not schedule dashboard refresh for {user_id}: {str(e)}")
+
+
+def get_dashboard_summary(user_id):
+    """Cached dashboard summary of a user"""
+    if not is_shared_cache():
+        return build_dashboard_summary(user_id)
+
+    try:
+        values = cache.get_many([_summary_key(user_id), _version_key(user_id)])
+    except Exception as e:
+        logger.error(f"Dashboard summary cache error: {str(e)}")
+        return build_dashboard_summary(user_id)
+
+    entry = values.get(_summary_key(user_id))
+    if entry is None:
+        return refresh_dashboard_summary(user_id)
+
+    if entry["version"] == values.get(_version_key(user_id), 0):
+        return entry["summary"]
+
+    if STALE_WHILE_REVALIDATE:
+        _schedule_refresh(user_id)
+        return entry["summary"]
+    return refresh_dashboard_summary(user_id)
+
+
+def _bump_versions(user_ids):
+    for user_id in user_ids:
+        key = _version_key(user_id)
+        try:
+            cache.add(key, 0, None)
+            cache.incr(key)
+        except ValueError:
+            # Key evicted between add and incr
+            cache.set(key, 1, None)
+        except Exception as e:
+            logger.error(f"Dashboard summary invalidation error: {str(e)}")
+
+
+def invalidate_dashboard_summary(user_ids):
+    """Mark the cached summaries of the given users as stale"""
+    if not is_shared_cache():
+        return
+    user_ids = {user_id for user_id in user_ids if user_id}
+    if user_ids:
+        # After commit, so a concurrent rebuild cannot cache pre-commit data as fresh
+        transaction.on_commit(lambda: _bump_versions(user_ids))
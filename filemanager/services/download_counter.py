@@ -0,0 +1,152 @@
+# filemanager/services/download_counter.py
+"""
+Write-behind download counters for Document.
+
+Each download is one Redis transaction: INCR of the document's counter and
+SADD of its id to a set of documents with pending downloads. A periodic task
+(``filemanager.tasks.flush_download_counters``) pops that set and moves each
+pending delta to the database with one
+``UPDATE ... SET download_count = download_count + n``, so concurrent
+downloads never lose updates and a download no longer costs a row write.
+
+Write-behind needs Django's Redis cache, shared by the web workers and the
+Celery worker that flushes it. With any other cache (LocMem is per process,
+Memcached has no sets) every download is written to the database directly.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+# Configuration with defaults
+WRITE_BEHIND_SETTING = getattr(settings, "DOWNLOAD_COUNTER_WRITE_BEHIND", True)
+
+KEY_PREFIX = "filemanager:downloads"
+DIRTY_KEY = f"{KEY_PREFIX}:dirty"
+
+
+def _redis_client():
+    """Raw client of Django's built-in Redis cache, or None"""
+    default_cache = caches["default"]
+    if isinstance(default_cache, RedisCache):
+        return default_cache._cache.get_client(write=True)
+    return None
+
+
+def write_behind_enabled():
+    """Buffer downloads in the cache only when every process shares it"""
+    return WRITE_BEHIND_SETTING and isinstance(caches["default"], RedisCache)
+
+
+def _counter_key(document_id):
+    return f"{KEY_PREFIX}:count:{document_id}"
+
+
+def _add_pending(client, document_id, amount):
+    """Count ``amount`` pending downloads and register the id, atomically"""
+    pipeline = client.pipeline(transaction=True)
+    pipeline.incrby(cache.make_and_validate_key(_counter_key(document_id)), amount)
+    pipeline.sadd(cache.make_and_validate_key(DIRTY_KEY), document_id)
+    pipeline.execute()
+
+
+def _take_pending(client, document_id):
+    """Read and clear the pending count of a document, atomically"""
+    key = cache.make_and_validate_key(_counter_key(document_id))
+    pipeline = client.pipeline(transaction=True)
+    pipeline.get(key)
+    pipeline.delete(key)
+    amount, _ = pipeline.execute()
+    return int(amount or 0)
+
+
+def _apply_to_database(document_id, amount):
+    from filemanager.models import Document
+
+    return Document.objects.filter(pk=document_id).update(
+        download_count=F("download_count") + amount
+    )
+
+
+def record_download(document_id):
+    """Count one download for a document"""
+    if not write_behind_enabled():
+        _apply_to_database(document_id, 1)
+        return
+
+    try:
+        # INCR and SADD commit together: a failure applies neither
+        _add_pending(_redis_client(), document_id, 1)
+    except Exception as e:
+        # Never lose a download because the cache is unavailable
+        logger.error(f"Download counter cache error for {document_id}: {str(e)}")
+        _apply_to_database(document_id, 1)
+
+
+def get_pending_downloads(document_id):
+    """Downloads recorded in the cache but not yet flushed to the database"""
+    try:
+        return cache.get(_counter_key(document_id)) or 0
+    except Exception:
+        return 0
+
+
+def get_pending_downloads_many(document_ids):
+    """Pending downloads for several documents in one cache round-trip"""
+    keys = {_counter_key(document_id): document_id for document_id in document_ids}
+    try:
+        values = cache.get_many(list(keys))
+    except Exception:
+        return {}
+    return {keys[key]: value for key, value in values.items() if value}
+
+
+def prefetch_pending_downloads(documents):
+    """
+    Attach pending downloads to ``documents`` (e.g. an admin changelist
+    page) so ``get_total_download_count`` needs no cache read per row.
+    """
+    pending = get_pending_downloads_many([document.pk for document in documents])
+    for document in documents:
+        document._pending_downloads = pending.get(document.pk, 0)
+
+
+def discard_pending_downloads(document_ids):
+    """Drop pending increments, e.g. when counters are reset by an admin"""
+    cache.delete_many([_counter_key(document_id) for document_id in document_ids])
+
+
+def flush_download_counters():
+    """
+    Move pending download counts from the cache to the database.
+    Returns the number of documents updated.
+    """
+    if not write_behind_enabled():
+        return 0
+
+    client = _redis_client()
+    dirty_key = cache.make_and_validate_key(DIRTY_KEY)
+    # Only the ids registered so far; downloads from now on re-add theirs
+    document_ids = client.spop(dirty_key, client.scard(dirty_key)) or []
+
+    flushed = 0
+    for raw_id in document_ids:
+        document_id = int(raw_id)
+        amount = _take_pending(client, document_id)
+        if amount <= 0:
+            continue
+
+        try:
+            _apply_to_database(document_id, amount)
+            flushed += 1
+        except Exception as e:
+            logger.error(f"Error flushing downloads for {document_id}: {str(e)}")
+            _add_pending(client, document_id, amount)
+
+    if flushed:
+        logger.info(f"Flushed download counters for {flushed} documents")
+    return flushed
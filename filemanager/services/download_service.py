@@ -0,0 +1,197 @@
+# filemanager/services/download_service.py
+import hashlib
+import logging
+import mimetypes
+import os
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+from storages.backends.s3boto3 import S3Boto3Storage
+
+from arvan_integration.services import ArvanService
+
+logger = logging.getLogger(__name__)
+
+# Configuration with defaults
+DOWNLOAD_MODE = getattr(settings, "DOCUMENT_DOWNLOAD_MODE", "stream")
+DOWNLOAD_URL_EXPIRY = getattr(settings, "DOCUMENT_DOWNLOAD_URL_EXPIRY", 300)
+DOWNLOAD_CHUNK_SIZE = getattr(settings, "DOCUMENT_DOWNLOAD_CHUNK_SIZE", 64 * 1024)
+
+
+class RangeNotSatisfiable(Exception):
+    """Raised when a Range header cannot be served for the file size"""
+
+
+def build_storage_key(storage, name):
+    """Get the full object key of a storage name inside the bucket"""
+    location = (getattr(storage, "location", "") or "").strip("/")
+    return f"{location}/{name}" if location else name
+
+
+def get_storage_key(field_file):
+    """Get the full object key of a stored file inside the bucket"""
+    return build_storage_key(field_file.storage, field_file.name)
+
+
+def get_file_etag(field_file, size):
+    """
+    Strong ETag for a stored file.
+    Uploaded files never overwrite each other, so name + size identifies content.
+    """
+    digest = hashlib.md5(f"{field_file.name}:{size}".encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(header, etag):
+    """Check an If-None-Match / If-Range header against an ETag"""
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def parse_range_header(header, size):
+    """
+    Parse a single-range ``Range: bytes=...`` header.
+    Returns (start, end) inclusive, or None when the whole file should be sent.
+    Multi-range requests and invalid ranges (RFC 9110: ignored) fall back to
+    the whole file; RangeNotSatisfiable is only raised for valid ranges that
+    lie outside the file.
+    """
+    if not header or not header.startswith("bytes=") or size <= 0:
+        return None
+
+    ranges = header[len("bytes=") :].strip()
+    if "," in ranges:
+        return None
+
+    start_text, _, end_text = ranges.partition("-")
+    try:
+        if not start_text:
+            # Suffix range: the last N bytes
+            suffix = int(end_text)
+            if suffix <= 0:
+                raise RangeNotSatisfiable(header)
+            return max(0, size - suffix), size - 1
+
+        start = int(start_text)
+        end = int(end_text) if end_text else None
+    except ValueError:
+        return None
+
+    if end is not None and end < start:
+        # Syntactically invalid (last byte before first byte)
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    if end is None:
+        end = size - 1
+    return start, min(end, size - 1)
+
+
+def iter_storage_range(field_file, start=0, end=None):
+    """
+    Yield a byte range of a stored file in fixed-size chunks.
+    ``end`` is inclusive; None reads to the end of the file.
+    """
+    storage = field_file.storage
+
+    if isinstance(storage, S3Boto3Storage):
+        body = ArvanService.open_stream(get_storage_key(field_file), start, end)
+
+        def stream():
+            try:
+                yield from body.iter_chunks(DOWNLOAD_CHUNK_SIZE)
+            finally:
+                body.close()
+
+        return stream()
+
+    file_obj = storage.open(field_file.name, "rb")
+
+    def stream():
+        try:
+            file_obj.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                read_size = DOWNLOAD_CHUNK_SIZE
+                if remaining is not None:
+                    read_size = min(read_size, remaining)
+                chunk = file_obj.read(read_size)
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+        finally:
+            file_obj.close()
+
+    return stream()
+
+
+def build_download_response(request, field_file, filename, size=None):
+    """
+    Build a download response for a stored file.
+
+    Answers If-None-Match with 304, serves single byte ranges with 206 and
+    either redirects to a short-lived presigned URL or streams the object in
+    chunks, so the file is never loaded into worker memory.
+    """
+    if not size:
+        # Unknown: file_size is nullable and legacy rows may hold 0
+        size = field_file.size
+
+    etag = get_file_etag(field_file, size)
+    disposition = content_disposition_header(True, filename)
+
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        response = HttpResponse(status=304)
+        response["ETag"] = etag
+        return response
+
+    if DOWNLOAD_MODE == "redirect" and isinstance(field_file.storage, S3Boto3Storage):
+        url = ArvanService.get_download_url(
+            get_storage_key(field_file), DOWNLOAD_URL_EXPIRY, disposition
+        )
+        if url:
+            response = HttpResponseRedirect(url)
+            response["Cache-Control"] = "private, no-store"
+            return response
+        logger.warning(f"Presigned URL unavailable for {field_file.name}, streaming")
+
+    byte_range = None
+    range_header = request.headers.get("Range")
+    if_range = request.headers.get("If-Range")
+    if range_header and (not if_range or if_range == etag):
+        try:
+            byte_range = parse_range_header(range_header, size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            response["ETag"] = etag
+            return response
+
+    start, end = byte_range or (0, size - 1)
+    content_type = (
+        mimetypes.guess_type(field_file.name)[0] or "application/octet-stream"
+    )
+
+    response = StreamingHttpResponse(
+        iter_storage_range(field_file, start, end) if size else iter(()),
+        status=206 if byte_range else 200,
+        content_type=content_type,
+    )
+    response["Content-Length"] = str(end - start + 1 if size else 0)
+    if byte_range:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Content-Disposition"] = disposition
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def get_download_filename(name, field_file):
+    """Build the filename offered to the browser from the document name"""
+    return f"{name}{os.path.splitext(field_file.name)[1]}"
@@ -0,0 +1,122 @@
+# filemanager/services/gallery_stats.py
+"""
+Denormalized ImageGallery statistics.
+
+``ImageGallery.image_count`` and ``total_bytes`` are recomputed with one
+``UPDATE ... SET x = (SELECT ...)`` whenever gallery membership changes
+(``m2m_changed`` on ``images``), an image's size changes or an image is
+deleted. ``annotate_gallery_stats`` computes the same numbers live for
+ad-hoc querysets.
+"""
+import logging
+
+from django.db.models import CharField, Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, NullIf
+
+logger = logging.getLogger(__name__)
+
+
+def image_size_expression(prefix=""):
+    """Stored size of an image: processed size, or original when not processed"""
+    return Coalesce(
+        NullIf(f"{prefix}processed_size", Value(0)), f"{prefix}original_size"
+    )
+
+
+def _through_model():
+    from filemanager.models import ImageGallery
+
+    return ImageGallery.images.through
+
+
+def _stats_subqueries():
+    """(count, bytes) scalar subqueries over the outer gallery's images"""
+    rows = (
+        _through_model()
+        .objects.filter(imagegallery_id=OuterRef("pk"))
+        .order_by()
+        .values("imagegallery_id")
+    )
+    count = Subquery(rows.annotate(value=Count("imageupload_id")).values("value")[:1])
+    total = Subquery(
+        rows.annotate(value=Sum(image_size_expression("imageupload__"))).values(
+            "value"
+        )[:1]
+    )
+    return Coalesce(count, 0), Coalesce(total, 0)
+
+
+def refresh_gallery_stats(gallery_ids=None):
+    """Recompute stats of the given galleries (all when None) in one UPDATE"""
+    from filemanager.models import ImageGallery
+
+    galleries = ImageGallery.objects.all()
+    if gallery_ids is not None:
+        gallery_ids = {gallery_id for gallery_id in gallery_ids if gallery_id}
+        if not gallery_ids:
+            return 0
+        galleries = galleries.filter(pk__in=gallery_ids)
+
+    image_count, total_bytes = _stats_subqueries()
+    return galleries.update(image_count=image_count, total_bytes=total_bytes)
+
+
+def get_gallery_ids_for_image(image_id):
+    return list(
+        _through_model()
+        .objects.filter(imageupload_id=image_id)
+        .values_list("imagegallery_id", flat=True)
+    )
+
+
+def refresh_galleries_of_image(image_id):
+    """Recompute stats of every gallery that contains an image"""
+    return refresh_gallery_stats(get_gallery_ids_for_image(image_id))
+
+
+def annotate_gallery_stats(queryset):
+    """Annotate galleries with live ``live_image_count`` / ``live_total_bytes``"""
+    image_count, total_bytes = _stats_subqueries()
+    return queryset.annotate(live_image_count=image_count, live_total_bytes=total_bytes)
+
+
+def annotate_gallery_thumbnail(queryset):
+    """
+    Annotate galleries with ``thumbnail_name``: the cover image, or the first
+    active image, so a gallery list needs no per-gallery image query.
+    """
+    from filemanager.models import ImageUpload
+
+    def active_name(prefix=""):
+        return Coalesce(
+            NullIf(f"{prefix}processed_image", Value("")),
+            NullIf(f"{prefix}original_image", Value("")),
+            output_field=CharField(),
+        )
+
+    first_image = (
+        ImageUpload.objects.filter(imagegallery=OuterRef("pk"), is_active=True)
+        .order_by("id")
+        .annotate(name=active_name())
+        .values("name")[:1]
+    )
+    return queryset.annotate(
+        thumbnail_name=Coalesce(
+            active_name("cover_image__"),
+            Subquery(first_image),
+            output_field=CharField(),
+        )
+    )
+
+
+def get_thumbnail_url(name):
+    """Public URL of an image storage name (no database access)"""
+    from filemanager.models import ImageUpload
+
+    if not name:
+        return None
+    try:
+        return ImageUpload._meta.get_field("original_image").storage.url(name)
+    except Exception as e:
+        logger.error(f"Error building thumbnail URL for {name}: {str(e)}")
+        return None
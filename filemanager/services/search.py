@@ -0,0 +1,20 @@
+# filemanager/services/search.py
+"""
+Full-text search for images and documents (see core.search).
+"""
+import logging
+
+from core.search import ensure_fulltext_index
+
+logger = logging.getLogger(__name__)
+
+
+def ensure_search_indexes(sender=None, **kwargs):
+    """post_migrate hook for the filemanager app"""
+    from filemanager.models import Document, ImageUpload
+
+    for model in (ImageUpload, Document):
+        try:
+            ensure_fulltext_index(model)
+        except Exception as e:
+            logger.error(f"Could not create FULLTEXT index for {model.__name__}: {str(e)}")
@@ -0,0 +1,238 @@
+# filemanager/services/storage_stats.py
+"""
+Per-user materialized storage counters.
+
+Every active ImageUpload/Document contributes a fixed set of numbers to its
+owner's UserStorageStats row. Save/delete signals apply the difference between
+the old and new contribution with a single ``UPDATE ... SET x = x + delta``,
+so storage endpoints read one row instead of summing every file in Python.
+``reconcile_storage_stats`` rebuilds all rows from aggregates (nightly task).
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce
+
+logger = logging.getLogger(__name__)
+
+IMAGE_FIELDS = [
+    "image_count",
+    "image_original_bytes",
+    "image_processed_bytes",
+    "compressed_image_count",
+    "compressed_original_bytes",
+    "compressed_processed_bytes",
+    "compression_ratio_sum",
+]
+DOCUMENT_FIELDS = ["document_count", "document_bytes"]
+
+_IMAGE_SOURCE_FIELDS = {
+    "uploaded_by_id",
+    "is_active",
+    "original_size",
+    "processed_size",
+    "compression_ratio",
+}
+_DOCUMENT_SOURCE_FIELDS = {"uploaded_by_id", "is_active", "file_size"}
+
+
+def image_contribution(image):
+    """Counters an image adds to its owner's stats"""
+    if not image.is_active:
+        return {}
+    original = image.original_size or 0
+    processed = image.processed_size or 0
+    ratio = image.compression_ratio or 0
+    contribution = {
+        "image_count": 1,
+        "image_original_bytes": original,
+        "image_processed_bytes": processed,
+    }
+    if ratio > 0:
+        contribution.update(
+            {
+                "compressed_image_count": 1,
+                "compressed_original_bytes": original,
+                "compressed_processed_bytes": processed,
+                "compression_ratio_sum": ratio,
+            }
+        )
+    return contribution
+
+
+def document_contribution(document):
+    """Counters a document adds to its owner's stats"""
+    if not document.is_active:
+        return {}
+    return {"document_count": 1, "document_bytes": document.file_size or 0}
+
+
+def _snapshot(instance, source_fields, contribution_func):
+    """(user_id, contribution) of an instance, or None if fields are deferred"""
+    if source_fields & instance.get_deferred_fields() or "uploaded_by_id" not in (
+        instance.__dict__
+    ):
+        return None
+    return instance.uploaded_by_id, contribution_func(instance)
+
+
+def snapshot_image(image):
+    return _snapshot(image, _IMAGE_SOURCE_FIELDS, image_contribution)
+
+
+def snapshot_document(document):
+    return _snapshot(document, _DOCUMENT_SOURCE_FIELDS, document_contribution)
+
+
+def _apply_delta(user_id, delta, create_missing=True):
+    """Add a counters delta to a user's row with one atomic UPDATE"""
+    from filemanager.models import UserStorageStats
+
+    delta = {field: value for field, value in delta.items() if value}
+    if not user_id or not delta:
+        return
+
+    updates = {field: F(field) + value for field, value in delta.items()}
+    updated = UserStorageStats.objects.filter(user_id=user_id).update(**updates)
+    if not updated and create_missing:
+        # First file of this user (or row missing) - build the row from scratch
+        refresh_user_storage_stats([user_id])
+
+
+def apply_change(old_snapshot, new_snapshot):
+    """Apply the difference between two (user_id, contribution) snapshots"""
+    if new_snapshot is None:
+        # Partial instance - fall back to recomputing the affected users
+        user_ids = {old_snapshot[0]} if old_snapshot else set()
+        refresh_user_storage_stats(user_ids)
+        return
+    if old_snapshot is None:
+        refresh_user_storage_stats({new_snapshot[0]})
+        return
+
+    old_user, old_values = old_snapshot
+    new_user, new_values = new_snapshot
+
+    if old_user != new_user:
+        _apply_delta(
+            old_user, {k: -v for k, v in old_values.items()}, create_missing=False
+        )
+        _apply_delta(new_user, new_values)
+        return
+
+    fields = set(old_values) | set(new_values)
+    _apply_delta(
+        new_user,
+        {field: new_values.get(field, 0) - old_values.get(field, 0) for field in fields},
+    )
+
+
+def _aggregate_images(filters):
+    from filemanager.models import ImageUpload
+
+    compressed = Q(compression_ratio__gt=0)
+    return (
+        ImageUpload.objects.filter(is_active=True, **filters)
+        .values("uploaded_by_id")
+        .annotate(
+            image_count=Count("id"),
+            image_original_bytes=Coalesce(Sum("original_size"), 0),
+            image_processed_bytes=Coalesce(Sum("processed_size"), 0),
+            compressed_image_count=Count("id", filter=compressed),
+            compressed_original_bytes=Coalesce(
+                Sum("original_size", filter=compressed), 0
+            ),
+            compressed_processed_bytes=Coalesce(
+                Sum("processed_size", filter=compressed), 0
+            ),
+            compression_ratio_sum=Coalesce(
+                Sum("compression_ratio", filter=compressed), 0.0
+            ),
+        )
+    )
+
+
+def _aggregate_documents(filters):
+    from filemanager.models import Document
+
+    return (
+        Document.objects.filter(is_active=True, **filters)
+        .values("uploaded_by_id")
+        .annotate(
+            document_count=Count("id"),
+            document_bytes=Coalesce(Sum("file_size"), 0),
+        )
+    )
+
+
+def _rebuild(filters, user_ids=None):
+    """Recompute stats rows from aggregates; returns the number of rows written"""
+    from filemanager.models import UserStorageStats
+
+    rows = {}
+    for row in _aggregate_images(filters):
+        rows.setdefault(row.pop("uploaded_by_id"), {}).update(row)
+    for row in _aggregate_documents(filters):
+        rows.setdefault(row.pop("uploaded_by_id"), {}).update(row)
+
+    # Users whose files were all removed still need their row zeroed
+    for user_id in user_ids or []:
+        rows.setdefault(user_id, {})
+
+    zero = {field: 0 for field in IMAGE_FIELDS + DOCUMENT_FIELDS}
+    with transaction.atomic():
+        existing = set(
+            UserStorageStats.objects.filter(user_id__in=rows).values_list(
+                "user_id", flat=True
+            )
+        )
+        to_update = []
+        to_create = []
+        for user_id, values in rows.items():
+            stats = UserStorageStats(user_id=user_id, **{**zero, **values})
+            (to_update if user_id in existing else to_create).append(stats)
+
+        UserStorageStats.objects.bulk_create(to_create, ignore_conflicts=True)
+        UserStorageStats.objects.bulk_update(
+            to_update, IMAGE_FIELDS + DOCUMENT_FIELDS, batch_size=500
+        )
+    return len(rows)
+
+
+def refresh_user_storage_stats(user_ids):
+    """Recompute the stats of specific users (after bulk updates etc.)"""
+    user_ids = [user_id for user_id in set(user_ids) if user_id]
+    if not user_ids:
+        return 0
+    return _rebuild({"uploaded_by_id__in": user_ids}, user_ids)
+
+
+def reconcile_storage_stats():
+    """Rebuild every user's stats from the source tables"""
+    from filemanager.models import UserStorageStats
+
+    stale_user_ids = list(UserStorageStats.objects.values_list("user_id", flat=True))
+    count = _rebuild({}, stale_user_ids)
+    logger.info(f"Storage stats reconciled for {count} users")
+    return count
+
+
+def apply_removal(snapshot):
+    """Subtract a deleted file's contribution from its owner's stats"""
+    if snapshot is None:
+        return
+    user_id, values = snapshot
+    # Never recreate the row here: the owner itself may be being deleted
+    _apply_delta(user_id, {k: -v for k, v in values.items()}, create_missing=False)
+
+
+def get_user_storage_stats(user):
+    """Stats row of a user, built on first access"""
+    from filemanager.models import UserStorageStats
+
+    stats = UserStorageStats.objects.filter(user=user).first()
+    if stats is None:
+        refresh_user_storage_stats([user.pk])
+        stats = UserStorageStats.objects.filter(user=user).first()
+    return stats or UserStorageStats(user=user)
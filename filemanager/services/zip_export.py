@@ -0,0 +1,124 @@
+# filemanager/services/zip_export.py
+import io
+import logging
+import os
+import zipfile
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils.http import content_disposition_header
+
+from filemanager.services.download_service import iter_storage_range
+
+logger = logging.getLogger(__name__)
+
+# Already-compressed formats are stored as-is instead of being deflated again
+STORED_EXTENSIONS = getattr(
+    settings,
+    "ZIP_EXPORT_STORED_EXTENSIONS",
+    [".jpg", ".jpeg", ".png", ".gif", ".webp", ".zip", ".pdf", ".docx", ".xlsx"],
+)
+
+
+class _ZipStreamSink(io.RawIOBase):
+    """Write-only, unseekable buffer that is drained after every write"""
+
+    def __init__(self):
+        super().__init__()
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer += data
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def _unique_name(name, used_names):
+    """Avoid duplicate entry names inside the archive"""
+    base, extension = os.path.splitext(name)
+    candidate = name
+    counter = 1
+    while candidate.lower() in used_names:
+        candidate = f"{base} ({counter}){extension}"
+        counter += 1
+    used_names.add(candidate.lower())
+    return candidate
+
+
+def _safe_entry_name(title, field_file):
+    """Archive entry name from a display title plus the stored file extension"""
+    extension = os.path.splitext(field_file.name)[1].lower()
+    title = (title or "").replace("/", "-").replace("\\", "-").strip()
+    return f"{title or os.path.splitext(os.path.basename(field_file.name))[0]}{extension}"
+
+
+def iter_zip_stream(entries):
+    """
+    Yield a ZIP archive chunk by chunk.
+
+    ``entries`` is an iterable of (title, field_file). Each file is read from
+    storage in chunks and written straight into the archive using data
+    descriptors, so neither the files nor the archive are ever held in memory
+    or on disk; memory use is bounded by the chunk size.
+    """
+    sink = _ZipStreamSink()
+    used_names = set()
+
+    with zipfile.ZipFile(sink, mode="w", allowZip64=True) as archive:
+        for title, field_file in entries:
+            if not field_file:
+                continue
+
+            entry_name = _unique_name(_safe_entry_name(title, field_file), used_names)
+            extension = os.path.splitext(entry_name)[1].lower()
+
+            entry = zipfile.ZipInfo(entry_name)
+            entry.compress_type = (
+                zipfile.ZIP_STORED
+                if extension in STORED_EXTENSIONS
+                else zipfile.ZIP_DEFLATED
+            )
+
+            try:
+                chunks = iter_storage_range(field_file)
+            except Exception as e:
+                logger.error(f"Skipping {field_file.name} in ZIP export: {str(e)}")
+                continue
+
+            with archive.open(entry, mode="w", force_zip64=True) as entry_file:
+                for chunk in chunks:
+                    entry_file.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+
+            data = sink.drain()
+            if data:
+                yield data
+
+    # Central directory
+    yield sink.drain()
+
+
+def build_zip_response(entries, archive_name):
+    """Streaming response for a ZIP archive of the given (title, file) entries"""
+    response = StreamingHttpResponse(
+        iter_zip_stream(entries), content_type="application/zip"
+    )
+    response["Content-Disposition"] = content_disposition_header(
+        True, f"{archive_name}.zip"
+    )
+    response["Cache-Control"] = "private, no-store"
+    return response
@@ -0,0 +1,48 @@
+import logging
+
+from celery import shared_task
+
+from filemanager.services.chunked_upload import cleanup_stale_uploads
+from filemanager.services.dashboard_summary import refresh_dashboard_summary
+from filemanager.services.download_counter import flush_download_counters
+from filemanager.services.gallery_stats import refresh_gallery_stats
+from filemanager.services.storage_stats import reconcile_storage_stats
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def flush_download_counters_task():
+    """
+    انتقال شمارنده‌های دانلود از cache به دیتابیس
+    """
+    flushed = flush_download_counters()
+    return {"flushed_documents": flushed}
+
+
+@shared_task
+def cleanup_stale_uploads_task():
+    """
+    لغو آپلودهای چندبخشی رها شده
+    """
+    aborted = cleanup_stale_uploads()
+    return {"aborted_uploads": aborted}
+
+
+@shared_task
+def reconcile_storage_stats_task():
+    """
+    بازسازی آمار فضای کاربران و گالری‌ها از روی جداول اصلی
+    """
+    users = reconcile_storage_stats()
+    galleries = refresh_gallery_stats()
+    return {"reconciled_users": users, "reconciled_galleries": galleries}
+
+
+@shared_task
+def refresh_dashboard_summary_task(user_id):
+    """
+    بازسازی خلاصه داشبورد کاربر در پس‌زمینه
+    """
+    refresh_dashboard_summary(user_id)
+    return {"user_id": user_id}
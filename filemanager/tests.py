@@ -1,2 +1,962 @@
+import hashlib
+import multiprocessing
+import os
+import queue
+import shutil
+import tempfile
+import zipfile
+from io import BytesIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import DatabaseError
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import Coalesce, NullIf
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image as PILImage
+
+from arvan_integration.storage import ArvanMediaStorage
+from core.pagination import CursorPaginator, paginate_by_cursor
+from core.text import normalize_persian, tokenize
+from filemanager.models import (
+    Document,
+    DocumentUploadSession,
+    ImageGallery,
+    ImageUpload,
+    UserStorageStats,
+)
+from core import search
+from filemanager.services import (
+    chunked_upload,
+    dashboard_summary,
+    download_counter,
+    download_service,
+    storage_stats,
+    zip_export,
+)
+
+LOCMEM_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "download-counter-tests",
+    }
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class DownloadCounterProcessTests(SimpleTestCase):
+    def test_write_behind_needs_a_shared_cache(self):
+        self.assertFalse(download_counter.write_behind_enabled())
+
+    def test_downloads_recorded_in_another_process_reach_the_database(self):
+        context = multiprocessing.get_context("fork")
+        applied = context.Queue()
+
+        def apply_to_database(document_id, amount):
+            applied.put((document_id, amount))
+            return 1
+
+        def web_worker():
+            for _ in range(5):
+                download_counter.record_download(7)
+
+        with mock.patch.object(
+            download_counter, "_apply_to_database", side_effect=apply_to_database
+        ):
+            # Downloads in one process, flush (the Celery worker) in this one
+            worker = context.Process(target=web_worker)
+            worker.start()
+            worker.join()
+            download_counter.flush_download_counters()
+
+        total = 0
+        while True:
+            try:
+                document_id, amount = applied.get(timeout=1)
+            except queue.Empty:
+                break
+            self.assertEqual(document_id, 7)
+            total += amount
+        self.assertEqual(total, 5)
+
+    def test_prefetched_pending_downloads_need_no_read_per_row(self):
+        documents = [Document(pk=pk, download_count=3) for pk in (41, 42)]
+        cache.set(download_counter._counter_key(41), 2)
+        download_counter.prefetch_pending_downloads(documents)
+
+        with mock.patch.object(download_counter, "get_pending_downloads") as read:
+            totals = [document.get_total_download_count() for document in documents]
+        read.assert_not_called()
+        self.assertEqual(totals, [5, 3])
+
+
+class FakeRedis:
+    """The few Redis commands the download counter uses, in memory"""
+
+    def __init__(self):
+        self.values = {}
+        self.sets = {}
+        self.fail = False
+
+    def pipeline(self, transaction=True):
+        return FakeRedisPipeline(self)
+
+    def scard(self, key):
+        return len(self.sets.get(key, ()))
+
+    def spop(self, key, count):
+        members = self.sets.get(key, set())
+        popped = [members.pop() for _ in range(min(count, len(members)))]
+        if not members:
+            self.sets.pop(key, None)
+        return [str(member).encode() for member in popped]
+
+
+class FakeRedisPipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.commands.append((name, args))
+
+    def execute(self):
+        # MULTI/EXEC: a failure applies none of the queued commands
+        if self.client.fail:
+            raise ConnectionError("redis down")
+        values, sets, replies = self.client.values, self.client.sets, []
+        for name, args in self.commands:
+            if name == "incrby":
+                values[args[0]] = values.get(args[0], 0) + args[1]
+                replies.append(values[args[0]])
+            elif name == "sadd":
+                sets.setdefault(args[0], set()).add(args[1])
+                replies.append(1)
+            elif name == "get":
+                replies.append(values.get(args[0]))
+            elif name == "delete":
+                replies.append(int(values.pop(args[0], None) is not None))
+        return replies
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class DownloadCounterWriteBehindTests(SimpleTestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.applied = []
+        self.db_error = None
+
+        def apply_to_database(document_id, amount):
+            if self.db_error:
+                raise self.db_error
+            self.applied.append((document_id, amount))
+            return 1
+
+        for name, value in (
+            ("write_behind_enabled", mock.Mock(return_value=True)),
+            ("_redis_client", mock.Mock(return_value=self.redis)),
+            ("_apply_to_database", apply_to_database),
+        ):
+            patcher = mock.patch.object(download_counter, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_downloads_are_flushed_in_one_update_per_document(self):
+        for document_id in (1, 1, 2, 1):
+            download_counter.record_download(document_id)
+        self.assertEqual(self.applied, [])
+
+        self.assertEqual(download_counter.flush_download_counters(), 2)
+        self.assertEqual(sorted(self.applied), [(1, 3), (2, 1)])
+        self.assertEqual(self.redis.values, {})
+        self.assertEqual(self.redis.sets, {})
+
+        # Nothing pending, nothing written
+        self.assertEqual(download_counter.flush_download_counters(), 0)
+        self.assertEqual(len(self.applied), 2)
+
+    def test_cache_failure_counts_the_download_once_in_the_database(self):
+        self.redis.fail = True
+        download_counter.record_download(5)
+        self.assertEqual(self.applied, [(5, 1)])
+        self.assertEqual(self.redis.values, {})
+
+        self.redis.fail = False
+        self.assertEqual(download_counter.flush_download_counters(), 0)
+        self.assertEqual(self.applied, [(5, 1)])
+
+    def test_failed_flush_keeps_the_count_pending(self):
+        download_counter.record_download(3)
+        download_counter.record_download(3)
+
+        self.db_error = DatabaseError("locked")
+        self.assertEqual(download_counter.flush_download_counters(), 0)
+
+        self.db_error = None
+        self.assertEqual(download_counter.flush_download_counters(), 1)
+        self.assertEqual(self.applied, [(3, 2)])
+
+
+def create_documents(user, *names, **fields):
+    """Documents without touching storage (bulk_create skips save())"""
+    return Document.objects.bulk_create(
+        Document(
+            name=name,
+            file=f"documents/{name}.pdf",
+            file_type="pdf",
+            uploaded_by=user,
+            search_text=search.build_search_text(name),
+            **fields,
+        )
+        for name in names
+    )
+
+
+class SearchTextTests(SimpleTestCase):
+    def test_arabic_forms_digits_and_zwnj_are_normalized(self):
+        self.assertEqual(normalize_persian("كتاب  علي ۱۲"), "کتاب علی 12")
+        self.assertEqual(tokenize("می\u200cخواهم"), tokenize("میخواهم"))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FallbackSearchTests(TestCase):
+    """In-process inverted index used when the database has no FULLTEXT"""
+
+    def setUp(self):
+        search._indexes.clear()
+        search._versions.clear()
+        User = get_user_model()
+        self.owner = User.objects.create(username="owner", slug="owner")
+        self.other = User.objects.create(username="other", slug="other")
+
+    def search_names(self, queryset, query):
+        results = search.search_queryset(queryset, query)
+        return sorted(results.values_list("name", flat=True))
+
+    def test_results_are_scored_within_the_queryset(self):
+        # Other users' rows rank higher and would fill the result limit
+        others = [
+            f"report report other {i}" for i in range(search.MAX_FALLBACK_RESULTS + 5)
+        ]
+        create_documents(self.other, *others)
+        create_documents(self.owner, "report owner")
+        create_documents(self.owner, "report inactive", is_active=False)
+
+        mine = Document.objects.filter(uploaded_by=self.owner, is_active=True)
+        self.assertEqual(self.search_names(mine, "repo"), ["report owner"])
+
+    def test_index_is_rebuilt_after_a_version_bump(self):
+        mine = Document.objects.filter(uploaded_by=self.owner)
+        self.assertEqual(self.search_names(mine, "invoice"), [])
+
+        # Written by another worker: seen once the local version expires
+        create_documents(self.owner, "invoice march")
+        version = search._search_version(Document)
+        self.assertEqual(self.search_names(mine, "invoice"), [])
+        version._local = None
+        self.assertEqual(self.search_names(mine, "invoice"), ["invoice march"])
+
+        # Written by this process: bumped on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            create_documents(self.owner, "invoice april")
+            search.bump_search_version(Document)
+        self.assertEqual(
+            self.search_names(mine, "invoice"), ["invoice april", "invoice march"]
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        search._indexes.clear()
+        search._versions.clear()
+        self.owner = get_user_model().objects.create(username="owner", slug="owner")
+
+    def traverse(self, queryset, ordering, per_page=2):
+        """Pages forward to the end, then back to the start"""
+        paginator = CursorPaginator(queryset, ordering, per_page)
+        forward = [paginator.get_page()]
+        while forward[-1].has_next():
+            forward.append(paginator.get_page(forward[-1].next_cursor))
+        backward = [forward[-1]]
+        while backward[-1].has_previous():
+            backward.append(paginator.get_page(backward[-1].previous_cursor))
+        return (
+            [[row.pk for row in page] for page in forward],
+            [[row.pk for row in page] for page in reversed(backward)],
+        )
+
+    def test_pages_follow_the_ordering_across_tied_sort_keys(self):
+        create_documents(self.owner, *(f"doc {n}" for n in range(5)))
+        documents = Document.objects.filter(uploaded_by=self.owner)
+        documents.update(uploaded_at=Document.objects.first().uploaded_at)
+        expected = list(
+            documents.order_by("-uploaded_at", "-id").values_list("pk", flat=True)
+        )
+
+        forward, backward = self.traverse(documents, ("-uploaded_at", "-id"))
+        self.assertEqual([pk for page in forward for pk in page], expected)
+        self.assertEqual([len(page) for page in forward], [2, 2, 1])
+        self.assertEqual(backward, forward)
+
+    def test_invalid_or_tampered_cursor_falls_back_to_the_first_page(self):
+        create_documents(self.owner, *(f"doc {n}" for n in range(3)))
+        documents = Document.objects.filter(uploaded_by=self.owner)
+        paginator = CursorPaginator(documents, ("-uploaded_at", "-id"), 2)
+        first = [row.pk for row in paginator.get_page()]
+        token = paginator.get_page().next_cursor
+        tampered = token[:-1] + ("A" if token[-1] != "A" else "B")
+
+        for cursor in ("garbage", tampered):
+            with self.subTest(cursor=cursor):
+                page = paginator.get_page(cursor)
+                self.assertEqual([row.pk for row in page], first)
+                self.assertFalse(page.has_previous())
+
+    def test_ordering_by_search_rank(self):
+        create_documents(
+            self.owner,
+            "alpha",
+            "alpha alpha",
+            "alpha beta",
+            "alpha gamma",
+            "alpha alpha alpha",
+            "beta",
+        )
+        results = search.search_queryset(
+            Document.objects.filter(uploaded_by=self.owner), "alpha"
+        )
+        expected = list(
+            results.order_by("-search_rank", "-id").values_list("pk", flat=True)
+        )
+
+        forward, backward = self.traverse(results, ("-search_rank", "-id"))
+        self.assertEqual([pk for page in forward for pk in page], expected)
+        self.assertEqual(len(expected), 5)
+        self.assertEqual(backward, forward)
+
+    def test_page_links_keep_the_filters(self):
+        create_documents(self.owner, *(f"doc {n}" for n in range(3)))
+        documents = Document.objects.filter(uploaded_by=self.owner)
+        token = CursorPaginator(documents, ("-id",), 2).get_page().next_cursor
+        request = RequestFactory().get("/", {"search": "doc", "cursor": token})
+
+        page = paginate_by_cursor(request, documents, ("-id",), 2)
+        self.assertEqual(page.first_query, "search=doc")
+        self.assertTrue(page.previous_query.startswith("search=doc&cursor="))
+
+
+class DownloadResponseTests(SimpleTestCase):
+    """Streamed downloads from a local storage"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        storage = FileSystemStorage(location=directory)
+        name = storage.save("report.pdf", ContentFile(b"0123456789"))
+        self.field_file = SimpleNamespace(name=name, storage=storage, size=10)
+        self.factory = RequestFactory()
+
+    def download(self, size=10, **headers):
+        request = self.factory.get("/download/", **headers)
+        return download_service.build_download_response(
+            request, self.field_file, "report.pdf", size=size
+        )
+
+    def test_stored_zero_size_falls_back_to_the_file(self):
+        response = self.download(size=0)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Length"], "10")
+        self.assertEqual(b"".join(response.streaming_content), b"0123456789")
+
+    def test_range_gets_206_with_only_those_bytes(self):
+        response = self.download(HTTP_RANGE="bytes=2-5")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 2-5/10")
+        self.assertEqual(response["Content-Length"], "4")
+        self.assertEqual(b"".join(response.streaming_content), b"2345")
+
+    def test_matching_etag_gets_304(self):
+        etag = self.download()["ETag"]
+        response = self.download(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_range_past_the_end_gets_416(self):
+        response = self.download(HTTP_RANGE="bytes=10-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */10")
+
+
+class RangeHeaderTests(SimpleTestCase):
+    def test_ranges(self):
+        parse = download_service.parse_range_header
+        self.assertEqual(parse("bytes=0-", 10), (0, 9))
+        self.assertEqual(parse("bytes=4-100", 10), (4, 9))
+        self.assertEqual(parse("bytes=-3", 10), (7, 9))
+        self.assertEqual(parse("bytes=-30", 10), (0, 9))
+
+    def test_invalid_ranges_are_ignored(self):
+        parse = download_service.parse_range_header
+        for header in ("bytes=3-2", "bytes=a-b", "items=0-1", "bytes=0-1,4-5"):
+            self.assertIsNone(parse(header, 10), header)
+
+    def test_unsatisfiable_ranges_raise(self):
+        for header in ("bytes=10-", "bytes=12-20", "bytes=-0"):
+            with self.assertRaises(download_service.RangeNotSatisfiable):
+                download_service.parse_range_header(header, 10)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ChunkedUploadTests(TestCase):
+    """Multipart protocol with Arvan mocked out"""
+
+    def setUp(self):
+        arvan_patcher = mock.patch.object(chunked_upload, "ArvanService")
+        self.arvan = arvan_patcher.start()
+        self.addCleanup(arvan_patcher.stop)
+        self.arvan.upload_part.side_effect = lambda key, upload_id, number, data: (
+            f"etag-{number}"
+        )
+        # Document.save reads the size of the assembled object from storage
+        size_patcher = mock.patch.object(
+            Document._meta.get_field("file").storage, "size", return_value=25
+        )
+        size_patcher.start()
+        self.addCleanup(size_patcher.stop)
+
+        user = get_user_model().objects.create(username="owner", slug="owner")
+        self.session = DocumentUploadSession.objects.create(
+            uploaded_by=user,
+            name="report",
+            original_filename="report.pdf",
+            file_name="files/report.pdf",
+            upload_id="upload-1",
+            total_size=25,
+            chunk_size=10,
+            total_chunks=3,
+        )
+
+    def send(self, *part_numbers):
+        for number in part_numbers:
+            size = self.session.get_expected_chunk_size(number)
+            chunked_upload.upload_chunk(self.session, number, BytesIO(b"x" * size))
+
+    def test_wrong_chunk_size_is_rejected(self):
+        for number, size in ((1, 9), (1, 11), (3, 10)):
+            with self.assertRaises(chunked_upload.ChunkedUploadError):
+                chunked_upload.upload_chunk(self.session, number, BytesIO(b"x" * size))
+        self.arvan.upload_part.assert_not_called()
+        self.assertFalse(self.session.parts.exists())
+
+    def test_missing_part_blocks_completion(self):
+        self.send(1, 3)
+        with self.assertRaisesMessage(chunked_upload.ChunkedUploadError, "2"):
+            chunked_upload.complete_upload(self.session)
+        self.arvan.complete_multipart_upload.assert_not_called()
+        self.assertFalse(Document.objects.exists())
+
+    def test_retry_after_database_failure_creates_one_document(self):
+        self.send(1, 2, 3)
+        with mock.patch.object(Document, "save", side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                chunked_upload.complete_upload(self.session)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, "active")
+
+        # Arvan already assembled the object; the retry finds it complete
+        self.arvan.complete_multipart_upload.side_effect = Exception("NoSuchUpload")
+        self.arvan.get_object_size.return_value = 25
+        document = chunked_upload.complete_upload(self.session)
+        self.assertEqual(chunked_upload.complete_upload(self.session), document)
+        self.arvan.get_object_size.assert_called_once()
+
+        self.assertEqual(Document.objects.count(), 1)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, "completed")
+        self.assertEqual(self.session.document, document)
+        self.assertFalse(self.session.parts.exists())
+
+    def test_aborting_an_inactive_session_is_a_noop(self):
+        self.session.status = "completed"
+        self.session.save(update_fields=["status"])
+        self.assertFalse(chunked_upload.abort_upload(self.session))
+        self.arvan.abort_multipart_upload.assert_not_called()
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, "completed")
+
+    def test_upload_page_enables_the_chunked_client_only_when_available(self):
+        self.client.force_login(self.session.uploaded_by)
+        url = reverse("filemanager:document_upload")
+        for available, flag in ((True, 'data-chunked="1"'), (False, 'data-chunked="0"')):
+            with self.subTest(available=available), mock.patch.object(
+                chunked_upload, "is_chunked_upload_available", return_value=available
+            ):
+                self.assertContains(self.client.get(url), flag)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class StorageStatsTests(TestCase):
+    """Signal-maintained counters against a fresh aggregate of the files"""
+
+    def setUp(self):
+        User = get_user_model()
+        self.owner = User.objects.create(username="owner", slug="owner")
+        self.other = User.objects.create(username="other", slug="other")
+
+    def assertStatsMatch(self, *users):
+        for user in users:
+            images = ImageUpload.objects.filter(uploaded_by=user, is_active=True)
+            compressed = Q(compression_ratio__gt=0)
+            expected = images.aggregate(
+                image_count=Count("id"),
+                image_original_bytes=Sum("original_size", default=0),
+                image_processed_bytes=Sum("processed_size", default=0),
+                compressed_image_count=Count("id", filter=compressed),
+                compressed_original_bytes=Sum(
+                    "original_size", filter=compressed, default=0
+                ),
+                compressed_processed_bytes=Sum(
+                    "processed_size", filter=compressed, default=0
+                ),
+                compression_ratio_sum=Sum(
+                    "compression_ratio", filter=compressed, default=0.0
+                ),
+            )
+            expected.update(
+                Document.objects.filter(uploaded_by=user, is_active=True).aggregate(
+                    document_count=Count("id"),
+                    document_bytes=Sum("file_size", default=0),
+                )
+            )
+            stored = UserStorageStats.objects.values(*expected).get(user=user)
+            self.assertEqual(stored, expected)
+
+    def create_document(self, user, file_size):
+        # No file, so saving never touches storage
+        return Document.objects.create(
+            name="report",
+            file="",
+            file_type="pdf",
+            uploaded_by=user,
+            file_size=file_size,
+        )
+
+    def test_document_lifecycle(self):
+        document = self.create_document(self.owner, 100)
+        self.create_document(self.owner, 40)
+        self.assertStatsMatch(self.owner)
+
+        document.file_size = 250
+        document.save()
+        self.assertStatsMatch(self.owner)
+
+        document.is_active = False
+        document.save()
+        self.assertStatsMatch(self.owner)
+
+        document.is_active = True
+        document.uploaded_by = self.other
+        document.save()
+        self.assertStatsMatch(self.owner, self.other)
+
+        Document.objects.get(pk=document.pk).delete()
+        self.assertStatsMatch(self.owner, self.other)
+
+    def test_image_lifecycle(self):
+        image = ImageUpload.objects.create(
+            title="photo", uploaded_by=self.owner, original_size=1000
+        )
+        self.assertStatsMatch(self.owner)
+
+        image.processed_size = 600
+        image.compression_ratio = 40.0
+        image.save(update_fields=["processed_size", "compression_ratio"])
+        self.assertStatsMatch(self.owner)
+
+        image.is_active = False
+        image.save()
+        self.assertStatsMatch(self.owner)
+
+        image.is_active = True
+        image.uploaded_by = self.other
+        image.save()
+        self.assertStatsMatch(self.owner, self.other)
+
+        ImageUpload.objects.get(pk=image.pk).delete()
+        self.assertStatsMatch(self.owner, self.other)
+
+    def test_reconcile_repairs_drifted_counters(self):
+        self.create_document(self.owner, 100)
+        ImageUpload.objects.create(
+            title="photo", uploaded_by=self.other, original_size=1000
+        )
+        # Changes that bypass the signals
+        Document.objects.update(file_size=300)
+        UserStorageStats.objects.filter(user=self.other).update(image_count=7)
+
+        self.assertEqual(storage_stats.reconcile_storage_stats(), 2)
+        self.assertStatsMatch(self.owner, self.other)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class GalleryStatsTests(TestCase):
+    """Denormalized image_count / total_bytes against a fresh Count/Sum"""
+
+    def setUp(self):
+        self.owner = get_user_model().objects.create(username="owner", slug="owner")
+        self.galleries = [
+            ImageGallery.objects.create(name=f"gallery {n}", created_by=self.owner)
+            for n in range(2)
+        ]
+        self.images = [
+            ImageUpload.objects.create(
+                title=f"photo {n}", uploaded_by=self.owner, original_size=100 * n
+            )
+            for n in range(1, 4)
+        ]
+
+    def assertStatsMatch(self):
+        for gallery in ImageGallery.objects.all():
+            expected = gallery.images.aggregate(
+                count=Count("id"),
+                total=Sum(
+                    Coalesce(NullIf("processed_size", Value(0)), "original_size"),
+                    default=0,
+                ),
+            )
+            self.assertEqual(
+                (gallery.image_count, gallery.total_bytes),
+                (expected["count"], expected["total"]),
+                gallery.name,
+            )
+
+    def test_membership_changes_from_the_gallery_side(self):
+        gallery = self.galleries[0]
+        gallery.images.add(*self.images)
+        self.assertStatsMatch()
+        gallery.images.remove(self.images[0])
+        self.assertStatsMatch()
+        gallery.images.clear()
+        self.assertStatsMatch()
+
+    def test_membership_changes_from_the_image_side(self):
+        image = self.images[1]
+        image.imagegallery_set.add(*self.galleries)
+        self.images[2].imagegallery_set.add(self.galleries[0])
+        self.assertStatsMatch()
+        image.imagegallery_set.remove(self.galleries[1])
+        self.assertStatsMatch()
+        image.imagegallery_set.clear()
+        self.assertStatsMatch()
+
+    def test_image_size_change_and_delete(self):
+        for gallery in self.galleries:
+            gallery.images.add(*self.images[:2])
+
+        image = ImageUpload.objects.get(pk=self.images[0].pk)
+        image.processed_size = 42
+        image.save(update_fields=["processed_size"])
+        self.assertStatsMatch()
+
+        ImageUpload.objects.get(pk=self.images[1].pk).delete()
+        self.assertStatsMatch()
+        self.assertEqual(
+            ImageGallery.objects.get(pk=self.galleries[0].pk).total_bytes, 42
+        )
+
+
+class ZipExportTests(SimpleTestCase):
+    """Streamed archive over a local storage"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.storage = FileSystemStorage(location=directory)
+
+    def stored(self, name, content):
+        name = self.storage.save(name, ContentFile(content))
+        return SimpleNamespace(name=name, storage=self.storage)
+
+    def read_archive(self, entries):
+        chunks = list(zip_export.iter_zip_stream(entries))
+        archive = zipfile.ZipFile(BytesIO(b"".join(chunks)))
+        self.assertIsNone(archive.testzip())
+        return archive
+
+    def test_streamed_bytes_form_a_valid_archive(self):
+        notes = b"notes " * 1000
+        archive = self.read_archive(
+            [
+                ("Report", self.stored("report.pdf", b"%PDF-1.4 data")),
+                ("Notes", self.stored("notes.txt", notes)),
+            ]
+        )
+        self.assertEqual(archive.namelist(), ["Report.pdf", "Notes.txt"])
+        self.assertEqual(archive.read("Notes.txt"), notes)
+        self.assertEqual(archive.read("Report.pdf"), b"%PDF-1.4 data")
+
+    def test_compressed_media_is_stored(self):
+        archive = self.read_archive(
+            [
+                ("Photo", self.stored("photo.jpg", b"jpeg" * 100)),
+                ("Notes", self.stored("notes.txt", b"text" * 100)),
+            ]
+        )
+        self.assertEqual(
+            archive.getinfo("Photo.jpg").compress_type, zipfile.ZIP_STORED
+        )
+        self.assertEqual(
+            archive.getinfo("Notes.txt").compress_type, zipfile.ZIP_DEFLATED
+        )
+
+    def test_duplicate_names_are_made_unique(self):
+        archive = self.read_archive(
+            [
+                ("Report", self.stored("a.pdf", b"first")),
+                ("report", self.stored("b.pdf", b"second")),
+                ("Report", self.stored("c.pdf", b"third")),
+            ]
+        )
+        self.assertEqual(
+            archive.namelist(), ["Report.pdf", "report (1).pdf", "Report (2).pdf"]
+        )
+        self.assertEqual(archive.read("Report (2).pdf"), b"third")
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class DocumentsExportViewTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.owner = User.objects.create(username="owner", slug="owner")
+        other = User.objects.create(username="other", slug="other")
+        self.mine = create_documents(self.owner, "mine")[0]
+        self.inactive = create_documents(self.owner, "old", is_active=False)[0]
+        self.theirs = create_documents(other, "theirs")[0]
+        self.client.force_login(self.owner)
+
+        patcher = mock.patch.object(
+            zip_export,
+            "iter_storage_range",
+            side_effect=lambda field_file: iter([field_file.name.encode()]),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_only_the_requesters_active_documents_are_exported(self):
+        ids = [self.mine.pk, self.inactive.pk, self.theirs.pk]
+        response = self.client.post(
+            reverse("filemanager:documents_export_zip"), {"ids": ids}
+        )
+        self.assertEqual(response.status_code, 200)
+        archive = zipfile.ZipFile(BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(archive.namelist(), ["mine.pdf"])
+
+    def test_get_is_not_allowed(self):
+        response = self.client.get(
+            reverse("filemanager:documents_export_zip"), {"ids": self.mine.pk}
+        )
+        self.assertEqual(response.status_code, 405)
+
+    def test_gallery_export_post_is_not_allowed(self):
+        gallery = ImageGallery.objects.create(name="gallery", created_by=self.owner)
+        response = self.client.post(
+            reverse("filemanager:gallery_export_zip", kwargs={"pk": gallery.pk})
+        )
+        self.assertEqual(response.status_code, 405)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class DashboardSummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = get_user_model().objects.create(username="owner", slug="owner")
+        self.add_document()
+
+    def add_document(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Document.objects.create(
+                name="report", file="", file_type="pdf", uploaded_by=self.owner
+            )
+
+    def total_documents(self):
+        summary = dashboard_summary.get_dashboard_summary(self.owner.pk)
+        return summary["total_documents"]
+
+    def shared_cache(self):
+        # LocMem is shared within this single test process
+        return mock.patch.object(
+            dashboard_summary, "is_shared_cache", return_value=True
+        )
+
+    def test_write_makes_the_next_read_fresh(self):
+        with self.shared_cache(), mock.patch.object(
+            dashboard_summary, "STALE_WHILE_REVALIDATE", False
+        ):
+            self.assertEqual(self.total_documents(), 1)
+            with self.assertNumQueries(0):
+                self.assertEqual(self.total_documents(), 1)
+
+            self.add_document()
+            self.assertEqual(self.total_documents(), 2)
+
+    def test_stale_summary_is_served_while_it_is_rebuilt(self):
+        with self.shared_cache(), mock.patch(
+            "filemanager.tasks.refresh_dashboard_summary_task"
+        ) as task:
+            self.assertEqual(self.total_documents(), 1)
+            self.add_document()
+
+            # Stale entry served; one rebuild scheduled however many reads
+            with self.assertNumQueries(0):
+                self.assertEqual(self.total_documents(), 1)
+                self.assertEqual(self.total_documents(), 1)
+            task.delay.assert_called_once_with(self.owner.pk)
+
+            # What the task runs
+            dashboard_summary.refresh_dashboard_summary(self.owner.pk)
+            with self.assertNumQueries(0):
+                self.assertEqual(self.total_documents(), 2)
+
+    def test_without_a_shared_cache_every_read_is_built(self):
+        self.assertEqual(self.total_documents(), 1)
+        # No version bump needed: nothing is cached
+        Document.objects.create(
+            name="notes", file="", file_type="txt", uploaded_by=self.owner
+        )
+        self.assertEqual(self.total_documents(), 2)
+        self.assertIsNone(cache.get(dashboard_summary._summary_key(self.owner.pk)))
+
+
+class ArvanMediaStorageTests(SimpleTestCase):
+    def test_immutable_cache_headers_only_under_processed_images(self):
+        storage = ArvanMediaStorage(location="media", bucket_name="bucket")
+        immutable = settings.AWS_S3_IMMUTABLE_OBJECT_PARAMETERS["CacheControl"]
+        for name, expected in (
+            ("media/images/processed/ab/abcd.webp", True),
+            ("images/processed/ab/abcd.webp", True),
+            ("media/images/original/2024/01/photo.jpg", False),
+            ("media/documents/images/processed/report.pdf", False),
+        ):
+            with self.subTest(name=name):
+                params = storage.get_object_parameters(name)
+                self.assertEqual(params.get("CacheControl") == immutable, expected)
+
+
+class ContentAddressedRenditionTests(TestCase):
+    """Processed images on a local storage, named after their content hash"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        # Django 5.0 drops the OPTIONS of an overridden default storage, so
+        # the location comes from MEDIA_ROOT
+        storages = override_settings(
+            CACHES=LOCMEM_CACHES,
+            MEDIA_ROOT=self.directory,
+            STORAGES={
+                **settings.STORAGES,
+                "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+            },
+        )
+        storages.enable()
+        self.addCleanup(storages.disable)
+
+        self.owner = get_user_model().objects.create(username="owner", slug="owner")
+        output = BytesIO()
+        PILImage.linear_gradient("L").convert("RGB").save(output, format="PNG")
+        self.original = default_storage.save(
+            "images/original/photo.png", ContentFile(output.getvalue())
+        )
+
+    def create_image(self, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            image = ImageUpload.objects.create(
+                title="photo",
+                uploaded_by=self.owner,
+                original_image=self.original,
+                convert_to_webp=True,
+                minification_level="medium",
+                **fields,
+            )
+        image.refresh_from_db()
+        self.assertEqual(image.processing_status, "completed")
+        return image
+
+    def processed_files(self):
+        found = []
+        for root, _, files in os.walk(os.path.join(self.directory, "images/processed")):
+            found.extend(files)
+        return sorted(found)
+
+    def test_rendition_is_keyed_by_its_content_hash(self):
+        image = self.create_image()
+        with default_storage.open(image.processed_image.name) as stored:
+            digest = hashlib.sha256(stored.read()).hexdigest()
+        self.assertEqual(
+            image.processed_image.name,
+            f"images/processed/{digest[:2]}/{digest}.webp",
+        )
+
+    def test_identical_reprocess_reuses_the_stored_object(self):
+        image = self.create_image()
+        name = image.processed_image.name
+        with mock.patch.object(
+            FileSystemStorage, "save", wraps=default_storage.save
+        ) as save:
+            with self.captureOnCommitCallbacks(execute=True):
+                image.reprocess_image()
+        save.assert_not_called()
+        self.assertEqual(image.processed_image.name, name)
+        self.assertEqual(self.processed_files(), [os.path.basename(name)])
+
+    def test_old_rendition_is_deleted_on_commit_when_unreferenced(self):
+        image = self.create_image()
+        old_name = image.processed_image.name
+
+        image.minification_level = "maximum"
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            image.reprocess_image()
+        self.assertNotEqual(image.processed_image.name, old_name)
+        self.assertTrue(default_storage.exists(old_name))
+
+        for callback in callbacks:
+            callback()
+        self.assertFalse(default_storage.exists(old_name))
+
+    def test_old_rendition_still_referenced_is_kept(self):
+        image = self.create_image()
+        other = self.create_image()
+        old_name = image.processed_image.name
+        self.assertEqual(other.processed_image.name, old_name)
+
+        image.minification_level = "maximum"
+        with self.captureOnCommitCallbacks(execute=True):
+            image.reprocess_image()
+        self.assertTrue(default_storage.exists(old_name))
+
+    def test_concurrently_stored_duplicate_is_dropped(self):
+        first = self.create_image()
+        # Another process stored the same content between exists() and save():
+        # only the model's own check misses, save() still sees the file
+        real_exists = FileSystemStorage.exists
+        missed = []
+
+        def exists(storage, name):
+            if not missed:
+                missed.append(name)
+                return False
+            return real_exists(storage, name)
+
+        with mock.patch.object(FileSystemStorage, "exists", exists):
+            second = self.create_image()
+        self.assertEqual(missed, [first.processed_image.name])
+        self.assertEqual(second.processed_image.name, first.processed_image.name)
+        self.assertEqual(
+            self.processed_files(), [os.path.basename(first.processed_image.name)]
+        )
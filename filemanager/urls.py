@@ -6,6 +6,7 @@ from  filemanager.views.document_view import *
 from  filemanager.views.dashboard_view import *
 from  filemanager.views.api_view import *
 from  filemanager.views.ajax_view import *
+from  filemanager.views.chunked_upload_view import *
 
 app_name = "filemanager"
 
@@ -27,9 +28,17 @@ urlpatterns = [
     path("galleries/<int:pk>/", gallery_detail, name="gallery_detail"),
     path("galleries/<int:pk>/edit/", gallery_edit, name="gallery_edit"),
     path("galleries/<int:pk>/delete/", gallery_delete, name="gallery_delete"),
+    path("galleries/<int:pk>/export/", gallery_export_zip, name="gallery_export_zip"),
     # Document URLs
     path("documents/", document_list, name="document_list"),
     path("documents/upload/", document_upload, name="document_upload"),
+    path("documents/export/", documents_export_zip, name="documents_export_zip"),
+    # Chunked (resumable) document uploads
+    path("documents/uploads/", chunked_upload_initiate, name="chunked_upload_initiate"),
+    path("documents/uploads/<uuid:token>/", chunked_upload_status, name="chunked_upload_status"),
+    path("documents/uploads/<uuid:token>/parts/<int:part_number>/", chunked_upload_part, name="chunked_upload_part"),
+    path("documents/uploads/<uuid:token>/complete/", chunked_upload_complete, name="chunked_upload_complete"),
+    path("documents/uploads/<uuid:token>/abort/", chunked_upload_abort, name="chunked_upload_abort"),
     path("documents/<int:pk>/", document_detail, name="document_detail"),
     path("documents/<int:pk>/edit/", document_edit, name="document_edit"),
     path("documents/<int:pk>/delete/", document_delete, name="document_delete"),
@@ -0,0 +1,110 @@
+import json
+import logging
+
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET, require_http_methods, require_POST
+
+from filemanager.models import DocumentUploadSession
+from filemanager.services.chunked_upload import (
+    ChunkedUploadError,
+    abort_upload,
+    complete_upload,
+    get_upload_status,
+    initiate_upload,
+    upload_chunk,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@login_required
+@require_POST
+def chunked_upload_initiate(request):
+    """Start a chunked document upload"""
+    try:
+        data = json.loads(request.body or "{}")
+        session = initiate_upload(
+            request.user,
+            name=data.get("name"),
+            filename=data.get("filename"),
+            total_size=int(data.get("total_size") or 0),
+            description=data.get("description", ""),
+            file_type=data.get("file_type", ""),
+        )
+        return JsonResponse(
+            {"success": True, **get_upload_status(session)}, status=201
+        )
+    except (ValueError, ChunkedUploadError) as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=400)
+    except Exception as e:
+        logger.error(f"Error starting chunked upload: {str(e)}")
+        return JsonResponse(
+            {"success": False, "message": "خطا در شروع آپلود"}, status=500
+        )
+
+
+@login_required
+@require_GET
+def chunked_upload_status(request, token):
+    """Report received parts so an interrupted upload can resume"""
+    session = get_object_or_404(
+        DocumentUploadSession, token=token, uploaded_by=request.user
+    )
+    return JsonResponse({"success": True, **get_upload_status(session)})
+
+
+@login_required
+@require_http_methods(["PUT", "POST"])
+def chunked_upload_part(request, token, part_number):
+    """Receive one chunk (raw request body) and store it as a multipart part"""
+    session = get_object_or_404(
+        DocumentUploadSession, token=token, uploaded_by=request.user
+    )
+    try:
+        status = upload_chunk(session, part_number, request)
+        return JsonResponse({"success": True, **status})
+    except ChunkedUploadError as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=400)
+    except Exception as e:
+        logger.error(f"Error uploading part {part_number} of {token}: {str(e)}")
+        return JsonResponse(
+            {"success": False, "message": "خطا در آپلود بخش"}, status=500
+        )
+
+
+@login_required
+@require_POST
+def chunked_upload_complete(request, token):
+    """Assemble the uploaded parts and create the document"""
+    session = get_object_or_404(
+        DocumentUploadSession, token=token, uploaded_by=request.user
+    )
+    try:
+        document = complete_upload(session)
+        return JsonResponse(
+            {
+                "success": True,
+                "document_id": document.pk,
+                "url": document.get_absolute_url(),
+            }
+        )
+    except ChunkedUploadError as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=400)
+    except Exception as e:
+        logger.error(f"Error completing chunked upload {token}: {str(e)}")
+        return JsonResponse(
+            {"success": False, "message": "خطا در تکمیل آپلود"}, status=500
+        )
+
+
+@login_required
+@require_POST
+def chunked_upload_abort(request, token):
+    """Cancel a chunked upload"""
+    session = get_object_or_404(
+        DocumentUploadSession, token=token, uploaded_by=request.user
+    )
+    aborted = abort_upload(session)
+    return JsonResponse({"success": aborted})
@@ -1,16 +1,22 @@
 import logging
-import os
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-from django.db.models import Q
-from django.http import Http404, HttpResponse
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.http import require_POST
 
+from core.pagination import paginate_by_cursor
+from core.search import search_queryset
 from filemanager.forms.document_form import DocumentSearchForm, DocumentForm
 from filemanager.models import Document
+from filemanager.services import chunked_upload
+from filemanager.services.download_service import (
+    build_download_response,
+    get_download_filename,
+)
+from filemanager.services.storage_stats import get_user_storage_stats
+from filemanager.services.zip_export import build_zip_response
 
 logger = logging.getLogger(__name__)
 
@@ -20,26 +26,30 @@ def document_list(request):
     """List all documents with search and filtering"""
     form = DocumentSearchForm(request.GET or None)
     documents = Document.objects.filter(uploaded_by=request.user, is_active=True)
+    ordering = ("-uploaded_at", "-id")
 
     if form.is_valid():
-        # Apply search filters
+        # Apply search filters (ranked full-text search, best matches first)
         search = form.cleaned_data.get("search")
         if search:
-            documents = documents.filter(
-                Q(name__icontains=search) | Q(description__icontains=search)
-            )
+            documents = search_queryset(documents, search)
+            ordering = ("-search_rank", "-id")
 
         file_type = form.cleaned_data.get("file_type")
         if file_type:
             documents = documents.filter(file_type=file_type)
 
-    # Order by upload date
-    documents = documents.order_by("-uploaded_at")
-
-    # Pagination
-    paginator = Paginator(documents, 10)  # 10 documents per page
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    # Cursor pagination, newest first; the stats counter is exact when unfiltered
+    approximate_total = None
+    if not form.is_valid() or not any(form.cleaned_data.values()):
+        approximate_total = get_user_storage_stats(request.user).document_count
+    page_obj = paginate_by_cursor(
+        request,
+        documents,
+        ordering,
+        10,  # 10 documents per page
+        approximate_total=approximate_total,
+    )
 
     context = {
         "page_obj": page_obj,
@@ -72,7 +82,16 @@ def document_upload(request):
     else:
         form = DocumentForm(user=request.user)
 
-    return render(request, "filemanager/document_upload.html", {"form": form})
+    return render(
+        request,
+        "filemanager/document_upload.html",
+        {
+            "form": form,
+            # فایل‌های بزرگ‌تر از یک بخش با آپلود چندبخشی و قابل ادامه ارسال می‌شوند
+            "chunked_upload_enabled": chunked_upload.is_chunked_upload_available(),
+            "chunked_upload_chunk_size": chunked_upload.CHUNK_SIZE,
+        },
+    )
 
 
 @login_required
@@ -113,7 +132,7 @@ def document_delete(request, pk):
 
 @login_required
 def document_download(request, pk):
-    """Download document"""
+    """Download document (streamed or redirected, with Range/ETag support)"""
     document = get_object_or_404(Document, pk=pk, uploaded_by=request.user)
 
     try:
@@ -121,24 +140,24 @@ def document_download(request, pk):
         if not document.file:
             raise Http404("فایل یافت نشد")
 
-        # Increment download counter
-        document.increment_download_count()
-
-        # Get file path and name
-        file_path = document.file.path
-        original_name = document.name
-        file_extension = os.path.splitext(document.file.name)[1]
-
-        # Create safe filename
-        safe_filename = f"{original_name}{file_extension}"
+        response = build_download_response(
+            request,
+            document.file,
+            get_download_filename(document.name, document.file),
+            size=document.file_size,
+        )
 
-        # Create response with file
-        with open(file_path, "rb") as f:
-            response = HttpResponse(f.read(), content_type="application/octet-stream")
-            response["Content-Disposition"] = f'attachment; filename="{safe_filename}"'
-            response["Content-Length"] = os.path.getsize(file_path)
+        # Count a download once per transfer, not per resumed range or 304
+        is_new_download = response.status_code in (200, 302) or (
+            response.status_code == 206
+            and response["Content-Range"].startswith("bytes 0-")
+        )
+        if is_new_download:
+            document.increment_download_count()
+            logger.info(
+                f"Document downloaded: {document.name} by {request.user.username}"
+            )
 
-        logger.info(f"Document downloaded: {document.name} by {request.user.username}")
         return response
 
     except FileNotFoundError:
@@ -149,3 +168,40 @@ def document_download(request, pk):
         logger.error(f"Error downloading document {document.name}: {str(e)}")
         messages.error(request, "خطا در دانلود فایل.")
         return redirect("filemanager:document_detail", pk=document.pk)
+
+
+@login_required
+@require_POST
+def documents_export_zip(request):
+    """Download selected documents as a streamed ZIP archive"""
+    raw_ids = request.POST.getlist("ids")
+    try:
+        document_ids = [int(pk) for value in raw_ids for pk in value.split(",") if pk]
+    except ValueError:
+        messages.error(request, "شناسه فایل‌ها نامعتبر است.")
+        return redirect("filemanager:document_list")
+
+    if not document_ids:
+        messages.error(request, "هیچ فایلی انتخاب نشده است.")
+        return redirect("filemanager:document_list")
+
+    documents = Document.objects.filter(
+        pk__in=document_ids, uploaded_by=request.user, is_active=True
+    ).order_by("-uploaded_at")
+
+    # Only the user's own active documents are exported
+    exported_count = documents.count()
+    if not exported_count:
+        messages.error(request, "هیچ‌کدام از فایل‌های انتخاب‌شده یافت نشد.")
+        return redirect("filemanager:document_list")
+
+    entries = (
+        (document.name, document.file)
+        for document in documents.iterator(chunk_size=200)
+    )
+
+    logger.info(
+        f"{exported_count} of {len(document_ids)} requested documents exported "
+        f"as ZIP by {request.user.username}"
+    )
+    return build_zip_response(entries, "documents")
@@ -2,12 +2,17 @@ import logging
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_GET, require_POST
 
+from core.pagination import paginate_by_cursor
 from filemanager.forms.image_gallery_form import ImageGalleryForm
 from filemanager.models import ImageGallery
+from filemanager.services.gallery_stats import (
+    annotate_gallery_thumbnail,
+    get_thumbnail_url,
+)
+from filemanager.services.zip_export import build_zip_response
 
 logger = logging.getLogger(__name__)
 
@@ -15,14 +20,15 @@ logger = logging.getLogger(__name__)
 @login_required
 def gallery_list(request):
     """List all galleries"""
-    galleries = ImageGallery.objects.filter(created_by=request.user).order_by(
-        "-created_at"
+    galleries = annotate_gallery_thumbnail(
+        ImageGallery.objects.filter(created_by=request.user)
     )
 
-    # Pagination
-    paginator = Paginator(galleries, 9)  # 9 galleries per page
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    # Cursor pagination, newest first
+    page_obj = paginate_by_cursor(request, galleries, ("-created_at", "-id"), 9)
+
+    for gallery in page_obj.object_list:
+        gallery.thumbnail_url = get_thumbnail_url(gallery.thumbnail_name)
 
     context = {
         "page_obj": page_obj,
@@ -34,12 +40,16 @@ def gallery_list(request):
 def gallery_detail(request, pk):
     """Gallery detail view"""
     gallery = get_object_or_404(ImageGallery, pk=pk, created_by=request.user)
-    images = gallery.images.filter(is_active=True).order_by("-created_at")
-
-    # Pagination for gallery images
-    paginator = Paginator(images, 12)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    images = gallery.images.filter(is_active=True)
+
+    # Cursor pagination for gallery images; image_count also counts inactive ones
+    page_obj = paginate_by_cursor(
+        request,
+        images,
+        ("-created_at", "-id"),
+        12,
+        approximate_total=gallery.image_count,
+    )
 
     context = {
         "gallery": gallery,
@@ -48,6 +58,22 @@ def gallery_detail(request, pk):
     return render(request, "filemanager/gallery_detail.html", context)
 
 
+@login_required
+@require_GET
+def gallery_export_zip(request, pk):
+    """Download all active images of a gallery as a streamed ZIP archive"""
+    gallery = get_object_or_404(ImageGallery, pk=pk, created_by=request.user)
+    images = gallery.images.filter(is_active=True).order_by("-created_at")
+
+    entries = (
+        (image.title, image.get_active_image())
+        for image in images.iterator(chunk_size=200)
+    )
+
+    logger.info(f"Gallery exported as ZIP: {gallery.name} by {request.user.username}")
+    return build_zip_response(entries, gallery.name)
+
+
 @login_required
 def gallery_create(request):
     """Create new gallery"""
@@ -2,15 +2,16 @@ import logging
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-from django.db.models import Q
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.http import require_POST
 
+from core.pagination import paginate_by_cursor
 from filemanager.forms.bulkImage_process_form import BulkImageProcessForm
 from filemanager.forms.image_gallery_form import ImageSearchForm
 from filemanager.forms.image_upload_form import ImageUploadForm
 from filemanager.models import ImageGallery, ImageUpload
+from core.search import search_queryset
+from filemanager.services.storage_stats import get_user_storage_stats
 
 logger = logging.getLogger(__name__)
 
@@ -19,14 +20,14 @@ def image_list(request):
     """List all images with search and filtering"""
     form = ImageSearchForm(request.GET or None)
     images = ImageUpload.objects.filter(uploaded_by=request.user, is_active=True)
+    ordering = ("-created_at", "-id")
 
     if form.is_valid():
-        # Apply search filters
+        # Apply search filters (ranked full-text search, best matches first)
         search = form.cleaned_data.get("search")
         if search:
-            images = images.filter(
-                Q(title__icontains=search) | Q(description__icontains=search)
-            )
+            images = search_queryset(images, search)
+            ordering = ("-search_rank", "-id")
 
         minification_level = form.cleaned_data.get("minification_level")
         if minification_level:
@@ -44,13 +45,17 @@ def image_list(request):
         if processing_status:
             images = images.filter(processing_status=processing_status)
 
-    # Order by creation date
-    images = images.order_by("-created_at")
-
-    # Pagination
-    paginator = Paginator(images, 12)  # 12 images per page
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    # Cursor pagination, newest first; the stats counter is exact when unfiltered
+    approximate_total = None
+    if not form.is_valid() or not any(form.cleaned_data.values()):
+        approximate_total = get_user_storage_stats(request.user).image_count
+    page_obj = paginate_by_cursor(
+        request,
+        images,
+        ordering,
+        12,  # 12 images per page
+        approximate_total=approximate_total,
+    )
 
     context = {
         "page_obj": page_obj,
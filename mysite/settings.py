@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 import logging
 import os
 import sys
+import tempfile
 from pathlib import Path
 
 import environ
@@ -68,6 +69,21 @@ AWS_S3_OBJECT_PARAMETERS = {
     "CacheControl": "max-age=86400",  # cache برای 24 ساعت
     "Metadata": {"processed-by": "django-image-processor"},
 }
+# فایل‌های پردازش شده با هش محتوا نام‌گذاری می‌شوند و هرگز تغییر نمی‌کنند
+AWS_S3_IMMUTABLE_PREFIXES = ["images/processed/"]
+AWS_S3_IMMUTABLE_OBJECT_PARAMETERS = {
+    "CacheControl": "public, max-age=31536000, immutable",  # cache برای 1 سال
+}
+# دانلود اسناد: "stream" (ارسال تکه‌تکه از طریق سرور) یا "redirect" (لینک موقت امضاشده)
+DOCUMENT_DOWNLOAD_MODE = env("DOCUMENT_DOWNLOAD_MODE", default="stream")
+DOCUMENT_DOWNLOAD_URL_EXPIRY = 300  # اعتبار لینک موقت (ثانیه)
+DOCUMENT_DOWNLOAD_CHUNK_SIZE = 64 * 1024  # اندازه هر تکه هنگام stream
+
+# آپلود چندبخشی و قابل ادامه اسناد بزرگ
+CHUNKED_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # حداقل 5MB برای multipart
+CHUNKED_UPLOAD_MAX_SIZE = 500 * 1024 * 1024  # 500MB
+CHUNKED_UPLOAD_EXPIRY_HOURS = 24  # آپلودهای رها شده پس از این مدت لغو می‌شوند
+
 # فرمت‌های مجاز برای آپلود
 ALLOWED_IMAGE_EXTENSIONS = [".jpg", ".jpeg", ".png", ".gif", ".webp"]
 
@@ -89,7 +105,46 @@ CACHES = {
         "OPTIONS": {
             "MAX_ENTRIES": 10000,
         },
+    },
+    # Per-worker counters, used only while the shared store is unavailable
+    "rate-limit-local": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "rate-limit-local",
+        "OPTIONS": {
+            "MAX_ENTRIES": 10000,
+        },
+    },
+}
+
+# Shared rate limit counters: Redis when configured (every worker and
+# node), otherwise a SQLite file shared by the workers of this host (kept
+# outside the source tree; RATE_LIMIT_SQLITE_PATH overrides it)
+RATE_LIMIT_REDIS_URL = env("RATE_LIMIT_REDIS_URL", default="")
+if RATE_LIMIT_REDIS_URL:
+    CACHES["rate-limit"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": RATE_LIMIT_REDIS_URL,
+        "KEY_PREFIX": "rl",
+        "OPTIONS": {
+            # Connection pool per worker; fail fast so the breaker can trip
+            "max_connections": 50,
+            "socket_timeout": 0.05,
+            "socket_connect_timeout": 0.05,
+        },
     }
+    RATE_LIMIT_STORE = "cache"
+else:
+    RATE_LIMIT_STORE = "sqlite"
+RATE_LIMIT_CACHE = "rate-limit"
+RATE_LIMIT_SQLITE_PATH = env(
+    "RATE_LIMIT_SQLITE_PATH",
+    default=str(Path(tempfile.gettempdir()) / "mysite-ratelimit.sqlite3"),
+)
+RATE_LIMIT_FALLBACK_CACHE = "rate-limit-local"
+RATE_LIMIT_STORE_TIMEOUT = 0.05  # seconds; slower calls count as failures
+RATE_LIMIT_BREAKER = {
+    "failure_threshold": 5,
+    "reset_timeout": 30,
 }
 
 # ========================================
@@ -180,7 +235,7 @@ MEDIA_URL = f"https://{AWS_S3_CUSTOM_DOMAIN}/media/"
 # Also update your STORAGES configuration to handle the different paths
 STORAGES = {
     "default": {
-        "BACKEND": "storages.backends.s3boto3.S3Boto3Storage",
+        "BACKEND": "arvan_integration.storage.ArvanMediaStorage",
         "OPTIONS": {
             "location": "media",
         },
@@ -391,6 +446,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "users.context_processors.admin_events",
             ],
         },
     },
@@ -520,6 +576,16 @@ DEFAULT_FROM_EMAIL = env("DEFAULT_FROM_EMAIL", default="shoku@erfann31dev.ir")
 # File backend settings (if using file backend)
 EMAIL_FILE_PATH = BASE_DIR / "sent_emails"
 
+# Admin notifications push (SSE). Off by default: the dropdown polls every
+# 30 seconds. Only enable it when the stream URL is served by an ASGI server
+# (mysite.asgi) and ADMIN_EVENTS_REDIS_URL is set - under WSGI (Passenger,
+# runserver) every open stream holds a worker and never delivers events, and
+# without Redis events published by other workers never arrive.
+ADMIN_EVENTS_SSE = env("ADMIN_EVENTS_SSE", default=False, cast=bool)
+ADMIN_EVENTS_REDIS_URL = env("ADMIN_EVENTS_REDIS_URL", default="")
+ADMIN_EVENTS_HEARTBEAT = 15  # seconds between keep-alive comments
+ADMIN_EVENTS_QUEUE_SIZE = 100  # pending events per connection
+
 # Celery Task Configuration
 CELERY_ACCEPT_CONTENT = ["application/json"]
 CELERY_TASK_SERIALIZER = "json"
@@ -527,6 +593,36 @@ CELERY_RESULT_SERIALIZER = "json"
 CELERY_BROKER_URL = "sqla+sqlite:///celerydb.sqlite"
 CELERY_RESULT_BACKEND = "django-db"
 
+# Periodic tasks
+CELERY_BEAT_SCHEDULE = {
+    "flush-download-counters": {
+        "task": "filemanager.tasks.flush_download_counters_task",
+        "schedule": 60.0,  # هر 1 دقیقه
+    },
+    "cleanup-stale-uploads": {
+        "task": "filemanager.tasks.cleanup_stale_uploads_task",
+        "schedule": 3600.0,  # هر 1 ساعت
+    },
+    "reconcile-storage-stats": {
+        "task": "filemanager.tasks.reconcile_storage_stats_task",
+        "schedule": 86400.0,  # هر 24 ساعت
+    },
+}
+
+# شمارنده دانلود اسناد ابتدا در cache افزایش می‌یابد و دوره‌ای در دیتابیس ذخیره می‌شود
+# فقط با cache از نوع Redis فعال می‌شود؛ در غیر این صورت هر دانلود مستقیم در دیتابیس ثبت می‌شود
+DOWNLOAD_COUNTER_WRITE_BEHIND = True
+
+# خلاصه داشبورد مدیریت فایل در cache نگهداری می‌شود؛ نسخه قدیمی تا بازسازی در پس‌زمینه نمایش داده می‌شود
+# فقط با cache مشترک (Redis/Memcached)؛ با LocMem خلاصه در هر درخواست ساخته می‌شود
+FILEMANAGER_DASHBOARD_CACHE_TIMEOUT = 600
+FILEMANAGER_DASHBOARD_STALE_WHILE_REVALIDATE = True
+
+# درخت بخش‌ها با یک کوئری ساخته و تا تغییر بعدی بخش‌ها در cache نگهداری می‌شود
+SECTIONS_TREE_CACHE_TIMEOUT = 3600
+SECTIONS_TREE_MAX_AGE = 60  # ثانیه، برای مرورگر
+SECTIONS_TREE_S_MAXAGE = 300  # ثانیه، برای CDN
+
 
 DEFAULT_CHARSET = "utf-8"
 EMAIL_USE_LOCALTIME = True
@@ -622,22 +718,61 @@ RATE_LIMIT_SKIP_PATHS = [
 # }
 
 
-# Different rate limits for different user types (optional)
+# Different rate limits for different user types. These apply to every
+# page, so they only stop floods; ordinary browsing (each page also fetches
+# /sections/api/navigation/) must stay far below them.
 RATE_LIMIT_TIERS = {
-    "anonymous": {"requests": 30, "window": 300},  # 30 req/5min for anonymous
-    "authenticated": {"requests": 60, "window": 300},  # 60 req/5min for authenticated
-    "premium": {"requests": 120, "window": 300},  # 120 req/5min for premium users
-    "staff": {"requests": 300, "window": 300},  # 300 req/5min for staff
+    "anonymous": {"requests": 600, "window": 300},  # 600 req/5min for anonymous
+    "authenticated": {"requests": 1200, "window": 300},  # 1200 req/5min for authenticated
+    "premium": {"requests": 2400, "window": 300},  # 2400 req/5min for premium users
+    "staff": {"requests": 6000, "window": 300},  # 6000 req/5min for staff
+}
+
+# Map user type slugs to tiers (staff users always get the "staff" tier)
+RATE_LIMIT_USER_TYPE_TIERS = {
+    "subscriber": "premium",
+    "customer": "premium",
 }
 
-# Rate limiting by endpoint patterns (optional)
+# Local token-bucket tier: each worker leases batches of tokens from the
+# shared counters, so most requests are checked without a cache round-trip.
+# Up to ERROR_MARGIN of a limit may be leased but unused per worker.
+RATE_LIMIT_LOCAL_TIER = True
+RATE_LIMIT_LOCAL_ERROR_MARGIN = 0.05
+RATE_LIMIT_LOCAL_MAX_KEYS = 10000
+
+# Top clients/paths (bounded heavy-hitter summaries) and Prometheus counters
+RATE_LIMIT_ANALYTICS = True
+RATE_LIMIT_ANALYTICS_CAPACITY = 1000
+# Bearer token for scraping /metrics/ without a staff session (empty: staff
+# only). Not an IP allow-list: behind the proxy every client is 127.0.0.1.
+METRICS_TOKEN = env("METRICS_TOKEN", default="")
+
+# Rate limiting by endpoint patterns (optional), on top of the tier limit.
+# Patterns match request.path of the routes in mysite/urls.py; "methods"
+# restricts a limit to those methods, "exclusive" replaces the tier limit.
 RATE_LIMIT_ENDPOINTS = {
-    r"^/api/auth/": {"requests": 5, "window": 300},  # Login endpoints - stricter
-    r"^/api/search/": {
-        "requests": 100,
+    # Login, OTP verification and password reset submissions - stricter
+    r"^/users/(login|auth/login|verify-login|verify|signup|register|send-sms"
+    r"|forgot-password|verify-reset-password|reset-password|resend-reset-code)/$": {
+        "requests": 10,
         "window": 300,
-    },  # Search endpoints - more lenient
-    r"^/api/upload/": {"requests": 10, "window": 600},  # Upload endpoints - very strict
+        "methods": ["POST"],
+    },
+    # Chunked upload parts (8MB each; a 500MB file is ~65 parts) have their own
+    # budget and do not count against the browsing tier
+    r"^/filemanager/documents/uploads/[0-9a-f-]+/parts/\d+/$": {
+        "requests": 300,
+        "window": 300,
+        "exclusive": True,
+    },
+    # Uploads (single-request uploads and starting a chunked upload) - very strict
+    r"^/filemanager/(images/upload|documents/upload|documents/uploads)/$"
+    r"|^/(users/)?ckeditor/upload/": {
+        "requests": 10,
+        "window": 600,
+        "methods": ["POST"],
+    },
 }
 
 # CKEditor Configuration
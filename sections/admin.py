@@ -4,6 +4,7 @@ import logging
 
 from django import forms
 from django.contrib import admin
+from django.db.models import Count
 from django.forms import ModelForm
 from django.http import HttpResponse, JsonResponse
 from django.urls import path, reverse
@@ -13,6 +14,7 @@ from django.utils.translation import gettext_lazy as _
 from django.views.decorators.csrf import csrf_exempt
 
 from .models import Section
+from .services.reorder import apply_section_order
 
 logger = logging.getLogger("sections")
 
@@ -35,7 +37,12 @@ class SectionForm(ModelForm):
                 exclude_ids = [self.instance.pk] + [d.pk for d in descendants]
                 queryset = queryset.exclude(pk__in=exclude_ids)
 
-            queryset = queryset.filter(level__lt=3).order_by("level", "order")
+            # display_title of level 2 sections reads the (joined) parent
+            queryset = (
+                queryset.filter(level__lt=3)
+                .select_related("parent")
+                .order_by("level", "order")
+            )
 
             choices = [("", "---------")]
             for section in queryset:
@@ -89,6 +96,10 @@ class SectionAdmin(admin.ModelAdmin):
         ),
     )
 
+    def get_queryset(self, request):
+        # Children counts for action_buttons, without a query per row
+        return super().get_queryset(request).annotate(children_count=Count("children"))
+
     def get_full_path(self, obj):
         """Display the full hierarchical path"""
         return obj.full_path if hasattr(obj, "full_path") else obj.title
@@ -139,13 +150,16 @@ class SectionAdmin(admin.ModelAdmin):
                     obj.pk,
                 )
             )
-        if obj.children.exists():
+        children_count = getattr(obj, "children_count", None)
+        if children_count is None:
+            children_count = obj.children.count()
+        if children_count:
             buttons.append(
                 format_html(
                     '<a class="button" href="{}?parent__id__exact={}" title="View Children">Children ({})</a>',
                     reverse("admin:sections_section_changelist"),
                     obj.pk,
-                    obj.children.count(),
+                    children_count,
                 )
             )
         return format_html(" ".join(buttons))
@@ -364,15 +378,16 @@ class SectionAdmin(admin.ModelAdmin):
             data = json.loads(request.body.decode("utf-8"))
             level_orders = data.get("level_orders", {})
 
-            success_count = 0
-            for level_str, section_ids in level_orders.items():
-                level = int(level_str)
-                for index, section_id in enumerate(section_ids, start=1):
-                    updated = Section.objects.filter(id=section_id, level=level).update(
-                        order=index
-                    )
-                    if updated:
-                        success_count += 1
+            try:
+                success_count = apply_section_order(
+                    [
+                        (int(level_str), section_ids)
+                        for level_str, section_ids in level_orders.items()
+                    ]
+                )
+            except ValueError as e:
+                # ReorderError, or a level that is not a number
+                return JsonResponse({"success": False, "message": str(e)}, status=400)
 
             logger.info(
                 f"Reordered {success_count} sections by {request.user.username}"
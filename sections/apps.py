@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class SectionsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "sections"
+
+    def ready(self):
+        from sections.services.search import ensure_search_indexes
+
+        # FULLTEXT indexes cannot be declared in Meta.indexes
+        post_migrate.connect(ensure_search_indexes, sender=self)
@@ -0,0 +1,60 @@
+# sections/management/commands/rebuild_section_paths.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from sections.models import PATH_SEPARATOR, Section, path_step
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the materialized path (and level) of every section; also "
+        "rewrites paths stored with an older step width"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=500, help="Rows per bulk update"
+        )
+
+    def handle(self, *args, **options):
+        sections = {
+            section.pk: section
+            for section in Section.objects.only(
+                "pk", "parent_id", "path", "level", "updated_at"
+            )
+        }
+        paths = {}
+
+        def build(section, seen=()):
+            if section.pk in paths:
+                return paths[section.pk]
+            parent = sections.get(section.parent_id)
+            if parent is None or parent.pk in seen:
+                path = path_step(section.pk)
+            else:
+                parent_path = build(parent, (*seen, section.pk))
+                path = f"{parent_path}{PATH_SEPARATOR}{path_step(section.pk)}"
+            paths[section.pk] = path
+            return path
+
+        now = timezone.now()
+        changed = []
+        for section in sections.values():
+            path = build(section)
+            level = path.count(PATH_SEPARATOR) + 1
+            if section.path != path or section.level != level:
+                section.path = path
+                section.level = level
+                section.updated_at = now
+                changed.append(section)
+
+        with transaction.atomic():
+            Section.objects.bulk_update(
+                changed,
+                ["path", "level", "updated_at"],
+                batch_size=options["batch_size"],
+            )
+            Section.bump_tree_version()
+
+        self.stdout.write(self.style.SUCCESS(f"{len(changed)} sections updated"))
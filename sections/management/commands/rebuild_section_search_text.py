@@ -0,0 +1,48 @@
+# sections/management/commands/rebuild_section_search_text.py
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.search import build_search_text, bump_search_version, ensure_fulltext_index
+from sections.models import Section
+from sections.services.search import html_to_text
+
+
+class Command(BaseCommand):
+    help = "Fill search_text of sections and create the FULLTEXT index"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=500, help="Rows per bulk update"
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        updated = 0
+        batch = []
+        # updated_at moves the search version other workers compare against
+        now = timezone.now()
+        rows = Section.objects.only(
+            "pk", "title", "content", "search_text", "updated_at"
+        ).iterator(chunk_size=batch_size)
+        for section in rows:
+            search_text = build_search_text(
+                section.title, html_to_text(section.content)
+            )
+            if search_text == section.search_text:
+                continue
+            section.search_text = search_text
+            section.updated_at = now
+            batch.append(section)
+            if len(batch) >= batch_size:
+                Section.objects.bulk_update(batch, ["search_text", "updated_at"])
+                updated += len(batch)
+                batch = []
+        if batch:
+            Section.objects.bulk_update(batch, ["search_text", "updated_at"])
+            updated += len(batch)
+
+        if ensure_fulltext_index(Section):
+            self.stdout.write("FULLTEXT index created for Section")
+        bump_search_version(Section)
+
+        self.stdout.write(self.style.SUCCESS(f"Section: {updated} rows updated"))
@@ -1,7 +1,10 @@
 # sections/models.py
 from ckeditor_uploader.fields import RichTextUploadingField
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Concat, Substr
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
 
@@ -15,6 +18,22 @@ SECTION_TYPE_CHOICES = [
     ("custom", "سفارشی"),
 ]
 
+# Materialized path: zero-padded ids of the ancestors and the section itself.
+# Steps are as wide as the largest id (BigAutoField), so lexicographic order
+# of paths is tree order for every id; paths of older, narrower widths are
+# rewritten by manage.py rebuild_section_paths.
+PATH_SEPARATOR = "."
+PATH_STEP_WIDTH = len(str(models.BigIntegerField.MAX_BIGINT))
+
+
+def path_step(pk):
+    return str(pk).zfill(PATH_STEP_WIDTH)
+
+
+def path_ids(path):
+    """Section ids of a materialized path, root first"""
+    return [int(step) for step in path.split(PATH_SEPARATOR)] if path else []
+
 
 class Section(models.Model):
     title = models.CharField(max_length=200, verbose_name=_("Title"))
@@ -40,6 +59,16 @@ class Section(models.Model):
         related_name="children",
     )
     level = models.PositiveIntegerField(default=1, verbose_name=_("Level"))
+    path = models.CharField(
+        max_length=255,
+        blank=True,
+        default="",
+        editable=False,
+        db_index=True,
+        verbose_name=_("Path"),
+    )
+    # Title + visible text of the content, normalized (see services.search)
+    search_text = models.TextField(blank=True, default="", editable=False)
 
     created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Created At"))
     updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated At"))
@@ -67,11 +96,8 @@ class Section(models.Model):
                 raise ValidationError(_("Maximum 7 root sections allowed"))
 
         if self.parent and self.pk:
-            current = self.parent
-            while current:
-                if current.pk == self.pk:
-                    raise ValidationError(_("Cannot set self or descendant as parent"))
-                current = current.parent
+            if self.pk in self.parent.get_path_ids():
+                raise ValidationError(_("Cannot set self or descendant as parent"))
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -92,38 +118,129 @@ class Section(models.Model):
             )
             self.order = max_order + 1
 
-        super().save(*args, **kwargs)
+        from core.search import build_search_text, update_search_text
+        from sections.services.search import html_to_text
 
-    def get_descendants(self):
-        """Get all descendant sections (children, grandchildren, etc.)"""
-        descendants = []
+        update_search_text(
+            self,
+            kwargs,
+            "title",
+            "content",
+            text=build_search_text(self.title, html_to_text(self.content)),
+        )
 
-        def collect_descendants(section):
-            for child in section.children.all():
-                descendants.append(child)
-                collect_descendants(child)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            # auto_now is only written when listed; the tree version reads it
+            update_fields = kwargs["update_fields"] = {*update_fields, "updated_at"}
+        if update_fields is not None and "parent" not in update_fields:
+            # Hierarchy untouched (e.g. reordering): path stays as it is
+            super().save(*args, **kwargs)
+            return
 
-        collect_descendants(self)
-        return descendants
+        with transaction.atomic():
+            self._save_with_path(*args, **kwargs)
 
-    def get_ancestors(self):
-        """Get all ancestor sections (parent, grandparent, etc.)"""
-        ancestors = []
+    def _save_with_path(self, *args, **kwargs):
+        """Save and keep ``path`` of the section and its subtree in sync"""
+        # Stored paths, not the in-memory ones, which may be stale
+        stored = dict(
+            Section.objects.filter(
+                pk__in=[pk for pk in (self.pk, self.parent_id) if pk]
+            ).values_list("pk", "path")
+        )
+        parent_path = stored.get(self.parent_id, "") if self.parent_id else ""
+        if self.parent_id and not parent_path:
+            # Parent not backfilled yet (see rebuild_section_paths)
+            parent_path = self.parent.build_path()
+        prefix = f"{parent_path}{PATH_SEPARATOR}" if parent_path else ""
+
+        if self.pk is None or self.pk not in stored:
+            super().save(*args, **kwargs)
+            self.path = prefix + path_step(self.pk)
+            Section.objects.filter(pk=self.pk).update(path=self.path)
+            return
+
+        old_path = stored[self.pk]
+        old_level = len(path_ids(old_path)) or self.level
+        self.path = prefix + path_step(self.pk)
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "path", "level"}
+        super().save(*args, **kwargs)
+
+        if old_path and old_path != self.path:
+            # Moved: rewrite the prefix of the whole subtree in one UPDATE
+            Section.objects.filter(
+                path__startswith=f"{old_path}{PATH_SEPARATOR}"
+            ).update(
+                path=Concat(
+                    models.Value(self.path),
+                    Substr("path", len(old_path) + 1),
+                    output_field=models.CharField(),
+                ),
+                level=models.F("level") + (self.level - old_level),
+            )
+
+    def build_path(self):
+        """Materialized path computed by walking the parents (for backfills)"""
+        steps = [path_step(self.pk)]
         current = self.parent
         while current:
-            ancestors.append(current)
+            steps.insert(0, path_step(current.pk))
             current = current.parent
+        return PATH_SEPARATOR.join(steps)
+
+    def get_path_ids(self):
+        """Ids of the ancestors and the section itself, root first"""
+        if self.path:
+            return path_ids(self.path)
+        return path_ids(self.build_path()) if self.pk else []
+
+    def get_descendants(self):
+        """Get all descendant sections (children, grandchildren, etc.)"""
+        if not self.path:
+            # Not backfilled yet: walk the children level by level
+            descendants = []
+            level = [self] if self.pk else []
+            while level:
+                level = list(Section.objects.filter(parent__in=level))
+                descendants.extend(level)
+            return descendants
+        return list(
+            Section.objects.filter(
+                path__startswith=f"{self.path}{PATH_SEPARATOR}"
+            ).order_by("path")
+        )
+
+    def _get_loaded_ancestors(self):
+        """Ancestors reachable through already loaded parents, else None"""
+        ancestors = []
+        current = self
+        while current.parent_id is not None:
+            if not Section.parent.is_cached(current):
+                return None
+            current = current.parent
+            ancestors.append(current)
         return ancestors
 
+    def get_ancestors(self):
+        """Get all ancestor sections (parent, grandparent, etc.)"""
+        ancestors = self._get_loaded_ancestors()
+        if ancestors is not None:
+            return ancestors
+
+        # One IN query for the ids in the path
+        ids = self.get_path_ids()[:-1]
+        sections = Section.objects.in_bulk(ids)
+        return [sections[pk] for pk in reversed(ids) if pk in sections]
+
     @property
     def full_path(self):
         """Get the full hierarchical path of the section"""
-        path_parts = []
-        current = self
-        while current:
-            path_parts.insert(0, current.title)
-            current = current.parent
-        return " > ".join(path_parts)
+        return " > ".join(
+            [ancestor.title for ancestor in reversed(self.get_ancestors())]
+            + [self.title]
+        )
 
     @property
     def breadcrumb_path(self):
@@ -186,63 +303,53 @@ class Section(models.Model):
 
     @classmethod
     def get_tree_structure(cls):
-        """Get hierarchical tree structure of all active sections"""
-        root_sections = cls.objects.filter(level=1, is_active=True).order_by("order")
-
-        def build_tree(sections):
-            tree = []
-            for section in sections:
-                tree.append(
-                    {
-                        "section": section,
-                        "children": build_tree(
-                            section.children.filter(is_active=True).order_by("order")
-                        ),
-                    }
-                )
-            return tree
-
-        return build_tree(root_sections)
+        """Get hierarchical tree structure of all active sections (one query)"""
+        from sections.services.tree import build_section_tree
+
+        return build_section_tree()
 
     @classmethod
     def get_flat_tree(cls):
         """Get flattened tree structure for easier iteration"""
-
-        def flatten_tree(tree, depth=0):
-            flat = []
-            for node in tree:
-                section = node["section"]
-                section._tree_depth = depth
-                flat.append(section)
-                flat.extend(flatten_tree(node["children"], depth + 1))
-            return flat
+        from sections.services.tree import flatten_tree
 
         return flatten_tree(cls.get_tree_structure())
 
     @classmethod
     def reorder_sections(cls, section_ids):
-        """Reorder sections based on provided ID list"""
-        for index, section_id in enumerate(section_ids, start=1):
-            cls.objects.filter(id=section_id).update(order=index)
+        """Reorder sections based on provided ID list (one UPDATE)"""
+        from sections.services.reorder import apply_section_order
+
+        return apply_section_order([(None, section_ids)])
 
     @classmethod
     def reorder_level(cls, level, section_ids):
-        """Reorder sections within a specific level"""
-        for index, section_id in enumerate(section_ids, start=1):
-            cls.objects.filter(id=section_id, level=level).update(order=index)
+        """Reorder sections within a specific level (one UPDATE)"""
+        from sections.services.reorder import apply_section_order
+
+        return apply_section_order([(level, section_ids)])
+
+    @classmethod
+    def bump_tree_version(cls):
+        """Invalidate cached trees after changes that bypass save/delete"""
+        from sections.services.tree import bump_tree_version
+
+        bump_tree_version()
 
     @classmethod
     def get_level_statistics(cls):
-        """Get statistics for each level"""
-
-        stats = {}
-        for level in range(1, 4):
-            stats[level] = {
-                "total": cls.objects.filter(level=level).count(),
-                "active": cls.objects.filter(level=level, is_active=True).count(),
-                "inactive": cls.objects.filter(level=level, is_active=False).count(),
+        """Get statistics for each level (one cached query)"""
+        from sections.services.stats import get_section_statistics
+
+        by_level = get_section_statistics()["by_level"]
+        return {
+            level: {
+                "total": by_level[level]["total"],
+                "active": by_level[level]["active"],
+                "inactive": by_level[level]["inactive"],
             }
-        return stats
+            for level in range(1, 4)
+        }
 
     @classmethod
     def get_max_order_for_level(cls, level, parent=None):
@@ -277,14 +384,12 @@ class Section(models.Model):
         """Get display title with hierarchy numbering"""
         if self.level == 1:
             return f"{self.order}. {self.title}"
-        elif self.level == 2:
-            parent_order = self.parent.order if self.parent else 1
-            return f"{parent_order}.{self.order}. {self.title}"
-        elif self.level == 3:
-            grandparent_order = (
-                self.parent.parent.order if self.parent and self.parent.parent else 1
-            )
-            parent_order = self.parent.order if self.parent else 1
+        elif self.level in (2, 3):
+            ancestors = self.get_ancestors() if self.parent_id else []
+            parent_order = ancestors[0].order if ancestors else 1
+            if self.level == 2:
+                return f"{parent_order}.{self.order}. {self.title}"
+            grandparent_order = ancestors[1].order if len(ancestors) > 1 else 1
             return f"{grandparent_order}.{parent_order}.{self.order}. {self.title}"
         return self.title
 
@@ -302,7 +407,31 @@ class Section(models.Model):
     @property
     def is_leaf(self):
         """Check if this section has no children"""
+        children_count = getattr(self, "children_count", None)
+        if children_count is not None:
+            return not children_count
         return not self.children.exists()
 
     def __unicode__(self):
         return self.__str__()
+
+
+@receiver(post_save, sender=Section)
+@receiver(post_delete, sender=Section)
+def invalidate_section_tree(sender, instance, **kwargs):
+    """Make cached section trees stale"""
+    from sections.services.tree import bump_tree_version
+
+    bump_tree_version()
+
+
+@receiver(post_save, sender=Section)
+@receiver(post_delete, sender=Section)
+def invalidate_section_search_index(sender, instance, **kwargs):
+    """Rebuild in-process search indexes after searchable rows change"""
+    from core.search import bump_search_version
+
+    update_fields = kwargs.get("update_fields")
+    if update_fields is not None and "search_text" not in update_fields:
+        return
+    bump_search_version(sender)
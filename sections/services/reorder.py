@@ -0,0 +1,88 @@
+# sections/services/reorder.py
+"""
+Set-based reordering of sections.
+
+A whole new ordering is validated against the database with one query and
+then written with ``UPDATE ... SET order = CASE id WHEN ... END`` (one
+statement per UPDATE_BATCH_SIZE sections) inside a transaction, so a
+drag-and-drop save costs a couple of round-trips however many sections
+move, and either every new position is stored or none is.
+"""
+import logging
+
+from django.db import models, transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
+
+from .tree import bump_tree_version
+
+logger = logging.getLogger(__name__)
+
+UPDATE_BATCH_SIZE = 500
+
+
+class ReorderError(ValueError):
+    """Raised when an ordering does not match the sections it names"""
+
+
+def _validate(groups):
+    """{section_id: order} for [(level, section_ids)]; raises ReorderError"""
+    from sections.models import Section
+
+    orders = {}
+    expected_levels = {}
+    for level, section_ids in groups:
+        for index, section_id in enumerate(section_ids, start=1):
+            try:
+                section_id = int(section_id)
+            except (TypeError, ValueError):
+                raise ReorderError(f"Invalid section id: {section_id!r}")
+            if section_id in orders:
+                raise ReorderError(f"Section {section_id} is listed more than once")
+            orders[section_id] = index
+            expected_levels[section_id] = level
+
+    levels = dict(
+        Section.objects.filter(pk__in=orders).values_list("pk", "level")
+    )
+    missing = sorted(set(orders) - set(levels))
+    if missing:
+        raise ReorderError(f"Unknown section ids: {missing}")
+    wrong_level = sorted(
+        pk
+        for pk, level in expected_levels.items()
+        if level is not None and levels[pk] != level
+    )
+    if wrong_level:
+        raise ReorderError(f"Sections not on the given level: {wrong_level}")
+    return orders
+
+
+def apply_section_order(groups):
+    """
+    Give each list of section ids in ``groups`` ([(level, section_ids)])
+    the orders 1..n; ``level`` None accepts sections of any level.
+    Returns the number of sections updated.
+    """
+    from sections.models import Section
+
+    orders = _validate(groups)
+    if not orders:
+        return 0
+
+    items = list(orders.items())
+    changed_at = timezone.now()
+    updated = 0
+    with transaction.atomic():
+        for start in range(0, len(items), UPDATE_BATCH_SIZE):
+            batch = items[start : start + UPDATE_BATCH_SIZE]
+            updated += Section.objects.filter(pk__in=[pk for pk, _ in batch]).update(
+                order=Case(
+                    *(When(pk=pk, then=Value(order)) for pk, order in batch),
+                    output_field=models.PositiveIntegerField(),
+                ),
+                # Not set by auto_now on update(); the tree version reads it
+                updated_at=changed_at,
+            )
+        bump_tree_version()
+    return updated
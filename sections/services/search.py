@@ -0,0 +1,41 @@
+# sections/services/search.py
+"""
+Plain-text search column for sections.
+
+Section content is CKEditor HTML; searching it directly matches tags,
+attributes and inline styles. ``search_text`` holds the title plus only the
+visible text of the content (``html_to_text``), built with
+``core.search.build_search_text`` and searched with the same FULLTEXT /
+in-process index machinery as images and documents.
+"""
+import html
+import logging
+import re
+
+from core.search import ensure_fulltext_index
+
+logger = logging.getLogger(__name__)
+
+# Elements whose content is never shown
+_HIDDEN_RE = re.compile(
+    r"<(script|style|template)\b[^>]*>.*?</\1\s*>|<!--.*?-->", re.IGNORECASE | re.DOTALL
+)
+_TAG_RE = re.compile(r"<[^>]*>")
+
+
+def html_to_text(value):
+    """Visible text of an HTML fragment (tags become word breaks)"""
+    if not value:
+        return ""
+    text = _TAG_RE.sub(" ", _HIDDEN_RE.sub(" ", value))
+    return html.unescape(text)
+
+
+def ensure_search_indexes(sender=None, **kwargs):
+    """post_migrate hook for the sections app"""
+    from sections.models import Section
+
+    try:
+        ensure_fulltext_index(Section)
+    except Exception as e:
+        logger.error(f"Could not create FULLTEXT index for Section: {str(e)}")
@@ -0,0 +1,61 @@
+# sections/services/stats.py
+"""
+Section statistics from a single query.
+
+Every count shown on the sections pages (per level, active/inactive, with
+or without content) comes from one ``GROUP BY level, is_active`` query with
+conditional aggregation. The result is cached under the tree version, so it
+is rebuilt only after sections change.
+"""
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .tree import KEY_PREFIX, SECTIONS_TREE_CACHE_TIMEOUT, get_tree_version
+
+LEVELS = (1, 2, 3)
+
+
+def _empty_counts():
+    return {"total": 0, "active": 0, "inactive": 0, "with_content": 0}
+
+
+def build_section_statistics():
+    """Counts straight from the database (one query)"""
+    from sections.models import Section
+
+    rows = (
+        Section.objects.order_by()
+        .values("level", "is_active")
+        .annotate(
+            total=Count("pk"),
+            with_content=Count("pk", filter=~Q(content="")),
+        )
+    )
+
+    stats = _empty_counts()
+    by_level = {level: _empty_counts() for level in LEVELS}
+    for row in rows:
+        status = "active" if row["is_active"] else "inactive"
+        level_counts = by_level.setdefault(row["level"], _empty_counts())
+        for counts in (stats, level_counts):
+            counts["total"] += row["total"]
+            counts[status] += row["total"]
+            counts["with_content"] += row["with_content"]
+
+    stats["without_content"] = stats["total"] - stats["with_content"]
+    stats["by_level"] = by_level
+    return stats
+
+
+def get_section_statistics():
+    """
+    {"total", "active", "inactive", "with_content", "without_content",
+    "by_level": {level: {"total", "active", "inactive", "with_content"}}};
+    a cache read unless sections changed since it was last built.
+    """
+    key = f"{KEY_PREFIX}:{get_tree_version()}:stats"
+    stats = cache.get(key)
+    if stats is None:
+        stats = build_section_statistics()
+        cache.set(key, stats, SECTIONS_TREE_CACHE_TIMEOUT)
+    return stats
@@ -0,0 +1,158 @@
+# sections/services/tree.py
+"""
+Section tree built from a single query.
+
+All sections are fetched in one ordered query and linked to their parents
+in memory (O(n)); parents are attached to their children, so properties
+walking up the hierarchy (display_title, full_path) need no more queries.
+
+The navigation data derived from the active tree is cached under the tree
+version (core.services.cache.ModelVersion): a counter in the shared cache,
+bumped after commit by every write, or without a shared cache the row count
+plus the latest ``updated_at``, memoized per process for a few seconds. So
+every worker agrees on it, and reading it costs a cache read rather than a
+query. Writes that bypass save() bump it and set ``updated_at`` themselves.
+
+The JSON endpoints serve bytes serialized once per version, with an ETag
+hashed from those bytes, so a 304 always means the client already has
+exactly what would be sent.
+"""
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.services.cache import ModelVersion
+
+logger = logging.getLogger(__name__)
+
+# Configuration with defaults
+SECTIONS_TREE_CACHE_TIMEOUT = getattr(
+    settings, "SECTIONS_TREE_CACHE_TIMEOUT", 3600
+)
+# Browsers revalidate after max-age; shared caches (CDN) may keep it longer
+SECTIONS_TREE_MAX_AGE = getattr(settings, "SECTIONS_TREE_MAX_AGE", 60)
+SECTIONS_TREE_S_MAXAGE = getattr(settings, "SECTIONS_TREE_S_MAXAGE", 300)
+
+KEY_PREFIX = "sections:tree"
+
+_tree_version = ModelVersion(f"{KEY_PREFIX}:version", "sections.Section")
+
+
+def get_tree_version():
+    """Current tree version; no query unless the local copy expired"""
+    return _tree_version.get()
+
+
+def bump_tree_version():
+    """Mark every cached tree as stale once the current transaction commits"""
+    _tree_version.bump()
+
+
+def build_section_tree(active_only=True):
+    """
+    [{"section": Section, "children": [...]}, ...] for the root sections,
+    ordered like the original recursive builder, in one query.
+    """
+    from sections.models import Section
+
+    sections = Section.objects.all()
+    if active_only:
+        sections = sections.filter(is_active=True)
+    sections = list(sections.order_by("level", "order", "id"))
+
+    nodes = {section.pk: {"section": section, "children": []} for section in sections}
+    tree = []
+    for section in sections:
+        node = nodes[section.pk]
+        if section.parent_id is None:
+            if section.level == 1:
+                tree.append(node)
+            continue
+        parent = nodes.get(section.parent_id)
+        if parent is None:
+            # Under an excluded (inactive) parent: not part of the tree
+            continue
+        section.parent = parent["section"]
+        parent["children"].append(node)
+    return tree
+
+
+def flatten_tree(tree, depth=0):
+    """Depth-first list of the tree's sections, with _tree_depth set"""
+    flat = []
+    for node in tree:
+        section = node["section"]
+        section._tree_depth = depth
+        flat.append(section)
+        flat.extend(flatten_tree(node["children"], depth + 1))
+    return flat
+
+
+def _serialize(tree):
+    """(tree, navigation) payloads of the JSON endpoints"""
+    tree_items = []
+    navigation_items = []
+    for node in tree:
+        section = node["section"]
+        children_tree, children_navigation = _serialize(node["children"])
+        tree_items.append(
+            {
+                "id": section.id,
+                "title": section.title,
+                "slug": section.slug,
+                "level": section.level,
+                "order": section.order,
+                "display_title": section.display_title,
+                "has_content": bool(section.content),
+                "children": children_tree,
+            }
+        )
+        navigation_items.append(
+            {
+                "id": section.id,
+                "title": section.title,
+                "slug": section.slug,
+                "url": f"/sections/{section.id}/",
+                "level": section.level,
+                "has_children": bool(node["children"]),
+                "children": children_navigation,
+            }
+        )
+    return tree_items, navigation_items
+
+
+def get_tree_data(version=None):
+    """
+    {"version", "tree", "navigation"} for the active sections; a cache read
+    unless the tree changed since it was last built.
+    """
+    if version is None:
+        version = get_tree_version()
+    key = f"{KEY_PREFIX}:{version}:data"
+    data = cache.get(key)
+    if data is None:
+        tree, navigation = _serialize(build_section_tree())
+        data = {"version": version, "tree": tree, "navigation": navigation}
+        cache.set(key, data, SECTIONS_TREE_CACHE_TIMEOUT)
+    return data
+
+
+def get_tree_json(kind, version=None):
+    """
+    (etag, body): UTF-8 JSON body of the tree/navigation endpoint, serialized
+    once per version, and its strong ETag (a hash of the body).
+    """
+    if version is None:
+        version = get_tree_version()
+    key = f"{KEY_PREFIX}:{version}:{kind}.json"
+    cached = cache.get(key)
+    if cached is None:
+        payload = {"success": True, kind: get_tree_data(version)[kind]}
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        etag = f'"sections-{kind}-{hashlib.sha256(body).hexdigest()[:32]}"'
+        cached = (etag, body)
+        cache.set(key, cached, SECTIONS_TREE_CACHE_TIMEOUT)
+    return cached
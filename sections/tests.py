@@ -1,2 +1,280 @@
+import json
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import search
+from sections.models import PATH_SEPARATOR, Section, path_step
+from sections.services import tree
+from sections.services.reorder import ReorderError, apply_section_order
+from sections.services.search import html_to_text
+from sections.services.stats import get_section_statistics
+from sections.views import tree_json_response
+
+LOCMEM_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "sections-tests",
+    }
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SectionTreeTests(TestCase):
+    def setUp(self):
+        tree._tree_version._local = None
+        self.root = Section.objects.create(title="Root", order=1)
+        self.child = Section.objects.create(title="Child", parent=self.root, order=1)
+        self.leaf = Section.objects.create(title="Leaf", parent=self.child, order=1)
+        Section.objects.create(
+            title="Hidden", parent=self.root, order=2, is_active=False
+        )
+
+    def test_tree_is_built_from_one_query(self):
+        with self.assertNumQueries(1):
+            built = tree.build_section_tree()
+            # Parents are attached in memory, so walking up costs nothing
+            leaf = built[0]["children"][0]["children"][0]["section"]
+            self.assertEqual(leaf.parent.parent.pk, self.root.pk)
+
+        self.assertEqual(
+            [section.title for section in tree.flatten_tree(built)],
+            ["Root", "Child", "Leaf"],
+        )
+
+    def test_cached_version_is_read_without_queries(self):
+        version = tree.get_tree_version()
+        with self.assertNumQueries(0):
+            self.assertEqual(tree.get_tree_version(), version)
+
+    def test_writes_make_the_version_stale(self):
+        version = tree.get_tree_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.leaf.title = "Renamed"
+            self.leaf.save(update_fields=["title"])
+        self.assertNotEqual(tree.get_tree_version(), version)
+
+        version = tree.get_tree_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Section.reorder_level(2, [self.child.pk])
+        self.assertNotEqual(tree.get_tree_version(), version)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SectionTreeJsonTests(TestCase):
+    def setUp(self):
+        tree._tree_version._local = None
+        self.section = Section.objects.create(title="Root", order=1)
+        self.factory = RequestFactory()
+
+    def get(self, **headers):
+        request = self.factory.get(reverse("sections:api_navigation"), **headers)
+        return tree_json_response(request, "navigation")
+
+    def test_matching_etag_gets_304_without_queries(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_weak_etag_matches(self):
+        etag = self.get()["ETag"]
+        response = self.get(HTTP_IF_NONE_MATCH=f'"other", W/{etag}')
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_follows_the_content(self):
+        etag = self.get()["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.section.title = "Renamed"
+            self.section.save()
+
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertIn("Renamed", response.content.decode())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SectionStatisticsTests(TestCase):
+    def setUp(self):
+        tree._tree_version._local = None
+        root = Section.objects.create(title="Root", order=1, content="<p>Intro</p>")
+        child = Section.objects.create(title="Child", parent=root, order=1)
+        Section.objects.create(
+            title="Hidden", parent=root, order=2, is_active=False, content="<p>x</p>"
+        )
+        self.leaf = Section.objects.create(
+            title="Leaf", parent=child, order=1, is_active=False
+        )
+
+    def test_counts_come_from_one_query_then_the_cache(self):
+        tree.get_tree_version()
+        with self.assertNumQueries(1):
+            stats = get_section_statistics()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_section_statistics(), stats)
+
+        self.assertEqual(
+            {key: stats[key] for key in ("total", "active", "inactive")},
+            {"total": 4, "active": 2, "inactive": 2},
+        )
+        self.assertEqual((stats["with_content"], stats["without_content"]), (2, 2))
+        self.assertEqual(
+            stats["by_level"],
+            {
+                1: {"total": 1, "active": 1, "inactive": 0, "with_content": 1},
+                2: {"total": 2, "active": 1, "inactive": 1, "with_content": 1},
+                3: {"total": 1, "active": 0, "inactive": 1, "with_content": 0},
+            },
+        )
+        self.assertEqual(
+            Section.get_level_statistics()[2], {"total": 2, "active": 1, "inactive": 1}
+        )
+
+    def test_bulk_activate_makes_the_counts_stale(self):
+        self.assertEqual(get_section_statistics()["by_level"][3]["active"], 0)
+
+        admin = get_user_model().objects.create(
+            username="admin", slug="admin", is_staff=True, is_superuser=True
+        )
+        self.client.force_login(admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("sections:admin_bulk_action"),
+                json.dumps({"action": "activate", "section_ids": [self.leaf.pk]}),
+                content_type="application/json",
+            )
+        self.assertTrue(response.json()["success"])
+        self.assertEqual(get_section_statistics()["by_level"][3]["active"], 1)
+        self.assertEqual(Section.get_level_statistics()[3]["inactive"], 0)
+
+
+class SectionSearchTextTests(TestCase):
+    def setUp(self):
+        search._indexes.clear()
+        search._versions.clear()
+
+    def test_only_visible_text_is_indexed(self):
+        content = '<p style="color: red">سلام <b>دنيا</b></p><script>hidden()</script>'
+        self.assertEqual(
+            search.build_search_text("عنوان", html_to_text(content)), "عنوان سلام دنیا"
+        )
+
+    def test_markup_does_not_match(self):
+        Section.objects.create(title="About", content='<p class="lead">Team</p>')
+        sections = Section.objects.all()
+        self.assertEqual(search.search_queryset(sections, "lead").count(), 0)
+        self.assertEqual(search.search_queryset(sections, "team").count(), 1)
+
+
+class SectionPathTests(TestCase):
+    def setUp(self):
+        self.first = Section.objects.create(title="First", order=1)
+        self.second = Section.objects.create(title="Second", order=2)
+        self.child = Section.objects.create(title="Child", parent=self.first, order=1)
+        self.leaf = Section.objects.create(title="Leaf", parent=self.child, order=1)
+
+    def test_moving_a_section_rewrites_its_subtree(self):
+        self.child.parent = self.second
+        self.child.save()
+
+        self.leaf.refresh_from_db()
+        expected = PATH_SEPARATOR.join(
+            path_step(pk) for pk in (self.second.pk, self.child.pk, self.leaf.pk)
+        )
+        self.assertEqual(self.leaf.path, expected)
+        self.assertEqual(self.leaf.level, 3)
+        self.assertEqual(self.first.get_descendants(), [])
+        self.assertEqual(
+            [section.pk for section in self.second.get_descendants()],
+            [self.child.pk, self.leaf.pk],
+        )
+
+    def test_path_order_holds_past_four_digit_ids(self):
+        small = Section.objects.create(pk=9999, title="Small", parent=self.first)
+        large = Section.objects.create(pk=10000, title="Large", parent=self.first)
+        self.assertLess(small.path, large.path)
+        self.assertEqual(
+            [section.pk for section in self.first.get_descendants()][-2:],
+            [9999, 10000],
+        )
+
+    def test_rebuild_rewrites_paths_of_an_older_width(self):
+        Section.objects.filter(pk=self.leaf.pk).update(path="0001.0003.0004")
+        call_command("rebuild_section_paths", stdout=StringIO())
+
+        self.leaf.refresh_from_db()
+        self.assertEqual(
+            self.leaf.path.split(PATH_SEPARATOR),
+            [path_step(pk) for pk in (self.first.pk, self.child.pk, self.leaf.pk)],
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SectionReorderTests(TestCase):
+    def setUp(self):
+        tree._tree_version._local = None
+        self.root = Section.objects.create(title="Root", order=1)
+        self.children = [
+            Section.objects.create(title=f"Child {n}", parent=self.root, order=n)
+            for n in range(1, 4)
+        ]
+
+    def test_invalid_orderings_are_rejected(self):
+        child_ids = [child.pk for child in self.children]
+        for groups in (
+            [(2, [child_ids[0], child_ids[1], child_ids[0]])],
+            [(2, [*child_ids, 9999])],
+            [(1, child_ids)],
+            [(2, [child_ids[0], "first"])],
+        ):
+            with self.subTest(groups=groups), self.assertRaises(ReorderError):
+                apply_section_order(groups)
+        self.assertEqual(
+            [child.order for child in Section.objects.filter(parent=self.root)],
+            [1, 2, 3],
+        )
+
+    def test_ordering_is_written_with_one_update(self):
+        version = tree.get_tree_version()
+        new_order = [child.pk for child in reversed(self.children)]
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(apply_section_order([(2, new_order)]), 3)
+
+        statements = [
+            query["sql"]
+            for query in queries.captured_queries
+            if not query["sql"].startswith(("SAVEPOINT", "RELEASE SAVEPOINT"))
+        ]
+        # One SELECT to validate, one UPDATE for every section
+        self.assertEqual(len(statements), 2)
+        self.assertTrue(statements[1].startswith("UPDATE"))
+        self.assertEqual(
+            dict(Section.objects.filter(parent=self.root).values_list("pk", "order")),
+            {pk: order for order, pk in enumerate(new_order, start=1)},
+        )
+        self.assertNotEqual(tree.get_tree_version(), version)
+
+    def test_admin_endpoint_answers_400_for_an_invalid_ordering(self):
+        admin = get_user_model().objects.create(
+            username="admin", slug="admin", is_staff=True, is_superuser=True
+        )
+        self.client.force_login(admin)
+        child_id = self.children[0].pk
+        response = self.client.post(
+            reverse("admin:sections_section_reorder"),
+            json.dumps({"level_orders": {"2": [child_id, child_id]}}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.json()["success"])
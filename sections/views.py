@@ -3,12 +3,22 @@ import logging
 
 from django.contrib.admin.views.decorators import staff_member_required
 from django.core.paginator import Paginator
-from django.db.models import Q
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, render
+from django.utils import timezone
+from django.utils.http import parse_etags
 from django.utils.translation import gettext_lazy as _
 
+from core.search import search_queryset
+
 from .models import Section
+from .services.stats import get_section_statistics
+from .services.tree import (
+    SECTIONS_TREE_MAX_AGE,
+    SECTIONS_TREE_S_MAXAGE,
+    build_section_tree,
+    get_tree_json,
+)
 
 logger = logging.getLogger("sections")
 
@@ -24,9 +34,8 @@ def sections_list(request):
     # Search functionality
     search_query = request.GET.get("search", "")
     if search_query:
-        sections = sections.filter(
-            Q(title__icontains=search_query) | Q(content__icontains=search_query)
-        )
+        # Matches title and visible content text, not the HTML markup
+        sections = search_queryset(sections, search_query)
 
     # Filter by level
     level_filter = request.GET.get("level")
@@ -42,7 +51,9 @@ def sections_list(request):
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
 
-    logger.info(f"سکشن لیست درخواست شد - تعداد سکشن‌های فعال: {sections.count()}")
+    logger.info(f"سکشن لیست درخواست شد - تعداد سکشن‌های فعال: {paginator.count}")
+
+    stats = get_section_statistics()
 
     context = {
         "tree_structure": tree_structure,
@@ -51,11 +62,9 @@ def sections_list(request):
         "search_query": search_query,
         "level_filter": level_filter,
         "title": _("Sections"),
-        "total_sections": Section.objects.filter(is_active=True).count(),
+        "total_sections": stats["active"],
         "levels_count": {
-            1: Section.objects.filter(level=1, is_active=True).count(),
-            2: Section.objects.filter(level=2, is_active=True).count(),
-            3: Section.objects.filter(level=3, is_active=True).count(),
+            level: stats["by_level"][level]["active"] for level in (1, 2, 3)
         },
     }
     return render(request, "sections/sections_list.html", context)
@@ -117,28 +126,34 @@ def section_by_slug(request, slug):
     return section_detail(request, section.id)
 
 
+def tree_json_response(request, kind):
+    """
+    Cached JSON body of the tree/navigation endpoint with a content ETag.
+    A matching If-None-Match gets a 304 from cache reads alone (the tree
+    version is only re-derived from the table when its local copy expired).
+    """
+    etag, body = get_tree_json(kind)
+    # If-None-Match uses weak comparison (RFC 9110), compressing proxies add W/
+    candidates = {
+        tag.removeprefix("W/")
+        for tag in parse_etags(request.headers.get("If-None-Match", ""))
+    }
+    if "*" in candidates or etag in candidates:
+        response = HttpResponse(status=304)
+    else:
+        response = HttpResponse(body, content_type="application/json")
+    response["ETag"] = etag
+    response["Cache-Control"] = (
+        f"public, max-age={SECTIONS_TREE_MAX_AGE}, "
+        f"s-maxage={SECTIONS_TREE_S_MAXAGE}"
+    )
+    return response
+
+
 def section_tree(request):
     """API endpoint to get section tree structure as JSON"""
     try:
-        tree_structure = Section.get_tree_structure()
-
-        def serialize_tree(tree):
-            result = []
-            for item in tree:
-                section_data = {
-                    "id": item["section"].id,
-                    "title": item["section"].title,
-                    "slug": item["section"].slug,
-                    "level": item["section"].level,
-                    "order": item["section"].order,
-                    "display_title": item["section"].display_title,
-                    "has_content": bool(item["section"].content),
-                    "children": serialize_tree(item["children"]),
-                }
-                result.append(section_data)
-            return result
-
-        return JsonResponse({"success": True, "tree": serialize_tree(tree_structure)})
+        return tree_json_response(request, "tree")
     except Exception as e:
         logger.error(f"Error getting section tree: {str(e)}")
         return JsonResponse({"success": False, "error": str(e)}, status=500)
@@ -168,37 +183,21 @@ def admin_sections_preview(request):
 
     sections = sections.order_by("level", "order")
 
-    # Get statistics
+    # Get statistics (one cached query)
+    section_stats = get_section_statistics()
     stats = {
-        "total": Section.objects.count(),
-        "active": Section.objects.filter(is_active=True).count(),
-        "inactive": Section.objects.filter(is_active=False).count(),
+        "total": section_stats["total"],
+        "active": section_stats["active"],
+        "inactive": section_stats["inactive"],
         "by_level": {
-            1: Section.objects.filter(level=1).count(),
-            2: Section.objects.filter(level=2).count(),
-            3: Section.objects.filter(level=3).count(),
+            level: section_stats["by_level"][level]["total"] for level in (1, 2, 3)
         },
-        "with_content": Section.objects.exclude(content="").count(),
-        "without_content": Section.objects.filter(content="").count(),
+        "with_content": section_stats["with_content"],
+        "without_content": section_stats["without_content"],
     }
 
-    # Get tree structure for hierarchical view
-    all_tree = []
-    root_sections = Section.objects.filter(level=1).order_by("order")
-
-    def build_admin_tree(sections, parent_level=0):
-        result = []
-        for section in sections:
-            section_data = {
-                "section": section,
-                "children": build_admin_tree(
-                    section.children.all().order_by("order"), parent_level + 1
-                ),
-            }
-            result.append(section_data)
-        return result
-
-    all_tree = build_admin_tree(root_sections)
+    # Get tree structure for hierarchical view (one query)
+    all_tree = build_section_tree(active_only=False)
 
     context = {
         "sections": sections,
@@ -258,24 +257,26 @@ def admin_sections_bulk_action(request):
             sections = Section.objects.filter(id__in=section_ids)
 
             if action == "activate":
-                sections.update(is_active=True)
+                sections.update(is_active=True, updated_at=timezone.now())
+                Section.bump_tree_version()
                 message = _("Selected sections activated")
             elif action == "deactivate":
-                sections.update(is_active=False)
+                sections.update(is_active=False, updated_at=timezone.now())
+                Section.bump_tree_version()
                 message = _("Selected sections deactivated")
             elif action == "delete":
-                # Check for dependencies before deleting
-                for section in sections:
-                    if section.children.exists():
-                        return JsonResponse(
-                            {
-                                "success": False,
-                                "error": _(
-                                    f'Cannot delete "{section.title}" - it has child sections'
-                                ),
-                            },
-                            status=400,
-                        )
+                # Check for dependencies before deleting (one query)
+                section = sections.filter(children__isnull=False).distinct().first()
+                if section is not None:
+                    return JsonResponse(
+                        {
+                            "success": False,
+                            "error": _(
+                                f'Cannot delete "{section.title}" - it has child sections'
+                            ),
+                        },
+                        status=400,
+                    )
 
                 sections.delete()
                 message = _("Selected sections deleted")
@@ -308,30 +309,7 @@ def admin_sections_bulk_action(request):
 def section_navigation(request):
     """API endpoint for section navigation data"""
     try:
-        tree_structure = Section.get_tree_structure()
-
-        def create_nav_structure(tree):
-            result = []
-            for item in tree:
-                nav_item = {
-                    "id": item["section"].id,
-                    "title": item["section"].title,
-                    "slug": item["section"].slug,
-                    "url": f"/sections/{item['section'].id}/",
-                    "level": item["section"].level,
-                    "has_children": bool(item["children"]),
-                    "children": (
-                        create_nav_structure(item["children"])
-                        if item["children"]
-                        else []
-                    ),
-                }
-                result.append(nav_item)
-            return result
-
-        return JsonResponse(
-            {"success": True, "navigation": create_nav_structure(tree_structure)}
-        )
+        return tree_json_response(request, "navigation")
 
     except Exception as e:
         logger.error(f"Error creating navigation: {str(e)}")
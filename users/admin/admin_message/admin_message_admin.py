@@ -8,6 +8,8 @@ from django_jalali.admin.filters import JDateFieldListFilter
 
 from users.admin.in_line.in_ilne import AdminMessageReplyInline, AdminMessageReadStatusInline
 from users.models.admin_message.admin_message import AdminMessage
+from users.utils.admin_message_events import publish_unread_count
+from users.utils.admin_notifications import invalidate_unread_summary
 
 logger = logging.getLogger(__name__)
 
@@ -191,7 +193,9 @@ class AdminMessageAdmin(admin.ModelAdmin):
     def mark_as_archived(self, request, queryset):
         """Archive selected messages"""
         try:
-            updated = queryset.update(status="archived")
+            updated = queryset.update(status="archived", updated_at=timezone.now())
+            invalidate_unread_summary()
+            publish_unread_count()
             self.message_user(request, f"{updated} پیام آرشیو شد.", messages.SUCCESS)
         except Exception as e:
             self.message_user(
@@ -203,7 +207,11 @@ class AdminMessageAdmin(admin.ModelAdmin):
     def mark_as_unread(self, request, queryset):
         """Mark selected messages as unread"""
         try:
-            updated = queryset.update(status="unread", read_at=None)
+            updated = queryset.update(
+                status="unread", read_at=None, updated_at=timezone.now()
+            )
+            invalidate_unread_summary()
+            publish_unread_count()
             self.message_user(
                 request,
                 f"{updated} پیام به عنوان خوانده نشده علامت‌گذاری شد.",
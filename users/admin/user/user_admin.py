@@ -31,8 +31,8 @@ from users.admin.filter.email_status_filter import EmailStatusFilter
 from users.admin.filter.user_type_filter import UserTypeFilter
 from users.admin.comment_admin import HasCommentsFilter, CommentInline
 from users.forms.email_form import EmailForm, QuickEmailTemplateForm
-from users.models.admin_message.admin_message import AdminMessage
 from users.models.user.user_type import UserType
+from users.utils.admin_notifications import get_unread_summary
 
 logger = logging.getLogger(__name__)
 
@@ -710,17 +710,15 @@ class UserAdmin(BaseUserAdmin):
         # Add admin message notifications
         if request.user.is_staff:
             try:
-                unread_messages = AdminMessage.objects.filter(status="unread").order_by(
-                    "-created_at"
-                )[:3]
-                if unread_messages.exists():
-                    extra_context["admin_notifications"] = unread_messages
-                    extra_context["notification_count"] = unread_messages.count()
+                summary = get_unread_summary()
+                if summary["count"]:
+                    extra_context["admin_notifications"] = [summary["latest"]]
+                    extra_context["notification_count"] = summary["count"]
 
                     # Add a Django message for immediate visibility
                     messages.info(
                         request,
-                        f"📨 شما {unread_messages.count()} پیام خوانده نشده دارید.",
+                        f"📨 شما {summary['count']} پیام خوانده نشده دارید.",
                         extra_tags="admin-notification",
                     )
             except Exception:
@@ -773,17 +771,18 @@ class UserAdmin(BaseUserAdmin):
 
     def user_type_display(self, obj):
         """Display user type with color coding"""
-        if not obj.user_type:
+        permissions = obj.type_permissions
+        if not permissions.exists:
             return format_html('<em style="color: #888;">نامشخص</em>')
 
         # Color code based on permissions
-        if obj.user_type.can_access_admin:
+        if permissions.can_access_admin:
             color = "darkred"
             weight = "bold"
-        elif obj.user_type.can_manage_users:
+        elif permissions.can_manage_users:
             color = "purple"
             weight = "bold"
-        elif obj.user_type.can_create_content:
+        elif permissions.can_create_content:
             color = "green"
             weight = "normal"
         else:
@@ -794,7 +793,7 @@ class UserAdmin(BaseUserAdmin):
             '<span style="color: {}; font-weight: {};">{}</span>',
             color,
             weight,
-            obj.user_type.name,
+            permissions.name,
         )
 
     user_type_display.short_description = "نوع کاربری"
@@ -4,6 +4,7 @@ from django.db.models import Count
 from django.utils.html import format_html
 
 from users.models.user.user_type import UserType
+from users.utils.permissions import invalidate_permission_snapshots
 
 logger = logging.getLogger(__name__)
 
@@ -121,6 +122,7 @@ class UserTypeAdmin(admin.ModelAdmin):
     def activate_user_types(self, request, queryset):
         """Activate selected user types"""
         updated = queryset.update(is_active=True)
+        invalidate_permission_snapshots()
         self.message_user(
             request, f"{updated} نوع کاربری فعال شد.", level=messages.SUCCESS
         )
@@ -130,6 +132,7 @@ class UserTypeAdmin(admin.ModelAdmin):
     def deactivate_user_types(self, request, queryset):
         """Deactivate selected user types"""
         updated = queryset.update(is_active=False)
+        invalidate_permission_snapshots()
         self.message_user(
             request, f"{updated} نوع کاربری غیرفعال شد.", level=messages.WARNING
         )
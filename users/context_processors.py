@@ -42,4 +42,11 @@ def admin_notifications(request):
     except Exception as e:
         logger.error(f"Unexpected error in admin_notifications context processor: {e}")
 
-    return context
\ No newline at end of file
+    return context
+
+
+def admin_events(request):
+    """Whether base.html should open the admin notifications SSE stream"""
+    from users.utils.admin_message_events import sse_enabled
+
+    return {'admin_events_sse': sse_enabled()}
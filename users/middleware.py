@@ -4,8 +4,9 @@ import logging
 from django.contrib import messages
 from django.shortcuts import redirect
 from django.utils.deprecation import MiddlewareMixin
+from django.utils.html import escape
 
-from users.models.admin_message.admin_message import AdminMessage
+from users.utils.admin_notifications import get_unread_summary
 
 logger = logging.getLogger(__name__)
 
@@ -90,19 +91,17 @@ class MessageAdminAccessMiddleware(MiddlewareMixin):
     def add_admin_notifications(self, request):
         """Add admin message notifications to the request"""
         try:
-            unread_messages = AdminMessage.objects.filter(status="unread").order_by(
-                "-created_at"
-            )
-            unread_count = unread_messages.count()
-
-            if unread_count > 0:
-                # Get the latest message for preview
-                latest_message = unread_messages.first()
+            # Cached summary: no queries on admin page loads
+            summary = get_unread_summary()
+            unread_count = summary["count"]
+            latest_message = summary["latest"]
 
+            if unread_count > 0 and latest_message:
                 # Create notification message
                 notification_text = (
                     f"📨 شما {unread_count} پیام خوانده نشده دارید. "
-                    f'آخرین پیام: "{latest_message.subject}" از {latest_message.sender.get_display_name()}. '
+                    f'آخرین پیام: "{escape(latest_message["subject"])}" '
+                    f'از {escape(latest_message["sender"])}. '
                     f'<a href="/admin/users/adminmessage/" style="color: white; text-decoration: underline;">مشاهده پیام‌ها</a>'
                 )
 
@@ -120,6 +119,5 @@ class MessageAdminAccessMiddleware(MiddlewareMixin):
         return (
             user.is_staff
             and not user.is_superuser
-            and user.user_type
-            and user.user_type.slug == "message_admin"
+            and user.type_permissions.is_message_admin
         )
@@ -2,6 +2,8 @@ import logging
 import django_jalali.db.models as jmodels
 from django.conf import settings
 from django.db import models
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
@@ -66,6 +68,13 @@ class AdminMessage(models.Model):
     def __str__(self):
         return f"{self.sender.get_display_name()} - {self.subject}"
 
+    @classmethod
+    def get_unread_count(cls):
+        """Number of unread messages, from the cached unread summary"""
+        from users.utils.admin_notifications import get_unread_summary
+
+        return get_unread_summary()["count"]
+
     def mark_as_read(self, user):
         """Mark message as read by a specific user"""
         from users.models.admin_message.admin_message_read_status import AdminMessageReadStatus  # 👈 import local
@@ -80,4 +89,47 @@ class AdminMessage(models.Model):
         if self.status == "unread":
             self.status = "read"
             self.read_at = timezone.now()
-            self.save(update_fields=["status", "read_at"])
+            self.save(update_fields=["status", "read_at", "updated_at"])
+
+
+@receiver(post_init, sender=AdminMessage)
+def remember_admin_message_status(sender, instance, **kwargs):
+    """Keep the last saved status to detect read-status changes on save"""
+    # __dict__ avoids a query when status is deferred
+    instance._previous_status = instance.__dict__.get("status")
+
+
+@receiver(post_save, sender=AdminMessage)
+def update_unread_summary_on_save(sender, instance, created, **kwargs):
+    """Drop the cached unread summary and push the change to connected admins"""
+    from users.utils.admin_message_events import (
+        publish_new_message,
+        publish_unread_count,
+    )
+    from users.utils.admin_notifications import message_saved
+
+    previous_status = getattr(instance, "_previous_status", None)
+    try:
+        message_saved(instance, previous_status, created)
+        # Registered after the summary delete, so the count is rebuilt fresh
+        if created:
+            publish_new_message(instance)
+        elif previous_status != instance.status:
+            publish_unread_count()
+    except Exception as e:
+        logger.error(
+            f"Error updating unread summary for message {instance.pk}: {str(e)}"
+        )
+    instance._previous_status = instance.status
+
+
+@receiver(post_delete, sender=AdminMessage)
+def update_unread_summary_on_delete(sender, instance, **kwargs):
+    """Drop the cached unread summary when an unread message is deleted"""
+    from users.utils.admin_message_events import publish_unread_count
+    from users.utils.admin_notifications import message_deleted
+
+    previous_status = getattr(instance, "_previous_status", None)
+    message_deleted(instance, previous_status)
+    if previous_status == "unread":
+        publish_unread_count()
@@ -2,6 +2,8 @@ import logging
 import django_jalali.db.models as jmodels
 from django.conf import settings
 from django.db import models
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 
 from users.models.admin_message.admin_message import AdminMessage
 
@@ -34,4 +36,17 @@ class AdminMessageReply(models.Model):
         ordering = ["created_at"]
 
     def __str__(self):
-        return f"پاسخ به: {self.original_message.subject}"
\ No newline at end of file
+        return f"پاسخ به: {self.original_message.subject}"
+
+
+@receiver(post_save, sender=AdminMessageReply)
+def publish_admin_message_reply(sender, instance, created, **kwargs):
+    """Push new replies to connected admins"""
+    if not created:
+        return
+    from users.utils.admin_message_events import publish_new_reply
+
+    try:
+        publish_new_reply(instance)
+    except Exception as e:
+        logger.error(f"Error publishing reply {instance.pk}: {str(e)}")
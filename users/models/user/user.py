@@ -7,6 +7,7 @@ from django.db import models
 from django.utils import timezone
 
 from users.models.user.user_type import UserType
+from users.utils.permissions import get_permission_snapshot
 
 logger = logging.getLogger(__name__)
 
@@ -81,7 +82,7 @@ class User(AbstractUser):
             self.slug = self._generate_unique_slug(base_slug)
 
         # Auto-set staff status based on user type
-        if self.user_type and self.user_type.can_access_admin:
+        if self.type_permissions.can_access_admin:
             self.is_staff = True
 
         super().save(*args, **kwargs)
@@ -107,40 +108,42 @@ class User(AbstractUser):
         else:
             return f"کاربر {self.id}"
 
+    @property
+    def type_permissions(self):
+        """
+        Cached PermissionSnapshot of the user's type. Kept on the instance, so
+        request.user resolves it once per request, without loading UserType.
+        """
+        snapshot = self.__dict__.get("_type_permissions")
+        if snapshot is None or snapshot.user_type_id != self.user_type_id:
+            snapshot = get_permission_snapshot(self.user_type_id)
+            self.__dict__["_type_permissions"] = snapshot
+        return snapshot
+
     def has_permission(self, permission):
         """Check if user has specific permission based on user type"""
-        if not self.user_type:
-            return False
-
-        permission_map = {
-            "create_content": self.user_type.can_create_content,
-            "edit_content": self.user_type.can_edit_content,
-            "delete_content": self.user_type.can_delete_content,
-            "manage_users": self.user_type.can_manage_users,
-            "view_analytics": self.user_type.can_view_analytics,
-            "access_admin": self.user_type.can_access_admin,
-        }
-
-        return permission_map.get(permission, False)
+        return self.type_permissions.has(permission)
 
     def get_daily_limit(self, limit_type):
         """Get daily limit for specific content type"""
-        if not self.user_type:
+        permissions = self.type_permissions
+        if not permissions.exists:
             return 0
 
         if limit_type == "posts":
-            return self.user_type.max_posts_per_day
+            return permissions.max_posts_per_day
         elif limit_type == "comments":
-            return self.user_type.max_comments_per_day
+            return permissions.max_comments_per_day
 
         return 0
 
     def can_upload_file(self, file_size_mb):
         """Check if user can upload file based on size limit"""
-        if not self.user_type:
+        permissions = self.type_permissions
+        if not permissions.exists:
             return False
 
-        return file_size_mb <= self.user_type.max_file_upload_size_mb
+        return file_size_mb <= permissions.max_file_upload_size_mb
 
     def update_activity(self):
         """Update last activity timestamp"""
@@ -149,4 +152,5 @@ class User(AbstractUser):
 
     def get_user_type_display(self):
         """Get user type display name"""
-        return self.user_type.name if self.user_type else "نامشخص"
\ No newline at end of file
+        permissions = self.type_permissions
+        return permissions.name if permissions.exists else "نامشخص"
\ No newline at end of file
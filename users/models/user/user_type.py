@@ -1,5 +1,7 @@
 import logging
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils.text import slugify
 
 logger = logging.getLogger(__name__)
@@ -127,3 +129,12 @@ class UserType(models.Model):
             permissions.append("دسترسی ادمین")
 
         return ", ".join(permissions) if permissions else "بدون مجوز خاص"
+
+
+@receiver(post_save, sender=UserType)
+@receiver(post_delete, sender=UserType)
+def invalidate_user_type_permissions(sender, instance, **kwargs):
+    """Make cached permission snapshots of every user type stale"""
+    from users.utils.permissions import invalidate_permission_snapshots
+
+    invalidate_permission_snapshots()
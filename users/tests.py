@@ -0,0 +1,279 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import Http404
+from django.test import (
+    AsyncRequestFactory,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+
+from users.admin.admin_message.admin_message_admin import AdminMessageAdmin
+from users.admin.user.user_type_admin import UserTypeAdmin
+from users.middleware import MessageAdminAccessMiddleware
+from users.models.admin_message.admin_message import AdminMessage
+from users.models.user.user_type import UserType
+from users.utils import admin_message_events, admin_notifications, permissions
+from users.utils.admin_message_events import EventBroker, stream_events
+from users.utils.admin_notifications import get_unread_summary
+from users.utils.permissions import PermissionSnapshot, get_permission_snapshot
+from users.views.messaging_views import admin_notifications_stream
+
+LOCMEM_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "users-tests",
+    }
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class UnreadSummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        admin_notifications._messages_version._local = None
+        User = get_user_model()
+        self.sender = User.objects.create(username="sender", slug="sender")
+        self.admin_user = User.objects.create(
+            username="admin", slug="admin", is_staff=True, is_superuser=True
+        )
+        self.model_admin = AdminMessageAdmin(AdminMessage, admin.site)
+        self.request = RequestFactory().get("/admin/users/adminmessage/")
+        self.request.user = self.admin_user
+
+    def send(self, subject="Hello", **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return AdminMessage.objects.create(
+                sender=self.sender, subject=subject, message="body", **fields
+            )
+
+    def run_action(self, action, *messages):
+        queryset = AdminMessage.objects.filter(pk__in=[m.pk for m in messages])
+        with mock.patch.object(self.model_admin, "message_user"):
+            with self.captureOnCommitCallbacks(execute=True):
+                getattr(self.model_admin, action)(self.request, queryset)
+
+    def test_summary_follows_every_write(self):
+        self.assertEqual(get_unread_summary(), {"count": 0, "latest": None})
+
+        first = self.send("First")
+        second = self.send("Second")
+        summary = get_unread_summary()
+        self.assertEqual(summary["count"], 2)
+        self.assertEqual(summary["latest"]["subject"], "Second")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.mark_as_read(self.admin_user)
+        summary = get_unread_summary()
+        self.assertEqual(summary["count"], 1)
+        self.assertEqual(summary["latest"]["subject"], "First")
+
+        self.run_action("mark_as_unread", second)
+        self.assertEqual(get_unread_summary()["count"], 2)
+
+        self.run_action("mark_as_archived", first, second)
+        self.assertEqual(get_unread_summary(), {"count": 0, "latest": None})
+
+        self.run_action("mark_as_unread", first)
+        self.assertEqual(get_unread_summary()["count"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(get_unread_summary(), {"count": 0, "latest": None})
+
+    def test_admin_page_notification_needs_no_queries_once_cached(self):
+        self.send()
+        middleware = MessageAdminAccessMiddleware(lambda request: None)
+        with mock.patch("users.middleware.messages.info") as info:
+            middleware.add_admin_notifications(self.request)
+            with self.assertNumQueries(0):
+                middleware.add_admin_notifications(self.request)
+        self.assertEqual(info.call_count, 2)
+
+    def test_subject_and_sender_are_escaped(self):
+        self.sender.first_name = "<b>Mallory</b>"
+        self.sender.save()
+        self.send('<script>alert("x")</script>')
+
+        middleware = MessageAdminAccessMiddleware(lambda request: None)
+        with mock.patch("users.middleware.messages.info") as info:
+            middleware.add_admin_notifications(self.request)
+        text = info.call_args.args[1]
+        self.assertNotIn("<script>", text)
+        self.assertNotIn("<b>", text)
+        self.assertIn("&lt;script&gt;", text)
+        self.assertIn("&lt;b&gt;Mallory&lt;/b&gt;", text)
+
+
+class FailingEventBackend:
+    """Shared channel that is down: publishing raises, nothing is relayed"""
+
+    def publish(self, event):
+        raise ConnectionError("redis down")
+
+    async def listen(self, deliver):
+        await asyncio.Event().wait()
+
+
+class AdminMessageEventsTests(SimpleTestCase):
+    def drain(self, subscription):
+        events = []
+        while not subscription.queue.empty():
+            events.append(subscription.queue.get_nowait())
+        return events
+
+    async def test_slow_client_gets_a_single_resync(self):
+        broker = EventBroker(queue_size=2)
+        subscription = broker.subscribe()
+        for number in range(5):
+            broker.fan_out({"type": "unread", "unread_count": number})
+        # put_threadsafe schedules the puts on the loop
+        await asyncio.sleep(0)
+        self.assertEqual(self.drain(subscription), [{"type": "resync"}])
+
+    async def test_publish_reaches_every_subscriber(self):
+        broker = EventBroker()
+        subscriptions = [broker.subscribe() for _ in range(3)]
+        broker.unsubscribe(subscriptions.pop())
+
+        broker.publish({"type": "unread", "unread_count": 1})
+        await asyncio.sleep(0)
+        for subscription in subscriptions:
+            self.assertEqual(
+                self.drain(subscription), [{"type": "unread", "unread_count": 1}]
+            )
+
+    async def test_backend_failure_falls_back_to_local_fan_out(self):
+        broker = EventBroker(backend=FailingEventBackend())
+        subscription = broker.subscribe()
+
+        broker.publish({"type": "resync"})
+        await asyncio.sleep(0)
+        broker._listener.cancel()
+        self.assertEqual(self.drain(subscription), [{"type": "resync"}])
+
+    async def test_idle_stream_sends_heartbeats(self):
+        broker = EventBroker()
+        heartbeat = mock.patch.object(admin_message_events, "ADMIN_EVENTS_HEARTBEAT", 0.01)
+        with mock.patch.object(admin_message_events, "broker", broker), heartbeat:
+            stream = stream_events({"type": "unread", "unread_count": 0})
+            self.assertEqual(await anext(stream), "retry: 5000\n\n")
+            self.assertTrue((await anext(stream)).startswith("event: unread\n"))
+            self.assertEqual(await anext(stream), ": heartbeat\n\n")
+
+            broker.fan_out({"type": "resync"})
+            self.assertTrue((await anext(stream)).startswith("event: resync\n"))
+            await stream.aclose()
+        self.assertEqual(broker._subscribers, set())
+
+    async def test_stream_is_refused_when_off_or_not_superuser(self):
+        request = AsyncRequestFactory().get("/users/api/admin-notifications/stream/")
+
+        async def auser():
+            return SimpleNamespace(is_authenticated=True, is_superuser=False)
+
+        request.auser = auser
+        with mock.patch("users.views.messaging_views.sse_enabled", return_value=False):
+            with self.assertRaises(Http404):
+                await admin_notifications_stream(request)
+
+        with mock.patch("users.views.messaging_views.sse_enabled", return_value=True):
+            response = await admin_notifications_stream(request)
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PermissionSnapshotInvalidationTests(SimpleTestCase):
+    """A permission revoked by another worker must not outlive the local TTL"""
+
+    def setUp(self):
+        permissions._local_snapshots.clear()
+        self.addCleanup(permissions._local_snapshots.clear)
+        self.user_type = PermissionSnapshot(
+            user_type_id=7, slug="editor", is_active=True, can_access_admin=True
+        )
+        loader = mock.patch.object(
+            permissions, "_load_snapshot", side_effect=lambda pk: self.user_type
+        )
+        self.load = loader.start()
+        self.addCleanup(loader.stop)
+
+    def revoke_elsewhere(self):
+        # Committed by another process: no version bump reaches this one
+        self.user_type = PermissionSnapshot(
+            user_type_id=7, slug="editor", is_active=True, can_access_admin=False
+        )
+
+    def test_revoked_permission_expires_from_process_memory(self):
+        self.assertTrue(get_permission_snapshot(7).has("access_admin"))
+        self.revoke_elsewhere()
+        self.assertTrue(get_permission_snapshot(7).has("access_admin"))
+        self.assertEqual(self.load.call_count, 1)
+
+        # The per-process cache must not serve it either once the TTL is up
+        later = time.monotonic() + permissions.USER_TYPE_PERMISSIONS_LOCAL_TTL + 1
+        with mock.patch.object(permissions.time, "monotonic", return_value=later):
+            self.assertFalse(get_permission_snapshot(7).has("access_admin"))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PermissionSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        permissions._local_snapshots.clear()
+        self.addCleanup(permissions._local_snapshots.clear)
+        self.editor = UserType.objects.create(
+            name="editor", slug="editor", can_access_admin=True, is_default=True
+        )
+        self.user = get_user_model().objects.create(
+            username="user", slug="user", user_type=self.editor
+        )
+        self.model_admin = UserTypeAdmin(UserType, admin.site)
+        self.request = RequestFactory().get("/admin/users/usertype/")
+
+    def run_action(self, action):
+        with mock.patch.object(self.model_admin, "message_user"):
+            with self.captureOnCommitCallbacks(execute=True):
+                getattr(self.model_admin, action)(
+                    self.request, UserType.objects.filter(pk=self.editor.pk)
+                )
+
+    def test_type_permissions_are_resolved_once_per_instance(self):
+        with mock.patch(
+            "users.models.user.user.get_permission_snapshot",
+            wraps=get_permission_snapshot,
+        ) as resolve:
+            user = get_user_model().objects.get(pk=self.user.pk)
+            for _ in range(3):
+                self.assertTrue(user.has_permission("access_admin"))
+            self.assertTrue(user.type_permissions.exists)
+            self.assertEqual(resolve.call_count, 1)
+
+            # A different user type is resolved again
+            user.user_type = UserType.objects.create(name="reader", slug="reader")
+            self.assertFalse(user.has_permission("access_admin"))
+            self.assertEqual(resolve.call_count, 2)
+
+    def test_user_type_save_makes_snapshots_stale(self):
+        self.assertTrue(get_permission_snapshot(self.editor.pk).has("access_admin"))
+
+        self.editor.can_access_admin = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.editor.save()
+        self.assertFalse(get_permission_snapshot(self.editor.pk).has("access_admin"))
+
+    def test_bulk_actions_make_snapshots_stale(self):
+        self.assertTrue(get_permission_snapshot(self.editor.pk).is_active)
+
+        self.run_action("deactivate_user_types")
+        self.assertFalse(get_permission_snapshot(self.editor.pk).is_active)
+
+        self.run_action("activate_user_types")
+        self.assertTrue(get_permission_snapshot(self.editor.pk).is_active)
@@ -22,6 +22,7 @@ from .views.dashboard_views import dashboard_view, dashboard
 from .views.logout_view import message_admin_logout_view, smart_logout_view
 from .views.messaging_views import (
     admin_notifications_api,
+    admin_notifications_stream,
     mark_message_read_api,
     message_admin_dashboard,
     message_detail_view,
@@ -81,6 +82,7 @@ urlpatterns = [
     path("api/generate-password/", generate_password_view, name="generate_password"),
     path("api/check-password-strength/", check_password_strength_view, name="check_password_strength"),
     path("api/notifications/", admin_notifications_api, name="admin_notifications_api"),
+    path("api/notifications/stream/", admin_notifications_stream, name="admin_notifications_stream"),
     path("api/mark-read/<int:message_id>/", mark_message_read_api, name="mark_message_read_api"),
 
     # ========== DASHBOARD AND PROFILE URLS ==========
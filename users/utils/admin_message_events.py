@@ -0,0 +1,237 @@
+# users/utils/admin_message_events.py
+"""
+Push channel for admin message notifications (Server-Sent Events).
+
+New AdminMessages, replies and unread-count changes are published once,
+after commit, to an in-process broker that fans them out to every SSE
+connection of this process. When ADMIN_EVENTS_REDIS_URL is set, events go
+through a Redis pub/sub channel instead and every process (on every node)
+relays them to its own connections, so writes served by one worker reach
+admins connected to another.
+
+Each connection has a bounded queue. A client that falls behind does not
+make the queue grow: its pending events are dropped and it gets a single
+"resync" event telling it to reload the notifications once. Idle
+connections receive a comment line every ADMIN_EVENTS_HEARTBEAT seconds so
+proxies keep them open and dead clients are noticed.
+
+The stream is only offered when ADMIN_EVENTS_SSE is on and a Redis URL is
+set (see sse_enabled()); otherwise the notification dropdown polls.
+"""
+import asyncio
+import json
+import logging
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Configuration with defaults
+ADMIN_EVENTS_SSE = getattr(settings, "ADMIN_EVENTS_SSE", False)
+ADMIN_EVENTS_REDIS_URL = getattr(settings, "ADMIN_EVENTS_REDIS_URL", "")
+ADMIN_EVENTS_CHANNEL = getattr(
+    settings, "ADMIN_EVENTS_CHANNEL", "admin-message-events"
+)
+ADMIN_EVENTS_HEARTBEAT = getattr(settings, "ADMIN_EVENTS_HEARTBEAT", 15)
+ADMIN_EVENTS_QUEUE_SIZE = getattr(settings, "ADMIN_EVENTS_QUEUE_SIZE", 100)
+ADMIN_EVENTS_MAX_DURATION = getattr(settings, "ADMIN_EVENTS_MAX_DURATION", 3600)
+
+RECONNECT_DELAY = 5
+
+
+class Subscription:
+    """One SSE connection: a bounded queue living on the connection's loop"""
+
+    def __init__(self, loop, maxsize):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def put_threadsafe(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # Loop already closed; the connection is going away
+            pass
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Backpressure: drop what this client has not read yet
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync"})
+
+
+class RedisEventBackend:
+    """Redis pub/sub channel shared by every process and node"""
+
+    def __init__(self, url, channel):
+        self.url = url
+        self.channel = channel
+        self._client = None
+
+    def publish(self, event):
+        if self._client is None:
+            import redis
+
+            self._client = redis.Redis.from_url(self.url)
+        self._client.publish(self.channel, json.dumps(event, ensure_ascii=False))
+
+    async def listen(self, deliver):
+        """Relay channel messages to ``deliver`` until cancelled"""
+        import redis.asyncio
+
+        while True:
+            client = redis.asyncio.Redis.from_url(self.url)
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            deliver(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Admin events channel error: {str(e)}")
+                await asyncio.sleep(RECONNECT_DELAY)
+            finally:
+                await client.aclose()
+
+
+class EventBroker:
+    """In-process pub/sub; publish() may be called from any thread"""
+
+    def __init__(self, backend=None, queue_size=100):
+        self.backend = backend
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._listener = None
+
+    def subscribe(self):
+        """Register a connection; call from the connection's event loop"""
+        loop = asyncio.get_running_loop()
+        subscription = Subscription(loop, self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+            if self.backend is not None and (
+                self._listener is None or self._listener.done()
+            ):
+                self._listener = loop.create_task(self.backend.listen(self.fan_out))
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def fan_out(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.put_threadsafe(event)
+
+    def publish(self, event):
+        if self.backend is not None:
+            try:
+                # Comes back to this process through the listener
+                self.backend.publish(event)
+                return
+            except Exception as e:
+                logger.error(f"Could not publish admin event: {str(e)}")
+        self.fan_out(event)
+
+
+broker = EventBroker(
+    backend=RedisEventBackend(ADMIN_EVENTS_REDIS_URL, ADMIN_EVENTS_CHANNEL)
+    if ADMIN_EVENTS_REDIS_URL
+    else None,
+    queue_size=ADMIN_EVENTS_QUEUE_SIZE,
+)
+
+
+def sse_enabled():
+    """Whether pages should open the stream instead of relying on polling"""
+    return bool(ADMIN_EVENTS_SSE and ADMIN_EVENTS_REDIS_URL)
+
+
+def format_event(event):
+    """One SSE frame"""
+    data = json.dumps(event, ensure_ascii=False)
+    return f"event: {event['type']}\ndata: {data}\n\n"
+
+
+async def stream_events(initial_event=None):
+    """Async iterator of SSE frames for one connection"""
+    subscription = broker.subscribe()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + ADMIN_EVENTS_MAX_DURATION
+    try:
+        # Clients reconnect on their own after the stream ends
+        yield "retry: 5000\n\n"
+        if initial_event is not None:
+            yield format_event(initial_event)
+
+        while loop.time() < deadline:
+            try:
+                event = await asyncio.wait_for(
+                    subscription.queue.get(), timeout=ADMIN_EVENTS_HEARTBEAT
+                )
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+            yield format_event(event)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def _publish_on_commit(build_event):
+    from django.db import transaction
+
+    def publish():
+        try:
+            broker.publish(build_event())
+        except Exception as e:
+            logger.error(f"Error publishing admin event: {str(e)}")
+
+    transaction.on_commit(publish)
+
+
+def publish_new_message(message):
+    from users.utils.admin_notifications import get_unread_summary
+
+    _publish_on_commit(
+        lambda: {
+            "type": "admin_message",
+            "id": message.pk,
+            "subject": message.subject,
+            "sender": message.sender.get_display_name(),
+            "priority": message.priority,
+            "created_at": message.created_at.strftime("%Y-%m-%d %H:%M"),
+            "url": f"/admin/users/adminmessage/{message.pk}/change/",
+            "unread_count": get_unread_summary()["count"],
+        }
+    )
+
+
+def publish_new_reply(reply):
+    _publish_on_commit(
+        lambda: {
+            "type": "admin_reply",
+            "id": reply.pk,
+            "message_id": reply.original_message_id,
+            "subject": reply.original_message.subject,
+            "sender": reply.sender.get_display_name(),
+            "created_at": reply.created_at.strftime("%Y-%m-%d %H:%M"),
+            "url": f"/admin/users/adminmessage/{reply.original_message_id}/change/",
+        }
+    )
+
+
+def publish_unread_count():
+    from users.utils.admin_notifications import get_unread_summary
+
+    _publish_on_commit(
+        lambda: {"type": "unread", "unread_count": get_unread_summary()["count"]}
+    )
@@ -0,0 +1,80 @@
+# users/utils/admin_notifications.py
+"""
+Cached summary of unread admin messages (count plus the latest message's
+subject and sender) for the notifications shown on every admin page.
+
+The summary is cached under the AdminMessage version
+(core.services.cache.ModelVersion), so a cached copy is never patched in
+place, which concurrent saves could interleave and lose updates in. With a
+shared cache the version is a counter bumped after commit by every write
+that affects the summary. Otherwise it is derived from the table and
+memoized per process for a few seconds, so each worker reuses its copy and
+sees other workers' changes within that time. Bulk updates must set
+``updated_at`` themselves.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.services.cache import ModelVersion
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "admin_messages"
+
+# Configuration with defaults
+ADMIN_NOTIFICATIONS_CACHE_TIMEOUT = getattr(
+    settings, "ADMIN_NOTIFICATIONS_CACHE_TIMEOUT", 300
+)
+
+_messages_version = ModelVersion(f"{KEY_PREFIX}:version", "users.AdminMessage")
+
+
+def _message_entry(message):
+    return {
+        "id": message.pk,
+        "subject": message.subject,
+        "sender": message.sender.get_display_name(),
+        "created_at": message.created_at,
+    }
+
+
+def build_unread_summary():
+    """{"count", "latest"} straight from the database"""
+    from users.models.admin_message.admin_message import AdminMessage
+
+    unread = AdminMessage.objects.filter(status="unread")
+    latest = unread.select_related("sender").order_by("-created_at", "-id").first()
+    return {
+        "count": unread.count() if latest else 0,
+        "latest": _message_entry(latest) if latest else None,
+    }
+
+
+def get_unread_summary():
+    """Cached unread summary; no queries unless the messages changed"""
+    key = f"{KEY_PREFIX}:{_messages_version.get()}:unread_summary"
+    summary = cache.get(key)
+    if summary is None:
+        summary = build_unread_summary()
+        cache.set(key, summary, ADMIN_NOTIFICATIONS_CACHE_TIMEOUT)
+    return summary
+
+
+def message_saved(message, previous_status, created):
+    """Move the version after an AdminMessage save that affects the summary"""
+    was_unread = not created and previous_status == "unread"
+    if was_unread or message.status == "unread":
+        invalidate_unread_summary()
+
+
+def message_deleted(message, previous_status):
+    """Move the version after an unread AdminMessage is deleted"""
+    if previous_status == "unread":
+        invalidate_unread_summary()
+
+
+def invalidate_unread_summary():
+    """Make the cached summary stale once the transaction commits"""
+    _messages_version.bump()
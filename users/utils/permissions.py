@@ -0,0 +1,157 @@
+# users/utils/permissions.py
+"""
+Permission snapshots of user types.
+
+Permission checks used to dereference ``user.user_type``, loading the
+UserType row once per request (or once per row in admin lists). A
+PermissionSnapshot holds the flags and limits of one user type in an
+immutable, slotted object cached by ``user_type_id``. Saving or deleting a
+UserType bumps a version key, which makes every cached snapshot stale at
+once.
+
+Every worker also keeps the snapshots it has seen in memory, for at most
+USER_TYPE_PERMISSIONS_LOCAL_TTL seconds: a version bump only reaches other
+workers through a shared cache (Redis or Memcached), so the TTL bounds how
+long a revoked permission can stay in effect elsewhere. Without a shared
+cache snapshots are loaded from the database once the local copy expires.
+"""
+import logging
+import time
+from dataclasses import dataclass, fields
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core.services.cache import is_shared_cache
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "user_type_permissions"
+VERSION_KEY = f"{KEY_PREFIX}:version"
+
+# Configuration with defaults
+USER_TYPE_PERMISSIONS_CACHE_TIMEOUT = getattr(
+    settings, "USER_TYPE_PERMISSIONS_CACHE_TIMEOUT", 3600
+)
+USER_TYPE_PERMISSIONS_LOCAL_TTL = getattr(
+    settings, "USER_TYPE_PERMISSIONS_LOCAL_TTL", 5
+)
+
+# has_permission() names -> snapshot fields
+PERMISSION_FIELDS = {
+    "create_content": "can_create_content",
+    "edit_content": "can_edit_content",
+    "delete_content": "can_delete_content",
+    "manage_users": "can_manage_users",
+    "view_analytics": "can_view_analytics",
+    "access_admin": "can_access_admin",
+}
+
+
+@dataclass(frozen=True, slots=True)
+class PermissionSnapshot:
+    """Flags and limits of one user type (empty when the user has none)"""
+
+    user_type_id: Optional[int] = None
+    name: str = ""
+    slug: str = ""
+    is_active: bool = False
+    can_create_content: bool = False
+    can_edit_content: bool = False
+    can_delete_content: bool = False
+    can_manage_users: bool = False
+    can_view_analytics: bool = False
+    can_access_admin: bool = False
+    max_posts_per_day: Optional[int] = None
+    max_comments_per_day: Optional[int] = None
+    max_file_upload_size_mb: int = 0
+
+    @classmethod
+    def from_user_type(cls, user_type):
+        values = {
+            field.name: getattr(user_type, field.name)
+            for field in fields(cls)
+            if field.name != "user_type_id"
+        }
+        return cls(user_type_id=user_type.pk, **values)
+
+    @property
+    def exists(self):
+        return self.user_type_id is not None
+
+    @property
+    def is_message_admin(self):
+        return self.slug == "message_admin"
+
+    def has(self, permission):
+        field = PERMISSION_FIELDS.get(permission)
+        return bool(field and getattr(self, field))
+
+
+EMPTY_PERMISSIONS = PermissionSnapshot()
+
+# user_type_id -> (version, expires_at, snapshot), per process
+_local_snapshots = {}
+LOCAL_MAX_ENTRIES = 256
+
+
+def _snapshot_key(version, user_type_id):
+    return f"{KEY_PREFIX}:{version}:{user_type_id}"
+
+
+def _load_snapshot(user_type_id):
+    from users.models.user.user_type import UserType
+
+    user_type = UserType.objects.filter(pk=user_type_id).first()
+    return (
+        PermissionSnapshot.from_user_type(user_type) if user_type else EMPTY_PERMISSIONS
+    )
+
+
+def get_permission_snapshot(user_type_id):
+    """Snapshot of a user type; no queries unless every cache is cold"""
+    if not user_type_id:
+        return EMPTY_PERMISSIONS
+
+    version = cache.get(VERSION_KEY, 0)
+    now = time.monotonic()
+    entry = _local_snapshots.get(user_type_id)
+    if entry is not None and entry[0] == version and entry[1] > now:
+        return entry[2]
+
+    if is_shared_cache():
+        key = _snapshot_key(version, user_type_id)
+        snapshot = cache.get(key)
+        if snapshot is None:
+            snapshot = _load_snapshot(user_type_id)
+            cache.set(key, snapshot, USER_TYPE_PERMISSIONS_CACHE_TIMEOUT)
+    else:
+        # A per-process cache would keep other workers' changes out just the same
+        snapshot = _load_snapshot(user_type_id)
+
+    if len(_local_snapshots) >= LOCAL_MAX_ENTRIES:
+        # Deleted user types pile up here; dropping everything is cheap to refill
+        _local_snapshots.clear()
+    _local_snapshots[user_type_id] = (
+        version,
+        now + USER_TYPE_PERMISSIONS_LOCAL_TTL,
+        snapshot,
+    )
+    return snapshot
+
+
+def invalidate_permission_snapshots():
+    """Make every cached snapshot stale (after a UserType change)"""
+
+    def bump():
+        try:
+            cache.add(VERSION_KEY, 0, None)
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.set(VERSION_KEY, 1, None)
+        except Exception as e:
+            logger.error(f"Permission snapshot invalidation error: {str(e)}")
+
+    transaction.on_commit(bump)
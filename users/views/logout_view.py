@@ -27,9 +27,7 @@ def smart_logout_view(request):
 
     elif (
             request.user.is_staff
-            and hasattr(request.user, "user_type")
-            and request.user.user_type
-            and request.user.user_type.slug == "message_admin"
+            and request.user.type_permissions.is_message_admin
     ):
         # Message admin - redirect to admin login
         user_type = "message_admin"
@@ -72,9 +70,7 @@ def message_admin_logout_view(request):
     if not (
             request.user.is_staff
             and not request.user.is_superuser
-            and hasattr(request.user, "user_type")
-            and request.user.user_type
-            and request.user.user_type.slug == "message_admin"
+            and request.user.type_permissions.is_message_admin
     ):
         # If not a message admin, use regular logout
         return smart_logout_view(request)
@@ -121,9 +117,7 @@ class SmartLogoutView(LogoutView):
             return "/admin/login/"
         elif (
                 self.request.user.is_staff
-                and hasattr(self.request.user, "user_type")
-                and self.request.user.user_type
-                and self.request.user.user_type.slug == "message_admin"
+                and self.request.user.type_permissions.is_message_admin
         ):
             return "/admin/login/"
         elif self.request.user.is_staff:
@@ -139,9 +133,7 @@ class SmartLogoutView(LogoutView):
                 user_type = "superuser"
             elif (
                     request.user.is_staff
-                    and hasattr(request.user, "user_type")
-                    and request.user.user_type
-                    and request.user.user_type.slug == "message_admin"
+                    and request.user.type_permissions.is_message_admin
             ):
                 user_type = "message_admin"
             elif request.user.is_staff:
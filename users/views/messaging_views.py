@@ -1,16 +1,25 @@
 # users/views/messaging_views.py
 import logging
 
+from asgiref.sync import sync_to_async
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.core.paginator import Paginator
 from django.db.models import Q
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (
+    Http404,
+    HttpResponseForbidden,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, redirect, render
 
 from users.forms.messaging_forms import AdminMessageForm
 from users.models.admin_message.admin_message import AdminMessage
+from users.utils.admin_message_events import sse_enabled, stream_events
+from users.utils.admin_notifications import get_unread_summary
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -22,8 +31,7 @@ def is_message_admin(user):
             user.is_authenticated
             and user.is_staff
             and not user.is_superuser
-            and user.user_type
-            and user.user_type.slug == "message_admin"
+            and user.type_permissions.is_message_admin
     )
 
 
@@ -182,6 +190,32 @@ def admin_notifications_api(request):
     return JsonResponse({"unread_count": unread_count, "notifications": notifications})
 
 
+async def admin_notifications_stream(request):
+    """
+    Server-Sent Events stream of new messages, replies and unread-count
+    changes. Async view: serve it with an ASGI server (mysite.asgi), where
+    an idle connection holds no worker thread. Under WSGI the response would
+    be buffered and pin a worker, so the stream is refused there and when
+    ADMIN_EVENTS_SSE is off; the page keeps polling instead.
+    """
+    if not sse_enabled() or not isinstance(request, ASGIRequest):
+        raise Http404
+
+    user = await request.auser()
+    if not is_superuser_admin(user):
+        return HttpResponseForbidden()
+
+    summary = await sync_to_async(get_unread_summary)()
+    response = StreamingHttpResponse(
+        stream_events({"type": "unread", "unread_count": summary["count"]}),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 @login_required
 @user_passes_test(is_superuser_admin)
 def mark_message_read_api(request, message_id):